@@ -1,9 +1,9 @@
-import network
 import time
-import machine
 from machine import Pin, PWM, ADC
 from umqtt.simple import MQTTClient
-import json
+from lpg.mqttlink import MqttLink
+from lpg.wifi import FastJoin
+from lpg.topics import device_id, topic, control_topics
 
 GPIO_RELAY = 33
 GPIO_SERVO = 14
@@ -19,21 +19,30 @@ MQTT_BROKER = 'd9224a87ae11416ebdfea8fc7ef45621.s1.eu.hivemq.cloud'
 MQTT_PORT = 8883
 MQTT_USER = 'LPG_Detection'
 MQTT_PASSWORD = 'Fire@101'
-MQTT_CLIENT_ID = 'esp32-gas-detector-' + str(machine.unique_id())
+DEVICE_ID = device_id()
+DEVICE_GROUP = None
+MQTT_CLIENT_ID = 'esp32-gas-detector-' + DEVICE_ID
+MQTT_BACKOFF_MS = 500
+MQTT_BACKOFF_MAX_MS = 60000
 
-MQTT_TOPIC_GAS = 'LPG/gas/value'
-MQTT_TOPIC_STATUS = 'LPG/gas/status'
-MQTT_TOPIC_CONTROL = 'LPG/system/control'
-MQTT_TOPIC_LOG = 'LPG/system/log'
+MQTT_TOPIC_GAS = topic(DEVICE_ID, 'gas/value')
+MQTT_TOPIC_STATUS = topic(DEVICE_ID, 'gas/status')
+MQTT_TOPICS_CONTROL = control_topics(DEVICE_ID, DEVICE_GROUP)
+MQTT_TOPIC_LOG = topic(DEVICE_ID, 'system/log')
 
 WIFI_NETWORKS = [
-    ('oh-ho!', 'Dangals.LM10'),
-    ('IIC_WIFI', '!tah@rIntl2025')
+    ('IIC_WIFI', '!tah@rIntl2025'),
+    ('oh-ho!', 'Dangals.LM10')
 ]
+WIFI_CACHE = 'wifi.json'
+WIFI_JOIN_TIMEOUT_MS = 15000
+WIFI_FAST_TIMEOUT_MS = 3000
 
 wifi_connected = False
 mqtt_connected = False
 mqtt_client = None
+mqtt_link = None
+wifi = FastJoin(WIFI_NETWORKS, WIFI_CACHE, WIFI_JOIN_TIMEOUT_MS, WIFI_FAST_TIMEOUT_MS)
 system_on = True
 alert_active = False
 alert_timer = 0
@@ -69,27 +78,13 @@ print("\n✓ All hardware initialized!\n")
 def connect_wifi():
     global wifi_connected
     
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    
-    for ssid, password in WIFI_NETWORKS:
-        print(f"Attempting: {ssid}...")
-        wlan.connect(ssid, password)
-        
-        timeout = 15
-        while not wlan.isconnected() and timeout > 0:
-            print(f"  Waiting... ({timeout}s)")
-            time.sleep(1)
-            timeout -= 1
-        
-        if wlan.isconnected():
-            print(f"✓ Connected to {ssid}! IP: {wlan.ifconfig()[0]}")
-            wifi_connected = True
-            return True
-    
-    print("✗ WiFi Connection Failed - All networks tried!")
-    wifi_connected = False
-    return False
+    wifi_connected = wifi.connect()
+    if wifi_connected:
+        print(f"✓ Connected to {wifi.ssid}! IP: {wifi.wlan.ifconfig()[0]}")
+        print(f"  {wifi.method} join {wifi.join_ms} ms, boot -> WiFi {wifi.boot_ms} ms")
+    else:
+        print("✗ WiFi Connection Failed - All networks tried!")
+    return wifi_connected
 
 def on_mqtt_message(topic, msg):
     global system_on, alert_active
@@ -99,7 +94,7 @@ def on_mqtt_message(topic, msg):
     
     print(f"[MQTT] {topic_str}: {message}")
     
-    if topic_str == MQTT_TOPIC_CONTROL:
+    if topic_str in MQTT_TOPICS_CONTROL:
         handle_command(message)
 
 def handle_command(command):
@@ -258,7 +253,7 @@ def send_log(message):
             pass
 
 def connect_mqtt():
-    global mqtt_client, mqtt_connected
+    global mqtt_client, mqtt_link
     
     print(f"Connecting to MQTT: {MQTT_BROKER}:{MQTT_PORT}...")
      
@@ -275,21 +270,31 @@ def connect_mqtt():
         )
         
         mqtt_client.set_callback(on_mqtt_message)
-        mqtt_client.connect()
-        mqtt_client.subscribe(MQTT_TOPIC_CONTROL)
-        
-        print("✓ MQTT Connected!")
-        mqtt_connected = True
-        
-        mqtt_client.publish(MQTT_TOPIC_STATUS, "SYSTEM_READY")
-        mqtt_client.publish(MQTT_TOPIC_LOG, "System started")
-        
+        mqtt_link = MqttLink(mqtt_client, MQTT_TOPICS_CONTROL,
+                             MQTT_BACKOFF_MS, MQTT_BACKOFF_MAX_MS)
         return True
     except Exception as e:
-        print(f"✗ MQTT Connection failed: {e}")
-        mqtt_connected = False
+        print(f"✗ MQTT setup failed: {e}")
         return False
 
+def on_mqtt_connected():
+    global mqtt_connected
+    mqtt_connected = True
+    
+    try:
+        if mqtt_link.successes == 1:
+            print("✓ MQTT Connected!")
+            mqtt_client.publish(MQTT_TOPIC_STATUS, "SYSTEM_READY")
+            mqtt_client.publish(MQTT_TOPIC_LOG, "System started")
+            send_log(f"WiFi {wifi.ssid} ({wifi.method} join {wifi.join_ms} ms), "
+                     f"boot -> WiFi {wifi.boot_ms} ms, boot -> MQTT {time.ticks_ms()} ms")
+        else:
+            print(f"✓ MQTT Reconnected! (down {mqtt_link.down_ms} ms)")
+            send_log(f"MQTT reconnected after {mqtt_link.down_ms} ms down "
+                     f"({mqtt_link.attempts} attempts, {mqtt_link.failures} failed)")
+    except OSError:
+        pass
+
 def read_gas_sensor():
     try:
         raw = adc.read()
@@ -313,11 +318,12 @@ if connect_wifi():
                     try:
                         mqtt_client.check_msg()
                     except OSError as e:
-                        print(f"✗ MQTT disconnected, attempting to reconnect...")
+                        print(f"✗ MQTT disconnected, reconnecting in background...")
                         mqtt_connected = False
-                        if connect_mqtt():
-                            print("✓ MQTT Reconnected!")
-                        continue
+                        mqtt_link.lost()
+                elif mqtt_link.step():
+                    on_mqtt_connected()
+                    mqtt_link.deliver()
                 
                 if read_count >= 20:
                     gas_value = read_gas_sensor()
@@ -16,7 +16,7 @@ INSTRUCTIONS:
 8. ESP32 will auto-run on startup
 """
 
-from machine import Pin, ADC, PWM
+from machine import Pin, ADC, PWM, unique_id
 import network
 import time
 from umqtt.simple import MQTTClient
@@ -36,10 +36,19 @@ MQTT_HOST = "d9224a87ae11416ebdfea8fc7ef45621.s1.eu.hivemq.cloud"
 MQTT_PORT = 8883
 MQTT_USER = "LPG_Detection"
 MQTT_PASS = "Fire@101"
-MQTT_CLIENT_ID = "d9224a87ae11416ebdfea8fc7ef45621"
-MQTT_TOPIC_GAS = b"LPG/gas/value"
-MQTT_TOPIC_STATUS = b"LPG/gas/status"
-MQTT_TOPIC_CONTROL = b"LPG/system/control"
+
+# Topics are per unit (LPG/<device>/gas/value, ...) so several detectors
+# can share the broker; commands come on the unit's own control topic,
+# its group's (DEVICE_GROUP) and LPG/all/system/control
+DEVICE_ID = "".join("%02x" % b for b in unique_id())   # e.g. 246f281a2b3c
+DEVICE_GROUP = None          # e.g. "floor2"
+MQTT_CLIENT_ID = "esp32-gas-detector-" + DEVICE_ID
+MQTT_TOPIC_GAS = bytes("LPG/" + DEVICE_ID + "/gas/value", "utf-8")
+MQTT_TOPIC_STATUS = bytes("LPG/" + DEVICE_ID + "/gas/status", "utf-8")
+MQTT_TOPICS_CONTROL = [bytes("LPG/" + DEVICE_ID + "/system/control", "utf-8"),
+                       b"LPG/all/system/control"]
+if DEVICE_GROUP:
+    MQTT_TOPICS_CONTROL.append(bytes("LPG/group/" + DEVICE_GROUP + "/system/control", "utf-8"))
 
 # ==================================================
 # MQ-2 Gas Sensor
@@ -110,7 +119,7 @@ def mqtt_callback(topic, msg):
     command = msg.decode()
     print(f"[MQTT] Received: {topic.decode()} = {command}")
     
-    if topic == MQTT_TOPIC_CONTROL:
+    if topic in MQTT_TOPICS_CONTROL:
         if command == "ON":
             print("🟢 System turned ON")
             relay.on()
@@ -171,9 +180,10 @@ def connect_mqtt():
         client.connect()
         print("✓ Connected to HiveMQ Cloud via TLS!")
         
-        # Subscribe to control topic
-        client.subscribe(MQTT_TOPIC_CONTROL)
-        print("✓ Subscribed to control topic")
+        # Subscribe to this unit's, its group's and the broadcast control topics
+        for control_topic in MQTT_TOPICS_CONTROL:
+            client.subscribe(control_topic)
+        print(f"✓ Subscribed to control topics (device {DEVICE_ID})")
         
         return client
     except Exception as e:
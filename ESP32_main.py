@@ -4,7 +4,7 @@ Compatible with HiveMQ Cloud MQTT Broker
 Author: Academic Project
 """
 
-from machine import Pin, ADC, PWM
+from machine import Pin, ADC, PWM, Timer, unique_id
 import network
 import time
 from umqtt.simple import MQTTClient
@@ -24,10 +24,20 @@ MQTT_HOST = "d9224a87ae11416ebdfea8fc7ef45621.s1.eu.hivemq.cloud"
 MQTT_PORT = 8883
 MQTT_USER = "LPG_Detection"
 MQTT_PASS = "Fire@101"
-MQTT_CLIENT_ID = "d9224a87ae11416ebdfea8fc7ef45621"
-MQTT_TOPIC_GAS = b"LPG/gas/value"
-MQTT_TOPIC_STATUS = b"LPG/gas/status"
-MQTT_TOPIC_CONTROL = b"LPG/system/control"
+
+# Topics are per unit (LPG/<device>/gas/value, ...) so several detectors
+# can share the broker; commands come on the unit's own control topic,
+# its group's (DEVICE_GROUP) and LPG/all/system/control
+DEVICE_ID = "".join("%02x" % b for b in unique_id())   # e.g. 246f281a2b3c
+DEVICE_GROUP = None          # e.g. "floor2"
+MQTT_CLIENT_ID = "esp32-gas-detector-" + DEVICE_ID
+MQTT_TOPIC_GAS = bytes("LPG/" + DEVICE_ID + "/gas/value", "utf-8")
+MQTT_TOPIC_STATUS = bytes("LPG/" + DEVICE_ID + "/gas/status", "utf-8")
+MQTT_TOPIC_LOG = bytes("LPG/" + DEVICE_ID + "/system/log", "utf-8")
+MQTT_TOPICS_CONTROL = [bytes("LPG/" + DEVICE_ID + "/system/control", "utf-8"),
+                       b"LPG/all/system/control"]
+if DEVICE_GROUP:
+    MQTT_TOPICS_CONTROL.append(bytes("LPG/group/" + DEVICE_GROUP + "/system/control", "utf-8"))
 
 # ==================================================
 # MQ-2 Gas Sensor
@@ -36,6 +46,46 @@ gas = ADC(Pin(34))
 gas.atten(ADC.ATTN_11DB)
 THRESHOLD = 1200
 
+# ==================================================
+# Alarm State Machine (hysteresis + N-of-M confirmation)
+# ==================================================
+CLEAR_THRESHOLD = 1000       # Alarm clears below this, not at THRESHOLD
+CONFIRM_N = 2                # Readings above THRESHOLD needed...
+CONFIRM_M = 3                # ...out of the last CONFIRM_M to raise the alarm
+HOLD_MS = 10000              # Minimum time in ALARM before recovery starts
+RECOVER_MS = 5000            # Time below CLEAR_THRESHOLD before NORMAL
+RISE_LIMIT = 150             # ADC counts/s that count as a hit below THRESHOLD (0: off)
+RISE_FLOOR = 700             # ...once the reading is at least this
+RISE_WINDOW = 3              # Readings in the rise-rate fit
+READ_INTERVAL = 2            # Seconds between readings far below THRESHOLD
+READ_INTERVAL_MIN = 0.5      # ...shrinking to this as the gas nears THRESHOLD
+PACE_FAR = 600               # ADC counts below THRESHOLD that count as far
+PACE_LEAD_MS = 5000          # Read faster when THRESHOLD is this close at the current rise
+CONFIRM_INTERVAL = 0.2       # Seconds between readings while confirming
+
+NORMAL = "NORMAL"
+PRE_ALARM = "PRE_ALARM"
+ALARM = "ALARM"
+RECOVERING = "RECOVERING"
+
+alarm_state = NORMAL
+alarm_since = 0
+alarm_history = []           # Last CONFIRM_M readings: True if a hit
+rise_times = []              # Last RISE_WINDOW reading times (ms) and values
+rise_values = []
+rise = 0                     # Latest rise rate (ADC counts/s)
+
+# ==================================================
+# Report-by-Exception
+# ==================================================
+REPORT_BY_EXCEPTION = True   # False: publish every reading like before
+DEADBAND = 25                # ADC counts a reading must move to be published
+HEARTBEAT_MS = 60000         # Publish a reading at least this often anyway
+
+last_sent_value = None
+last_sent_ticks = 0
+last_status = None
+
 # ==================================================
 # Actuators (GPIO Configuration)
 # ==================================================
@@ -45,18 +95,105 @@ buzzer = Pin(27, Pin.OUT)      # Buzzer (alarm)
 relay = Pin(33, Pin.OUT)       # Relay (gas valve control)
 servo = PWM(Pin(14), freq=50)  # Servo motor (vent control)
 
+# Servo calibration: PWM duty at 0°, 90° and 180° (measure per unit)
+SERVO_DUTY_0 = 38
+SERVO_DUTY_90 = 77
+SERVO_DUTY_180 = 115
+SERVO_SPEED_DPS = 360          # Vent ramp speed in degrees/s (0: jump)
+SERVO_STEP_MS = 20             # Ramp step (one PWM frame)
+
+# ==================================================
+# Output Shadow (only changed outputs are written)
+# ==================================================
+OUTPUT_PINS = {"relay": relay, "buzzer": buzzer, "red": red, "green": green}
+outputs = {}                  # Last value written per output ("servo": duty)
+
+# Scenes: (relay, servo angle, buzzer, red, green), None = leave as is.
+# Closing the valve is written first, opening it last.
+SCENE_NORMAL = (1, 0, 0, 0, 1)
+SCENE_ALERT = (0, 90, 1, 1, 0)
+SCENE_OFF = (0, 180, 0, 0, 0)
+CLOSE_ORDER = ("relay", "servo", "buzzer", "red", "green")
+OPEN_ORDER = ("servo", "buzzer", "red", "green", "relay")
+SCENE_INDEX = {"relay": 0, "servo": 1, "buzzer": 2, "red": 3, "green": 4}
+
+def set_output(name, value):
+    """Write an output only if it differs from what it already has"""
+    if outputs.get(name) == value:
+        return False
+    if name == "servo":
+        servo.duty(value)
+    else:
+        OUTPUT_PINS[name].value(value)
+    outputs[name] = value
+    return True
+
+def apply_scene(scene):
+    """Set several outputs at once, valve in the safe order"""
+    for name in OPEN_ORDER if scene[0] else CLOSE_ORDER:
+        value = scene[SCENE_INDEX[name]]
+        if value is None:
+            continue
+        if name == "servo":
+            set_angle(value)
+        else:
+            set_output(name, value)
+
+def output_state():
+    """Current outputs, e.g. 'relay=1 servo=38 buzzer=0 red=0 green=1 angle=0'"""
+    state = " ".join("{}={}".format(name, outputs.get(name)) for name in CLOSE_ORDER)
+    return "{} angle={}".format(state, servo_angle)
+
 # ==================================================
-# Servo Control Function
+# Servo Control (duty table + timer-driven ramp)
 # ==================================================
+def build_duty_table():
+    """Duty for each whole degree, interpolated once between the calibration points"""
+    table = []
+    for angle in range(181):
+        if angle <= 90:
+            table.append(SERVO_DUTY_0 + ((SERVO_DUTY_90 - SERVO_DUTY_0) * angle + 45) // 90)
+        else:
+            table.append(SERVO_DUTY_90 + ((SERVO_DUTY_180 - SERVO_DUTY_90) * (angle - 90) + 45) // 90)
+    return table
+
+SERVO_DUTY = build_duty_table()
+SERVO_STEP = max(1, SERVO_SPEED_DPS * SERVO_STEP_MS // 1000) if SERVO_SPEED_DPS else 180
+servo_angle = None            # Last angle written (None until the first move)
+servo_target = 0
+servo_timer = Timer(0)
+servo_timer_running = False
+
+def servo_step(timer=None):
+    """Timer callback: one ramp step towards servo_target"""
+    global servo_angle, servo_timer_running
+    if servo_angle == servo_target:
+        servo_timer.deinit()
+        servo_timer_running = False
+        return
+    if servo_target > servo_angle:
+        servo_angle = min(servo_angle + SERVO_STEP, servo_target)
+    else:
+        servo_angle = max(servo_angle - SERVO_STEP, servo_target)
+    set_output("servo", SERVO_DUTY[servo_angle])
+
 def set_angle(angle):
     """
-    Control servo angle (0-180 degrees)
+    Move the servo to an angle (0-180 degrees) without blocking:
+    a timer ramps it at SERVO_SPEED_DPS
     0° = Vent closed
     90° = Vent open
     180° = Fully open
     """
-    duty = int((angle / 180) * 75 + 40)
-    servo.duty(duty)
+    global servo_angle, servo_target, servo_timer_running
+    servo_target = max(0, min(180, angle))
+    if servo_angle is None or SERVO_STEP >= 180:
+        servo_angle = servo_target
+        set_output("servo", SERVO_DUTY[servo_angle])
+    elif servo_angle != servo_target and not servo_timer_running:
+        servo_timer_running = True
+        servo_step()
+        servo_timer.init(period=SERVO_STEP_MS, mode=Timer.PERIODIC, callback=servo_step)
 
 # ==================================================
 # WiFi Connection (Try Multiple Networks)
@@ -92,12 +229,12 @@ def connect_wifi():
 # ==================================================
 def relay_on():
     """Turn relay ON (gas valve opens)"""
-    relay.on()
+    set_output("relay", 1)
     print("  💨 Relay ON - Gas flowing")
 
 def relay_off():
     """Turn relay OFF (gas valve closes)"""
-    relay.off()
+    set_output("relay", 0)
     print("  🔒 Relay OFF - Gas blocked")
 
 def servo_0():
@@ -117,54 +254,43 @@ def servo_180():
 
 def led_green():
     """Turn green LED ON"""
-    green.on()
-    red.off()
+    apply_scene((None, None, None, 0, 1))
     print("  🟢 Green LED ON")
 
 def led_red():
     """Turn red LED ON"""
-    red.on()
-    green.off()
+    apply_scene((None, None, None, 1, 0))
     print("  🔴 Red LED ON")
 
 def led_off():
     """Turn all LEDs OFF"""
-    green.off()
-    red.off()
+    apply_scene((None, None, None, 0, 0))
     print("  ⚫ All LEDs OFF")
 
 def buzzer_on():
     """Turn buzzer ON"""
-    buzzer.on()
+    set_output("buzzer", 1)
     print("  🔔 Buzzer ON")
 
 def buzzer_off():
     """Turn buzzer OFF"""
-    buzzer.off()
+    set_output("buzzer", 0)
     print("  🔇 Buzzer OFF")
 
 def normal_mode():
     """Return to normal operation mode"""
-    green.on()
-    red.off()
-    relay.on()
-    buzzer.off()
-    set_angle(0)
+    apply_scene(SCENE_NORMAL)
     print("  ✅ NORMAL MODE: Green LED + Relay ON + Servo 0°")
 
 def alert_mode():
     """Activate alert mode"""
-    red.on()
-    green.off()
-    relay.off()
-    buzzer.on()
-    set_angle(90)
+    apply_scene(SCENE_ALERT)
     print("  ⚠️ ALERT MODE: Red LED + Relay OFF + Servo 90° + Buzzer ON")
 
 def servo_with_fan():
     """Emergency: open vent and close gas valve"""
-    servo_90()
     relay_off()
+    servo_90()
     led_red()
     buzzer_on()
     print("  🚨 EMERGENCY: Servo 90° + Gas OFF + Alert")
@@ -182,19 +308,16 @@ def mqtt_callback(topic, msg):
     command = msg.decode()
     print(f"[MQTT] Received: {topic.decode()} = {command}")
     
-    if topic == MQTT_TOPIC_CONTROL:
+    if topic in MQTT_TOPICS_CONTROL:
         # System Control
         if command == "ON":
             print("🟢 System turned ON")
             normal_mode()
+            reset_alarm()
             
         elif command == "OFF":
             print("🔴 System turned OFF")
-            relay.off()
-            green.off()
-            red.off()
-            buzzer.off()
-            set_angle(180)
+            apply_scene(SCENE_OFF)
             
         elif command == "TEST":
             print("🧪 Running system test...")
@@ -218,6 +341,9 @@ def mqtt_callback(topic, msg):
             servo_90()
         elif command == "SERVO_180":
             servo_180()
+        elif command.startswith("SERVO_") and command[6:].isdigit() and int(command[6:]) <= 180:
+            set_angle(int(command[6:]))
+            print(f"  📍 Servo: {servo_target}°")
         
         # LED Commands
         elif command == "LED_GREEN":
@@ -236,14 +362,121 @@ def mqtt_callback(topic, msg):
         # Integrated Scenarios
         elif command == "NORMAL_MODE":
             normal_mode()
+            reset_alarm()
         elif command == "ALERT_MODE":
             alert_mode()
         elif command == "SERVO_WITH_FAN":
             servo_with_fan()
         
+        # Current output state
+        elif command == "STATE":
+            state = output_state()
+            print(f"  📋 {state}")
+            mqtt_client.publish(MQTT_TOPIC_LOG, bytes("STATE " + state, "utf-8"))
+        
         else:
             print(f"  ⚠️ Unknown command: {command}")
 
+# ==================================================
+# Alarm State Machine
+# ==================================================
+def reset_alarm():
+    """Back to NORMAL; a leak that is still there raises the alarm again"""
+    global alarm_state, alarm_since, alarm_history, last_status
+    alarm_state = NORMAL
+    alarm_since = time.ticks_ms()
+    alarm_history = []
+    last_status = None
+
+def rise_rate(value):
+    """
+    Least-squares slope of the last RISE_WINDOW readings in ADC counts/s,
+    using their real timestamps (readings are closer together while
+    confirming); 0 until the window is full
+    """
+    now = time.ticks_ms()
+    rise_times.append(now)
+    rise_values.append(value)
+    if len(rise_times) > RISE_WINDOW:
+        rise_times.pop(0)
+        rise_values.pop(0)
+    n = len(rise_times)
+    if n < RISE_WINDOW:
+        return 0
+    ts = [time.ticks_diff(t, rise_times[0]) for t in rise_times]
+    st = sum(ts)
+    sx = sum(rise_values)
+    den = n * sum(t * t for t in ts) - st * st
+    if den <= 0:
+        return 0
+    stx = sum(t * x for t, x in zip(ts, rise_values))
+    return (n * stx - st * sx) * 1000 // den
+
+def update_alarm(value):
+    """
+    Feed one reading. A hit is a reading above THRESHOLD, or one at or
+    above RISE_FLOOR rising at RISE_LIMIT counts/s or faster.
+    Returns the new state on a transition, else None:
+    NORMAL -> PRE_ALARM on the first hit,
+    -> ALARM once CONFIRM_N of the last CONFIRM_M readings are hits,
+    PRE_ALARM -> NORMAL when none of them are,
+    ALARM -> RECOVERING below CLEAR_THRESHOLD after HOLD_MS,
+    RECOVERING -> ALARM at or above CLEAR_THRESHOLD again,
+    RECOVERING -> NORMAL after RECOVER_MS below it
+    """
+    global alarm_state, alarm_since, rise
+    now = time.ticks_ms()
+    rise = rise_rate(value)
+    hit = value > THRESHOLD or (RISE_LIMIT and rise >= RISE_LIMIT and value >= RISE_FLOOR)
+    alarm_history.append(hit)
+    if len(alarm_history) > CONFIRM_M:
+        alarm_history.pop(0)
+    hits = alarm_history.count(True)
+    
+    new = None
+    if alarm_state == NORMAL or alarm_state == PRE_ALARM:
+        if hits >= CONFIRM_N:
+            new = ALARM
+        elif alarm_state == NORMAL and hit:
+            new = PRE_ALARM
+        elif alarm_state == PRE_ALARM and hits == 0:
+            new = NORMAL
+    elif alarm_state == ALARM:
+        if value < CLEAR_THRESHOLD and time.ticks_diff(now, alarm_since) >= HOLD_MS:
+            new = RECOVERING
+    elif alarm_state == RECOVERING:
+        if value >= CLEAR_THRESHOLD:
+            new = ALARM
+        elif time.ticks_diff(now, alarm_since) >= RECOVER_MS:
+            new = NORMAL
+    
+    if new is not None:
+        alarm_state = new
+        alarm_since = now
+    return new
+
+def read_interval(value):
+    """
+    Seconds until the next reading: READ_INTERVAL when the gas is
+    PACE_FAR or more below THRESHOLD, READ_INTERVAL_MIN at it, and
+    shorter still if the current rise would reach it within PACE_LEAD_MS.
+    Once the alarm is raised the outputs are set, so it goes back to
+    READ_INTERVAL until NORMAL
+    """
+    if alarm_state == PRE_ALARM:
+        return CONFIRM_INTERVAL
+    if alarm_state != NORMAL:
+        return READ_INTERVAL
+    margin = THRESHOLD - value
+    if margin <= 0:
+        return READ_INTERVAL_MIN
+    share = min(margin, PACE_FAR) * 1000 // PACE_FAR       # 0..1000
+    if rise > 0:
+        eta_ms = margin * 1000 // rise
+        if eta_ms < PACE_LEAD_MS:
+            share = min(share, eta_ms * 1000 // PACE_LEAD_MS)
+    return READ_INTERVAL_MIN + (READ_INTERVAL - READ_INTERVAL_MIN) * share / 1000
+
 # ==================================================
 # MQTT Connection with SSL/TLS
 # ==================================================
@@ -271,15 +504,41 @@ def connect_mqtt():
         client.connect()
         print("✓ Connected to HiveMQ Cloud via TLS!")
         
-        # Subscribe to control topic
-        client.subscribe(MQTT_TOPIC_CONTROL)
-        print("✓ Subscribed to control topic")
+        # Subscribe to this unit's, its group's and the broadcast control topics
+        for control_topic in MQTT_TOPICS_CONTROL:
+            client.subscribe(control_topic)
+        print(f"✓ Subscribed to control topics (device {DEVICE_ID})")
         
         return client
     except Exception as e:
         print(f"✗ MQTT Connection Failed: {e}")
         return None
 
+# ==================================================
+# Publishing (only what changed)
+# ==================================================
+def publish_value(value, force=False):
+    """
+    Publish a gas reading if it moved more than DEADBAND from the last
+    published one or HEARTBEAT_MS passed since then
+    """
+    global last_sent_value, last_sent_ticks
+    now = time.ticks_ms()
+    if (force or not REPORT_BY_EXCEPTION or last_sent_value is None
+            or abs(value - last_sent_value) > DEADBAND
+            or time.ticks_diff(now, last_sent_ticks) >= HEARTBEAT_MS):
+        mqtt_client.publish(MQTT_TOPIC_GAS, bytes(str(value), "utf-8"))
+        last_sent_value = value
+        last_sent_ticks = now
+
+def publish_status(state, message):
+    """Publish status only when the state changes"""
+    global last_status
+    if REPORT_BY_EXCEPTION and state == last_status:
+        return
+    mqtt_client.publish(MQTT_TOPIC_STATUS, bytes(message, "utf-8"))
+    last_status = state
+
 # ==================================================
 # System Initialization
 # ==================================================
@@ -297,11 +556,9 @@ if not mqtt_client:
     raise Exception("MQTT connection failed")
 
 # Initial state
-set_angle(0)  # Vent closed
-relay.on()    # System ON
-green.on()    # Green LED
-red.off()     # Red LED off
-buzzer.off()  # Buzzer off
+reset_alarm()
+apply_scene(SCENE_NORMAL)  # Vent closed, relay ON, green LED, buzzer off
+publish_status("NORMAL", "NORMAL")
 
 print("✓ System initialized and ready")
 print("="*50 + "\n")
@@ -318,42 +575,45 @@ while True:
         value = gas.read()
         print(f"Gas Value: {value}")
         
-        # Publish gas reading
-        mqtt_client.publish(MQTT_TOPIC_GAS, bytes(str(value), "utf-8"))
+        previous = alarm_state
+        state = update_alarm(value)
         
-        # Check if gas leakage (Threshold: 1200)
-        if value > THRESHOLD:
-            print("⚠️ GAS LEAKAGE DETECTED! Value: {} (Threshold: {})".format(value, THRESHOLD))
-            
-            # Alert mode
-            red.on()
-            green.off()
-            buzzer.on()
-            relay.off()           # Cut gas supply
-            set_angle(90)         # Open vent
+        # Actuators and status change on transitions only
+        if state == ALARM and previous != RECOVERING:
+            if value > THRESHOLD:
+                print("⚠️ GAS LEAKAGE DETECTED! Value: {} (Threshold: {})".format(value, THRESHOLD))
+            else:
+                print("⚠️ GAS LEAKAGE DETECTED! Value: {} rising fast (limit {}/s)".format(value, RISE_LIMIT))
+            alert_mode()
             
-            # Publish alert status with value
+            # Publish alert reading and status with value
+            publish_value(value, force=True)
             alert_msg = "GAS_DETECTED - Value: {} - EMERGENCY".format(value)
-            mqtt_client.publish(MQTT_TOPIC_STATUS, bytes(alert_msg, 'utf-8'))
-            
-            # Stay in alert for 10 seconds
-            time.sleep(10)
-            
+            publish_status("GAS_DETECTED", alert_msg)
+        
+        elif state == ALARM:
+            print("⚠️ Gas back up while recovering - alarm held")
+            publish_value(value)
+        
+        elif state == PRE_ALARM:
+            print("⏳ Gas above threshold or rising fast - confirming...")
+        
+        elif state == RECOVERING:
+            print("↘️ Gas below {} - recovering...".format(CLEAR_THRESHOLD))
+            publish_value(value)
+        
+        elif state == NORMAL and previous == RECOVERING:
+            print("✅ Gas Level Normal - system recovered")
+            normal_mode()
+            publish_value(value, force=True)
+            publish_status("NORMAL", "NORMAL")
+        
         else:
-            # Normal mode
-            print("✅ Gas Level Normal")
-            
-            red.off()
-            green.on()
-            buzzer.off()
-            relay.on()
-            set_angle(0)
-            
-            # Publish status
-            mqtt_client.publish(MQTT_TOPIC_STATUS, b"NORMAL")
+            # No transition (or an unconfirmed spike dropping back)
+            publish_value(value)
         
-        # Wait before next reading
-        time.sleep(2)
+        # Read faster near THRESHOLD and while a hit is being confirmed
+        time.sleep(read_interval(value))
         
     except Exception as e:
         print(f"Error: {e}")
@@ -8,7 +8,8 @@ dotenv.config();
 // ==========================================
 // Global State
 // ==========================================
-let gasReading = { value: 0, status: 'NORMAL', timestamp: new Date() };
+let gasReading = { value: 0, ppm: null, status: 'NORMAL', device: null, timestamp: new Date() };
+let devices = {};   // Last reading of every unit, by device id
 let mqttClient = null;
 let systemStatus = 'ON';
 
@@ -26,11 +27,65 @@ const MQTT_CONFIG = {
   reconnectPeriod: 1000
 };
 
+// Topics are per unit: LPG/<device>/gas/value, ... (lib/lpg/topics.py)
 const MQTT_TOPICS = {
-  gas_value: 'LPG/gas/value',
-  gas_status: 'LPG/gas/status',
-  control: 'LPG/system/control'
+  gas_value: 'LPG/+/gas/value',
+  gas_batch: 'LPG/+/gas/batch',
+  gas_sensors: 'LPG/+/gas/sensors',
+  gas_status: 'LPG/+/gas/status'
 };
+const DEVICE_TOPIC = /^LPG\/([0-9a-f]+)\/gas\/(value|batch|sensors|status)$/;
+
+// Control: one unit, a group of units, or every unit
+function controlTopic({ device, group } = {}) {
+  if (device) return `LPG/${device}/system/control`;
+  if (group) return `LPG/group/${group}/system/control`;
+  return 'LPG/all/system/control';
+}
+
+// ==========================================
+// Gas Reading Handler
+// ==========================================
+async function handleGasValue(value, device) {
+  gasReading.value = value;
+  gasReading.device = device;
+  gasReading.timestamp = new Date();
+  devices[device] = { ...devices[device], value, timestamp: gasReading.timestamp };
+
+  // Check if gas leakage is detected (Threshold: 1200)
+  const THRESHOLD = process.env.GAS_THRESHOLD || 1200;
+  if (value > THRESHOLD) {
+    gasReading.status = 'GAS_DETECTED';
+    console.log(`🚨 ALERT TRIGGERED! Gas value ${value} from ${device} exceeds threshold ${THRESHOLD}`);
+    
+    // Send email alerts to all subscribers
+    const subscribers = await getSubscribers();
+    console.log(`📧 Subscribers found: ${subscribers.length}`);
+    console.log(`Subscriber list:`, subscribers);
+    
+    if (subscribers.length > 0) {
+      for (const subscriber of subscribers) {
+        try {
+          await sendAlertEmail(
+            subscriber.email,
+            `⚠️ GAS LEAKAGE DETECTED on detector ${device}! Current Value: ${value} (Threshold: 1200) - IMMEDIATE ACTION REQUIRED!`
+          );
+          console.log(`✓ Alert email sent to ${subscriber.email}`);
+        } catch (emailError) {
+          console.error(`✗ Failed to send alert to ${subscriber.email}:`, emailError.message);
+        }
+      }
+    } else {
+      console.warn('⚠️ No subscribers found for alert');
+    }
+  } else {
+    // Reset to NORMAL if below threshold
+    if (gasReading.status === 'GAS_DETECTED') {
+      console.log(`✅ Gas level returned to normal (${value} < 1200)`);
+      gasReading.status = 'NORMAL';
+    }
+  }
+}
 
 // ==========================================
 // Initialize MQTT Connection
@@ -56,6 +111,8 @@ export function initMQTT() {
     // Subscribe to gas topics
     mqttClient.subscribe([
       MQTT_TOPICS.gas_value,
+      MQTT_TOPICS.gas_batch,
+      MQTT_TOPICS.gas_sensors,
       MQTT_TOPICS.gas_status
     ], (err) => {
       if (err) {
@@ -73,47 +130,36 @@ export function initMQTT() {
     const messageStr = message.toString();
     console.log(`[MQTT] ${topic}: ${messageStr}`);
 
+    const match = DEVICE_TOPIC.exec(topic);
+    if (!match) return;
+    const [, device, leaf] = match;
+
     try {
-      if (topic === MQTT_TOPICS.gas_value) {
-        const value = parseInt(messageStr);
-        gasReading.value = value;
-        gasReading.timestamp = new Date();
-
-        // Check if gas leakage is detected (Threshold: 1200)
-        const THRESHOLD = process.env.GAS_THRESHOLD || 1200;
-        if (value > THRESHOLD) {
-          gasReading.status = 'GAS_DETECTED';
-          console.log(`🚨 ALERT TRIGGERED! Gas value ${value} exceeds threshold ${THRESHOLD}`);
-          
-          // Send email alerts to all subscribers
-          const subscribers = await getSubscribers();
-          console.log(`📧 Subscribers found: ${subscribers.length}`);
-          console.log(`Subscriber list:`, subscribers);
-          
-          if (subscribers.length > 0) {
-            for (const subscriber of subscribers) {
-              try {
-                await sendAlertEmail(
-                  subscriber.email,
-                  `⚠️ GAS LEAKAGE DETECTED! Current Value: ${value} (Threshold: 1200) - IMMEDIATE ACTION REQUIRED!`
-                );
-                console.log(`✓ Alert email sent to ${subscriber.email}`);
-              } catch (emailError) {
-                console.error(`✗ Failed to send alert to ${subscriber.email}:`, emailError.message);
-              }
-            }
-          } else {
-            console.warn('⚠️ No subscribers found for alert');
-          }
-        } else {
-          // Reset to NORMAL if below threshold
-          if (gasReading.status === 'GAS_DETECTED') {
-            console.log(`✅ Gas level returned to normal (${value} < 1200)`);
-            gasReading.status = 'NORMAL';
-          }
+      if (leaf === 'value') {
+        await handleGasValue(parseInt(messageStr), device);
+      } else if (leaf === 'batch') {
+        // {"seq":120,"t":5234000,"dt":[0,500,...],"v":[412,415,...],"ppm":[11,11,...]}
+        const batch = JSON.parse(messageStr);
+        if (Array.isArray(batch.ppm) && batch.ppm.length > 0) {
+          gasReading.ppm = batch.ppm[batch.ppm.length - 1];
         }
-      } else if (topic === MQTT_TOPICS.gas_status) {
+        if (Array.isArray(batch.v) && batch.v.length > 0) {
+          await handleGasValue(batch.v[batch.v.length - 1], device);
+        }
+      } else if (leaf === 'sensors') {
+        // {"t":..,"n":["main","hall"],"v":[412,380],"ppm":[10,8],"a":["NORMAL","NORMAL"]}
+        const snap = JSON.parse(messageStr);
+        if (Array.isArray(snap.n)) {
+          gasReading.sensors = snap.n.map((name, i) => ({
+            name,
+            value: snap.v[i],
+            ppm: snap.ppm ? snap.ppm[i] : null,
+            alarm: snap.a ? snap.a[i] : null
+          }));
+        }
+      } else if (leaf === 'status') {
         gasReading.status = messageStr;
+        devices[device] = { ...devices[device], status: messageStr };
       }
     } catch (error) {
       console.error('Error processing MQTT message:', error);
@@ -143,6 +189,10 @@ export function getGasReading() {
   return gasReading;
 }
 
+export function getDevices() {
+  return devices;
+}
+
 export function getSystemStatus() {
   return systemStatus;
 }
@@ -157,21 +207,22 @@ export function setSystemStatus(status) {
 // ==========================================
 // Publisher Functions
 // ==========================================
-export function publishControl(command) {
+export function publishControl(command, target = {}) {
   if (!mqttClient || !mqttClient.connected) {
     console.error('MQTT client not connected');
     return false;
   }
 
-  mqttClient.publish(MQTT_TOPICS.control, command, (err) => {
+  const topic = controlTopic(target);
+  mqttClient.publish(topic, command, (err) => {
     if (err) {
       console.error('Publish error:', err);
     } else {
-      console.log(`✓ Published control command: ${command}`);
+      console.log(`✓ Published control command: ${command} (${topic})`);
     }
   });
 
   return true;
 }
 
-export default { initMQTT, getGasReading, publishControl };
+export default { initMQTT, getGasReading, getDevices, publishControl };
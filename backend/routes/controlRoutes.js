@@ -8,7 +8,7 @@ const router = express.Router();
 // ==========================================
 router.post('/', (req, res) => {
   try {
-    const { command } = req.body;
+    const { command, device, group } = req.body;
 
     // Validate command - supports all 15+ commands
     const validCommands = [
@@ -23,24 +23,41 @@ router.post('/', (req, res) => {
       // Buzzer commands
       'BUZZER_ON', 'BUZZER_OFF',
       // Scenario commands
-      'ALERT_MODE', 'NORMAL_MODE', 'SERVO_WITH_FAN'
+      'ALERT_MODE', 'NORMAL_MODE', 'SERVO_WITH_FAN',
+      // Diagnostics
+      'DIAG', 'METRICS', 'CALIBRATE', 'STATE', 'SENSORS',
+      // Console / LPG/<device>/system/log verbosity
+      'LOG_DEBUG', 'LOG_INFO', 'LOG_WARN', 'LOG_ERROR'
     ];
     
-    if (!validCommands.includes(command)) {
+    // Any vent angle: SERVO_0 ... SERVO_180
+    const servoAngle = /^SERVO_(\d{1,3})$/.exec(command || '');
+    const validAngle = servoAngle && Number(servoAngle[1]) <= 180;
+
+    if (!validCommands.includes(command) && !validAngle) {
+      return res.status(400).json({
+        success: false,
+        error: `Invalid command. Valid commands: ${validCommands.join(', ')}, SERVO_<0-180>`
+      });
+    }
+
+    // One detector, a group, or (default) every detector
+    if ((device && !/^[0-9a-f]+$/.test(device)) || (group && !/^[\w-]+$/.test(group))) {
       return res.status(400).json({
         success: false,
-        error: `Invalid command. Valid commands: ${validCommands.join(', ')}`
+        error: 'Invalid target. device: hex unit id, group: letters, digits, _ or -'
       });
     }
 
     // Publish to MQTT
-    publishControl(command);
+    publishControl(command, { device, group });
     setSystemStatus(command);
 
     res.json({
       success: true,
       message: `Control command '${command}' sent successfully`,
       command: command,
+      target: device || (group ? `group/${group}` : 'all'),
       timestamp: new Date()
     });
   } catch (error) {
@@ -1,5 +1,5 @@
 import express from 'express';
-import { getGasReading } from '../mqtt/mqttClient.js';
+import { getGasReading, getDevices } from '../mqtt/mqttClient.js';
 
 const router = express.Router();
 
@@ -22,4 +22,22 @@ router.get('/latest', (req, res) => {
   }
 });
 
+// ==========================================
+// GET /api/gas/devices
+// ==========================================
+router.get('/devices', (req, res) => {
+  try {
+    res.json({
+      success: true,
+      data: getDevices(),
+      message: 'Latest reading of every detector retrieved successfully'
+    });
+  } catch (error) {
+    res.status(500).json({
+      success: false,
+      error: error.message
+    });
+  }
+});
+
 export default router;
@@ -0,0 +1,2 @@
+# Simulator-driven benchmarks; run from the repository root, e.g.
+#   python -m bench.runtime_latency
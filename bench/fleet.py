@@ -0,0 +1,677 @@
+"""
+Fleet load test: thousands of virtual detectors against one broker.
+
+Every virtual detector runs the firmware's detection path from lib/lpg
+(GasFilter -> Slope -> Alarm, Pacer, ExceptionReporter, Batcher, frames,
+Outputs scenes, per-device topics) on its own simulated ADC trace, and
+speaks MQTT to the simulator's broker stand-in over the wire format, with
+the firmware's cadence: inbox polled every MQTT_POLL_MS, detection and
+telemetry paced as in lib/lpg/app.py. lib/lpg/app.py sets up hardware
+when imported, so the glue between those modules (check_gas,
+handle_command, the modes) is restated in VirtualDetector, which lists
+what it covers. The hardware timer, uasyncio and WiFi are left out, so
+one process carries hundreds of units.
+
+The backend stand-in subscribes to LPG/+/gas/# and LPG/+/system/log and
+sends STATE to random units at --cmd-rate (and to LPG/all every
+--broadcast-s); a unit's `STATE ...` reply on its log topic closes the
+round trip. Most units sit in clean air; --leak-pct of them see a leak
+ramp, alarm and recover.
+
+The broker serves --broker-rate messages/s with at most --broker-queue
+waiting; beyond that it drops the message, as a saturated broker would.
+
+The fleet is split into one slice per worker process (asyncio drives a
+process pool). Each slice runs its units on one shared virtual clock
+against its own broker stand-in sized to the slice's share of the units
+(share x --broker-rate, share x --broker-queue), so the slices add up to
+one broker. Units draw their traces from their own seeded streams and
+the backend's commands follow one fleet-wide schedule, so for a given
+--seed the traffic is the same whatever --workers is; only queueing
+inside the broker (rtt, queue peak, and drops once saturated) sees the
+split. Reported:
+
+    throughput      messages / bytes per virtual second, up and delivered
+    rtt_*_ms        backend publishes STATE -> reply reaches the backend
+    lost_*          device publishes / commands that never arrived, and
+                    messages the broker dropped (queue full)
+    wall_s          host time for the run (simulated msgs per wall second)
+
+    python -m bench.fleet [--devices 1000] [--seconds 120] [--workers N]
+                          [--cmd-rate 10] [--broadcast-s 60] [--leak-pct 5]
+                          [--broker-rate 20000] [--broker-queue 10000]
+                          [--latency-ms 40] [--seed 1] [--json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulator import Broker, Link, VirtualClock, signals
+from simulator.broker import encode_length, encode_publish
+from simulator.simulation import LIB_DIR
+
+sys.path.insert(0, LIB_DIR)     # lpg modules, as on the board
+
+from lpg import frame                                                # noqa: E402
+from lpg.alarm import Alarm, ALARM, NORMAL, RECOVERING               # noqa: E402
+from lpg.batcher import Batcher                                      # noqa: E402
+from lpg.filters import GasFilter, Slope                             # noqa: E402
+from lpg.outputs import Outputs, KEEP, RELAY, SERVO, BUZZER          # noqa: E402
+from lpg.pacer import Pacer                                          # noqa: E402
+from lpg.report import ExceptionReporter                             # noqa: E402
+from lpg.servo import Motion, duty_table, parse_angle                # noqa: E402
+from lpg.topics import ROOT, BROADCAST, CONTROL, control_topics, device_id, topic  # noqa: E402
+
+# Firmware settings, as in lib/lpg/app.py (keep in step with it)
+THRESHOLD = 1200
+CLEAR_THRESHOLD = 1000
+CONFIRM_N = 2
+CONFIRM_M = 3
+HOLD_MS = 10000
+RECOVER_MS = 5000
+RISE_LIMIT = 150
+RISE_FLOOR = 700
+RISE_WINDOW = 8
+RISE_MIN_SPAN_MS = 500
+MEDIAN_WINDOW = 5
+EMA_SHIFT = 3
+SAMPLE_RATE_HZ = 100
+SAMPLE_RATE_MIN_HZ = 20
+DETECT_INTERVAL_MS = 100
+DETECT_INTERVAL_MAX_MS = 400
+TELEMETRY_INTERVAL_MS = 500
+TELEMETRY_INTERVAL_MAX_MS = 2000
+BATCH_SIZE = 20
+BATCH_WINDOW_MS = 10000
+MQTT_POLL_MS = 100
+PACE_FAR = 600
+PACE_LEAD_MS = 5000
+PACE_WAKE = 700
+DEADBAND = 25
+HEARTBEAT_MS = 60000
+SERVO_DUTY = (38, 77, 115)
+
+SCENE_NORMAL = (1, KEEP, 0, 0, 1)
+SCENE_ALERT = (0, KEEP, 1, 1, 0)
+SCENE_OFF = (0, KEEP, 0, 0, 0)
+
+BOOT_S = 5.0            # units power up spread over this window
+DRAIN_S = 5.0           # after the run: in-flight messages and replies land
+NOISE_SIGMA = 40
+
+BROADCAST_CONTROL = f"{ROOT}/{BROADCAST}/{CONTROL}"
+BACKEND_TOPICS = ('LPG/+/gas/#', 'LPG/+/system/log')
+
+
+# ==========================================
+# Broker stand-in with a finite capacity
+# ==========================================
+class FleetBroker(Broker):
+    """
+    Broker that routes one message per `route_us` (a float, so a small
+    share of a slow broker keeps its exact rate) and holds at most
+    `queue_max` waiting; a message arriving to a full queue is dropped.
+    Routing (and so delivery) waits its turn, so queueing shows up in
+    latency before it shows up as drops.
+    """
+
+    def __init__(self, clock, link, route_us, queue_max):
+        super().__init__(clock, link)
+        self.route_us = route_us
+        self.queue_max = queue_max
+        self.queued = 0
+        self.queue_peak = 0
+        self.dropped = 0
+        self.free_us = 0
+
+    def _route(self, topic, payload, sender, retain=False):
+        if self.queued >= self.queue_max:
+            self.dropped += 1
+            return
+        now = self.clock.now_us
+        self.free_us = (self.free_us if self.free_us > now else now) + self.route_us
+        self.queued += 1
+        if self.queued > self.queue_peak:
+            self.queue_peak = self.queued
+        self.clock.call_at(self.free_us, self._routed, topic, payload, sender, retain)
+
+    def _routed(self, topic, payload, sender, retain):
+        self.queued -= 1
+        Broker._route(self, topic, payload, sender, retain)
+
+
+# ==========================================
+# MQTT wire format (QoS 0, what the firmware uses)
+# ==========================================
+def _string(text):
+    data = text.encode()
+    return len(data).to_bytes(2, 'big') + data
+
+
+def connect_packet(client_id, keepalive=60):
+    body = _string('MQTT') + b'\x04\x02' + keepalive.to_bytes(2, 'big') + _string(client_id)
+    return b'\x10' + encode_length(len(body)) + body
+
+
+def subscribe_packet(pid, topics):
+    body = pid.to_bytes(2, 'big') + b''.join(_string(t) + b'\x00' for t in topics)
+    return b'\x82' + encode_length(len(body)) + body
+
+
+def split_publishes(buf):
+    """Remove complete packets from buf; [(topic, payload)] of the PUBLISHes"""
+    out = []
+    while len(buf) >= 2:
+        length = 0
+        shift = 0
+        i = 1
+        while i < len(buf):
+            byte = buf[i]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            i += 1
+            if not byte & 0x80:
+                break
+        else:
+            break
+        if len(buf) < i + length:
+            break
+        if buf[0] >> 4 == 3:
+            tlen = int.from_bytes(buf[i:i + 2], 'big')
+            out.append((bytes(buf[i + 2:i + 2 + tlen]).decode(),
+                        bytes(buf[i + 2 + tlen:i + length])))
+        del buf[:i + length]
+    return out
+
+
+class _Pin:
+    """Output pin that goes nowhere (Outputs only needs value() / duty())"""
+
+    def value(self, v=None):
+        pass
+
+    def duty(self, d=None):
+        pass
+
+
+# ==========================================
+# One virtual detector
+# ==========================================
+class VirtualDetector:
+    """
+    Firmware detection, telemetry and command handling for one unit, as
+    lib/lpg/app.py does them for the MQ-2 channel:
+
+        check_gas       ALARM -> alert_mode + frame + batch + GAS_DETECTED,
+                        RECOVERING -> NORMAL -> normal_mode + NORMAL
+        commands        ON, OFF, RELAY_ON/OFF, SERVO_<n>, LED_GREEN/RED/OFF,
+                        BUZZER_ON/OFF, ALERT_MODE, NORMAL_MODE, STATE
+
+    Not modelled (no traffic from them): TEST, SERVO_WITH_FAN, CALIBRATE,
+    DIAG, METRICS, SENSORS, LOG_<level>; the periodic metrics snapshot;
+    extra sensor channels; log lines the firmware sends to system/log
+    through its logger (command acknowledgements, alarm transitions).
+    The servo jumps to its target, the sequencer is absent, and unknown
+    commands are ignored.
+    """
+
+    def __init__(self, fleet, uid, signal):
+        self.fleet = fleet
+        self.clock = fleet.clock
+        self.signal = signal
+        self.device = device_id(uid)
+        self.client_id = 'esp32-gas-detector-' + self.device
+        self.topic_batch = topic(self.device, 'gas/batch')
+        self.topic_frame = topic(self.device, 'gas/frame')
+        self.topic_status = topic(self.device, 'gas/status')
+        self.topic_log = topic(self.device, 'system/log')
+        self.topics_control = control_topics(self.device)
+
+        self.gas_filter = GasFilter(MEDIAN_WINDOW, EMA_SHIFT)
+        self.slope = Slope(RISE_WINDOW, RISE_MIN_SPAN_MS)
+        self.alarm = Alarm(THRESHOLD, CLEAR_THRESHOLD, CONFIRM_N, CONFIRM_M, HOLD_MS,
+                           RECOVER_MS, RISE_LIMIT, RISE_FLOOR)
+        self.pacer = Pacer(THRESHOLD, PACE_FAR, PACE_LEAD_MS)
+        self.reporter = ExceptionReporter(DEADBAND, HEARTBEAT_MS)
+        self.batcher = Batcher(BATCH_SIZE, BATCH_WINDOW_MS)
+        self.framer = frame.FrameEncoder(uid)
+        self.outputs = Outputs(_Pin(), _Pin(), _Pin(), _Pin(), _Pin())
+        self.vent = Motion(lambda duty: self.outputs.set(SERVO, duty),
+                           duty_table(*SERVO_DUTY), speed_dps=0)
+        self.system_on = True
+        self.alert_active = False
+        self.rate_hz = SAMPLE_RATE_HZ
+        self.detect_ms = DETECT_INTERVAL_MS
+        self.telemetry_ms = TELEMETRY_INTERVAL_MS
+        self.raw = 0
+        self.value = 0
+
+        self.session = None
+        self.rx = bytearray()
+        self.sent = 0
+        self.bytes_sent = 0
+        self.last_detect_us = 0
+        self.detect_due_us = 0
+        self.telemetry_due_us = 0
+
+    # ------------------------------------------
+    # MQTT
+    # ------------------------------------------
+    def boot(self):
+        """Power up: outputs off, connect, subscribe, SYSTEM_READY"""
+        self.outputs.apply(SCENE_OFF)
+        self.session = self.fleet.broker.open_session()
+        self.session.send_up(connect_packet(self.client_id))
+        self.session.send_up(subscribe_packet(1, self.topics_control))
+        self.normal_mode()
+        self.publish(self.topic_status, b'SYSTEM_READY')
+        now = self.clock.now_us
+        self.last_detect_us = now
+        self.detect_due_us = now
+        self.telemetry_due_us = now + TELEMETRY_INTERVAL_MS * 1000
+        self.clock.call_later(MQTT_POLL_MS * 1000, self.tick)
+
+    def publish(self, topic_str, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        packet = encode_publish(topic_str, payload)
+        self.session.send_up(packet)
+        self.sent += 1
+        self.bytes_sent += len(packet)
+
+    def poll(self):
+        session = self.session
+        if session.pending():
+            self.rx += session.take(session.pending())
+            for topic_str, payload in split_publishes(self.rx):
+                if topic_str in self.topics_control:
+                    self.handle_command(payload.decode())
+
+    # ------------------------------------------
+    # Main loop: one callback per MQTT_POLL_MS
+    # ------------------------------------------
+    def tick(self):
+        now = self.clock.now_us
+        self.poll()
+        if self.fleet.running:
+            if now >= self.detect_due_us:
+                self.detect(now)
+            elif (self.detect_ms > DETECT_INTERVAL_MS
+                  and self.signal(now / 1e6) > PACE_WAKE):
+                # Glance at the newest sample, as detect_task's relaxed wait does
+                self.pacer.wake()
+                self.detect(now)
+            if now >= self.telemetry_due_us:
+                self.telemetry(now)
+        self.clock.call_later(MQTT_POLL_MS * 1000, self.tick)
+
+    def detect(self, now):
+        """Drain the samples taken since the last pass, filter, check, pace"""
+        n = (now - self.last_detect_us) * self.rate_hz // 1_000_000
+        if n < 1:
+            n = 1
+        step_s = 1 / self.rate_hz
+        t = now / 1e6
+        gas_filter = self.gas_filter
+        signal = self.signal
+        for i in range(n - 1, -1, -1):
+            raw = int(signal(t - i * step_s))       # 12-bit ADC, as Device.read_adc
+            gas_filter.update(0 if raw < 0 else 4095 if raw > 4095 else raw)
+        self.raw = gas_filter.raw
+        self.value = gas_filter.value
+        now_ms = now // 1000
+        self.slope.update(self.value, now_ms)
+        if self.system_on:
+            self.check_gas(self.value, now_ms)
+        pacer = self.pacer
+        pacer.update(self.value, self.slope.rate)
+        hz = pacer.scale(SAMPLE_RATE_HZ, SAMPLE_RATE_MIN_HZ) // 10 * 10
+        self.rate_hz = hz if hz > SAMPLE_RATE_MIN_HZ else SAMPLE_RATE_MIN_HZ
+        self.detect_ms = pacer.scale(DETECT_INTERVAL_MS, DETECT_INTERVAL_MAX_MS)
+        self.telemetry_ms = pacer.scale(TELEMETRY_INTERVAL_MS, TELEMETRY_INTERVAL_MAX_MS)
+        self.last_detect_us = now
+        self.detect_due_us = now + self.detect_ms * 1000
+
+    def check_gas(self, value, now_ms):
+        state = self.alarm.update(value, now_ms, self.slope.rate)
+        if state is None:
+            return
+        if state == ALARM and self.alarm.previous != RECOVERING:
+            self.alert_mode()
+            self.add_reading(value, now_ms)
+            self.reporter.force(value, now_ms)
+            self.flush_batch()
+            self.publish(self.topic_status, f"GAS_DETECTED - Value: {value} - EMERGENCY")
+        elif state == NORMAL and self.alarm.previous == RECOVERING:
+            self.normal_mode()
+            self.add_reading(value, now_ms)
+            self.reporter.force(value, now_ms)
+            self.flush_batch()
+            self.publish(self.topic_status, b'NORMAL')
+
+    def telemetry(self, now):
+        now_ms = now // 1000
+        if self.reporter.update(self.value, now_ms):
+            self.add_reading(self.value, now_ms)
+        if self.batcher.due(now_ms):
+            self.flush_batch()
+        self.telemetry_due_us = now + self.telemetry_ms * 1000
+
+    def add_reading(self, value, now_ms):
+        full = self.batcher.add(value, now_ms)
+        self.publish(self.topic_frame,
+                     self.framer.encode(now_ms, self.raw, value, self.state_flags()))
+        if full:
+            self.flush_batch()
+
+    def flush_batch(self):
+        payload = self.batcher.flush()
+        if payload is not None:
+            self.publish(self.topic_batch, payload)
+
+    def state_flags(self):
+        flags = 0
+        if self.alert_active:
+            flags |= frame.FLAG_ALERT
+        if self.system_on:
+            flags |= frame.FLAG_SYSTEM_ON
+        if self.outputs.get(RELAY):
+            flags |= frame.FLAG_VALVE_OPEN
+        return flags
+
+    # ------------------------------------------
+    # Actuators and commands
+    # ------------------------------------------
+    def alert_mode(self):
+        self.alert_active = True
+        self.outputs.apply(SCENE_ALERT)
+        self.vent.move(90)
+
+    def normal_mode(self):
+        self.alert_active = False
+        self.vent.move(0)
+        self.outputs.apply(SCENE_NORMAL)
+
+    def handle_command(self, command):
+        if command == 'ON':
+            self.normal_mode()
+            self.alarm.reset(self.clock.now_us // 1000)
+        elif command == 'OFF':
+            # As all_off(): outputs and vent only, detection keeps running
+            self.outputs.apply(SCENE_OFF)
+            self.vent.move(0)
+        elif command == 'RELAY_ON':
+            self.outputs.set(RELAY, 1)
+        elif command == 'RELAY_OFF':
+            self.outputs.set(RELAY, 0)
+        elif command.startswith('SERVO_') and parse_angle(command[6:]) is not None:
+            self.vent.move(parse_angle(command[6:]))
+        elif command == 'LED_GREEN':
+            self.outputs.apply((KEEP, KEEP, KEEP, 0, 1))
+        elif command == 'LED_RED':
+            self.outputs.apply((KEEP, KEEP, KEEP, 1, 0))
+        elif command == 'LED_OFF':
+            self.outputs.apply((KEEP, KEEP, KEEP, 0, 0))
+        elif command == 'BUZZER_ON':
+            self.outputs.set(BUZZER, 1)
+        elif command == 'BUZZER_OFF':
+            self.outputs.set(BUZZER, 0)
+        elif command == 'ALERT_MODE':
+            self.alert_mode()
+        elif command == 'NORMAL_MODE':
+            self.normal_mode()
+            self.alarm.reset(self.clock.now_us // 1000)
+        elif command == 'STATE':
+            self.publish(self.topic_log,
+                         f"STATE {self.outputs.report()} angle={self.vent.angle}")
+
+
+# ==========================================
+# One slice of the fleet (runs in a worker process)
+# ==========================================
+class Fleet:
+    """Units first..first+count-1 and a backend stand-in on one virtual clock"""
+
+    def __init__(self, clock, first, count, opts, share):
+        self.clock = clock
+        link = Link(latency_ms=opts['latency_ms'])
+        # This slice carries `share` of the units, so it gets that share of
+        # the broker: share x the rate (a longer route time) and share x the queue
+        self.broker = FleetBroker(self.clock, link,
+                                  1_000_000 / (opts['broker_rate'] * share),
+                                  max(1, round(opts['broker_queue'] * share)))
+        # One stream for the backend's picks and one per unit, all keyed by
+        # the seed and fleet-wide indices: slicing cannot change the fleet
+        self.rng = random.Random(opts['seed'])
+        self.first = first
+        self.running = True
+        self.units = {}
+        self.pending = {}       # device -> [publish times of unanswered STATE]
+        self.rtt_us = []
+        self.commands = 0
+        self.received = 0
+        self.bytes_received = 0
+        self.alerts = 0
+
+        seconds = opts['seconds']
+        leak_pct = opts['leak_pct']
+        for i in range(first, first + count):
+            uid = b'\x24\x6f\x28' + i.to_bytes(3, 'big')
+            rng = random.Random(f"{opts['seed']}/{i}")
+            base = rng.randint(350, 450)
+            if rng.random() * 100 < leak_pct:
+                start = rng.uniform(BOOT_S + 10, max(BOOT_S + 10, seconds - 30))
+                clean = signals.ramp(base, rng.randint(1400, 2200), start=start,
+                                     duration=rng.uniform(3, 40), until=start + 30)
+            else:
+                clean = signals.constant(base)
+            signal = signals.noisy(clean, sigma=NOISE_SIGMA, spike_rate=0.002,
+                                   seed=opts['seed'] + i)
+            unit = VirtualDetector(self, uid, signal)
+            self.units[unit.device] = unit
+            self.pending[unit.device] = []
+            self.clock.call_at(int(rng.uniform(0, BOOT_S) * 1_000_000), unit.boot)
+
+        for pattern in BACKEND_TOPICS:
+            self.broker.subscribe(pattern, self.on_message)
+
+        self.devices = list(self.units)
+        # Every slice walks the whole fleet's command schedule and sends the
+        # commands addressed to its own units
+        self.fleet_size = opts['devices']
+        rate = opts['cmd_rate']
+        self.cmd_us = int(1_000_000 / rate) if rate > 0 else 0
+        if self.cmd_us:
+            self.clock.call_at(int(BOOT_S * 1_000_000) + self.cmd_us, self.send_command)
+        if opts['broadcast_s'] > 0:
+            t = BOOT_S + opts['broadcast_s']
+            while t < seconds:
+                self.clock.call_at(int(t * 1_000_000), self.broadcast)
+                t += opts['broadcast_s']
+
+    # backend -> units
+    def send_command(self):
+        if not self.running:
+            return
+        self.clock.call_later(self.cmd_us, self.send_command)
+        i = self.rng.randrange(self.fleet_size) - self.first
+        if not 0 <= i < len(self.devices):
+            return
+        device = self.devices[i]
+        self.pending[device].append(self.clock.now_us)
+        self.commands += 1
+        self.broker.publish(topic(device, CONTROL), b'STATE')
+
+    def broadcast(self):
+        now = self.clock.now_us
+        for device in self.devices:
+            self.pending[device].append(now)
+        self.commands += len(self.devices)
+        self.broker.publish(BROADCAST_CONTROL, b'STATE')
+
+    # units -> backend
+    def on_message(self, msg):
+        self.received += 1
+        self.bytes_received += len(msg.topic) + len(msg.payload)
+        device = msg.topic.split('/', 2)[1]
+        if msg.topic.endswith('/system/log'):
+            if msg.payload.startswith(b'STATE ') and self.pending[device]:
+                self.rtt_us.append(msg.t_us - self.pending[device].pop(0))
+        elif msg.topic.endswith('/gas/status') and msg.payload.startswith(b'GAS_DETECTED'):
+            self.alerts += 1
+
+    def run(self, seconds):
+        self.clock.sleep_until(int(seconds * 1_000_000))
+        self.running = False        # units stop sampling; commands still answered
+        self.clock.sleep_until(self.clock.now_us + int(DRAIN_S * 1_000_000))
+        units = self.units.values()
+        return {
+            'devices': len(self.units),
+            'sent': sum(u.sent for u in units),
+            'bytes_up': sum(u.bytes_sent for u in units),
+            'received': self.received,
+            'bytes_received': self.bytes_received,
+            'commands': self.commands,
+            'replies': len(self.rtt_us),
+            'rtt_us': self.rtt_us,
+            'alerts': self.alerts,
+            'broker_dropped': self.broker.dropped,
+            'broker_queue_peak': self.broker.queue_peak,
+            'bytes_down': self.broker.bytes_down,
+        }
+
+
+def run_slice(first, count, opts, share):
+    """Worker process entry: simulate one slice, return its counters"""
+    clock = VirtualClock()
+    # lpg modules read time.ticks_*: point them at this slice's clock
+    time.ticks_ms = clock.ticks_ms
+    time.ticks_us = clock.ticks_us
+    time.ticks_add = clock.ticks_add
+    time.ticks_diff = clock.ticks_diff
+    cpu = time.process_time()
+    result = Fleet(clock, first, count, opts, share).run(opts['seconds'])
+    result['cpu_s'] = time.process_time() - cpu
+    return result
+
+
+# ==========================================
+# Whole fleet
+# ==========================================
+async def run_fleet(opts):
+    devices = opts['devices']
+    workers = max(1, min(opts['workers'], devices))
+    loop = asyncio.get_running_loop()
+    per, extra = divmod(devices, workers)
+    slices = []
+    first = 0
+    for w in range(workers):
+        count = per + (1 if w < extra else 0)
+        slices.append((first, count))
+        first += count
+    with ProcessPoolExecutor(workers) as pool:
+        jobs = [loop.run_in_executor(pool, run_slice, first, count, opts, count / devices)
+                for first, count in slices]
+        return await asyncio.gather(*jobs)
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    i = (len(sorted_values) * p + 99) // 100 - 1
+    return sorted_values[max(0, min(i, len(sorted_values) - 1))]
+
+
+def summarize(results, opts, wall_s):
+    total = lambda key: sum(r[key] for r in results)
+    seconds = opts['seconds']
+    rtt = sorted(us / 1000 for r in results for us in r['rtt_us'])
+    ms = lambda v: None if v is None else round(v, 1)
+    sent = total('sent')
+    received = total('received')
+    return {
+        'devices': total('devices'),
+        'workers': len(results),
+        'virtual_s': seconds,
+        'wall_s': round(wall_s, 2),
+        'cpu_s': round(total('cpu_s'), 2),
+        'up_msgs_per_s': round(sent / seconds, 1),
+        'up_bytes_per_s': round(total('bytes_up') / seconds),
+        'delivered_msgs_per_s': round(received / seconds, 1),
+        'down_bytes_per_s': round(total('bytes_down') / seconds),
+        'sim_msgs_per_wall_s': round(sent / wall_s) if wall_s else None,
+        'commands': total('commands'),
+        'rtt_p50_ms': ms(_percentile(rtt, 50)),
+        'rtt_p90_ms': ms(_percentile(rtt, 90)),
+        'rtt_p99_ms': ms(_percentile(rtt, 99)),
+        'rtt_max_ms': ms(rtt[-1] if rtt else None),
+        'lost_publishes': sent - received,
+        'lost_commands': total('commands') - total('replies'),
+        'broker_dropped': total('broker_dropped'),
+        'broker_queue_peak': total('broker_queue_peak'),
+        'alerts': total('alerts'),
+    }
+
+
+def print_summary(s):
+    print(f"fleet      {s['devices']} devices, {s['workers']} workers, "
+          f"{s['virtual_s']} s virtual in {s['wall_s']} s wall ({s['cpu_s']} CPU s)")
+    print(f"publish    {s['up_msgs_per_s']} msg/s up ({s['up_bytes_per_s']} B/s), "
+          f"{s['delivered_msgs_per_s']} msg/s delivered, {s['down_bytes_per_s']} B/s down, "
+          f"{s['sim_msgs_per_wall_s']} simulated msg per wall s")
+    print(f"commands   {s['commands']} STATE, rtt p50 {s['rtt_p50_ms']} / "
+          f"p90 {s['rtt_p90_ms']} / p99 {s['rtt_p99_ms']} / max {s['rtt_max_ms']} ms")
+    print(f"drops      {s['lost_publishes']} publishes, {s['lost_commands']} commands, "
+          f"{s['broker_dropped']} at the broker (queue peak {s['broker_queue_peak']})")
+    print(f"alerts     {s['alerts']} GAS_DETECTED")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench.fleet')
+    parser.add_argument('--devices', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=120.0,
+                        help='virtual seconds simulated')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--cmd-rate', type=float, default=10.0,
+                        help='unicast STATE commands per second, whole fleet')
+    parser.add_argument('--broadcast-s', type=float, default=60.0,
+                        help='STATE to LPG/all this often (0: never)')
+    parser.add_argument('--leak-pct', type=float, default=5.0,
+                        help='share of units that see a leak')
+    parser.add_argument('--broker-rate', type=float, default=20000.0,
+                        help='messages per second the broker routes')
+    parser.add_argument('--broker-queue', type=int, default=10000,
+                        help='messages waiting at the broker before it drops')
+    parser.add_argument('--latency-ms', type=float, default=40.0,
+                        help='one-way unit <-> broker latency')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+    if args.devices < 1 or args.seconds <= BOOT_S:
+        parser.error(f'need --devices >= 1 and --seconds > {BOOT_S}')
+
+    opts = {
+        'devices': args.devices, 'seconds': args.seconds, 'workers': args.workers,
+        'cmd_rate': args.cmd_rate, 'broadcast_s': args.broadcast_s,
+        'leak_pct': args.leak_pct, 'broker_rate': args.broker_rate,
+        'broker_queue': args.broker_queue, 'latency_ms': args.latency_ms,
+        'seed': args.seed,
+    }
+    wall = time.perf_counter()
+    results = asyncio.run(run_fleet(opts))
+    summary = summarize(results, opts, time.perf_counter() - wall)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Latency of the uasyncio runtime vs the legacy sleep-driven loop.
+
+The baseline is bench/legacy/ESP32_CLEAN.py, a frozen copy of ESP32_CLEAN.py
+as it was before the runtime work: the original `while True` /
+time.sleep(0.1) loop with blocking umqtt and the shared LPG/... topics. The
+live ESP32_CLEAN.py has since gained the MQTT link, fast WiFi join and
+per-device topics, so it is no longer that baseline. Each scenario is
+repeated at several phase offsets against the 2 s sampling cadence.
+
+    python -m bench.runtime_latency [--json]
+"""
+
+import argparse
+import json
+import os
+
+from simulator import Simulation, signals
+from simulator.simulation import CONTROL_TOPIC
+
+LEGACY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'legacy', 'ESP32_CLEAN.py')
+ASYNC = 'ESP32_COMPLETE_FIRMWARE.py'
+
+# Firmware -> (control, status, log) topics
+TOPICS = {
+    os.path.basename(LEGACY): ('LPG/system/control', 'LPG/gas/status', 'LPG/system/log'),
+    ASYNC: (CONTROL_TOPIC, 'LPG/+/gas/status', 'LPG/+/system/log'),
+}
+
+# The command acknowledgement is an INFO log line; the firmware only
+# publishes WARN and above unless told otherwise
+CONFIG = {ASYNC: {'LOG_REMOTE_LEVEL': "'INFO'"}}
+
+GPIO_RELAY = 33
+RELAY_OFF_ACK = b'Relay OFF (Gas valve CLOSED)'
+
+T0 = 30.0
+OFFSETS = [i * 0.25 for i in range(8)]
+
+
+def _status_after(run, since_s):
+    for msg in run.published(TOPICS[os.path.basename(run.firmware)][1]):
+        if msg.t_us >= since_s * 1e6 and msg.payload.startswith(b'GAS_DETECTED'):
+            return (msg.t_us - since_s * 1e6) / 1000
+    return None
+
+
+def _ack_after(run, since_s):
+    for msg in run.published(TOPICS[os.path.basename(run.firmware)][2]):
+        if msg.t_us >= since_s * 1e6 and msg.payload == RELAY_OFF_ACK:
+            return (msg.t_us - since_s * 1e6) / 1000
+    return None
+
+
+def _simulation(firmware, signal=None):
+    return Simulation(signal=signal, config=CONFIG.get(os.path.basename(firmware)))
+
+
+def leak_idle(firmware, offset):
+    leak = T0 + offset
+    sim = _simulation(firmware, signals.step(400, 1800, at=leak))
+    run = sim.run(firmware, leak + 15)
+    return _status_after(run, leak)
+
+
+def leak_during_test(firmware, offset):
+    leak = T0 + 0.5 + offset
+    sim = _simulation(firmware, signals.step(400, 1800, at=leak))
+    sim.command(T0, 'TEST', TOPICS[os.path.basename(firmware)][0])
+    run = sim.run(firmware, leak + 15)
+    return _status_after(run, leak)
+
+
+def relay_off_during_test(firmware, offset):
+    cmd = T0 + 0.5 + offset
+    sim = _simulation(firmware)
+    sim.command(T0, 'TEST', TOPICS[os.path.basename(firmware)][0])
+    sim.command(cmd, 'RELAY_OFF', TOPICS[os.path.basename(firmware)][0])
+    run = sim.run(firmware, cmd + 15)
+    closed = run.trace.level_at('pin', GPIO_RELAY, run.sim.clock.now_us) == 0
+    return _ack_after(run, cmd), closed
+
+
+def _stats(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return {'mean_ms': None, 'max_ms': None}
+    return {'mean_ms': round(sum(values) / len(values), 1), 'max_ms': round(max(values), 1)}
+
+
+def measure(firmware):
+    relay = [relay_off_during_test(firmware, o) for o in OFFSETS]
+    return {
+        'leak_idle': _stats([leak_idle(firmware, o) for o in OFFSETS]),
+        'leak_during_test': _stats([leak_during_test(firmware, o) for o in OFFSETS]),
+        'relay_off_during_test': _stats([ack for ack, _ in relay]),
+        'relay_stays_closed': sum(1 for _, closed in relay if closed) / len(relay),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench.runtime_latency')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    results = {'legacy_loop': measure(LEGACY), 'uasyncio': measure(ASYNC)}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print("{:<32} {:>22} {:>22}".format('scenario', 'legacy loop', 'uasyncio'))
+    for key in ('leak_idle', 'leak_during_test', 'relay_off_during_test'):
+        cells = []
+        for name in ('legacy_loop', 'uasyncio'):
+            st = results[name][key]
+            cells.append("{} / {} ms".format(st['mean_ms'], st['max_ms']))
+        print("{:<32} {:>22} {:>22}".format(key + ' (mean/max)', *cells))
+    print("{:<32} {:>22} {:>22}".format(
+        'relay stays closed', results['legacy_loop']['relay_stays_closed'],
+        results['uasyncio']['relay_stays_closed']))
+
+
+if __name__ == '__main__':
+    main()
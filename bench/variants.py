@@ -0,0 +1,322 @@
+"""
+All four firmware variants on identical gas traces.
+
+ESP32_main.py and ESP32_THONNY_CODE.py poll every 2 s and sleep 10 s after
+an alert, ESP32_CLEAN.py polls every 100 ms, ESP32_COMPLETE_FIRMWARE.py
+samples from a timer under uasyncio. Each scenario feeds every variant the
+same signal (and the same control messages) at several phase offsets and
+reports one row per variant and scenario:
+
+    detect_*_ms     threshold crossing -> GAS_DETECTED status at the broker
+                    (negative: the rise-rate check tripped before the
+                    signal reached THRESHOLD)
+    valve_*_ms      threshold crossing -> relay (gas valve) closed
+    missed          fraction of runs with no detection within DETECT_WINDOW_S
+    alerts          GAS_DETECTED messages per run (false alarms in noise_only)
+    cmd_*_ms        TEST published -> buzzer on (command scenario)
+    *_per_h         messages / bytes / console bytes per simulated hour
+    cpu_s_per_h     host CPU seconds per simulated hour (firmware work in
+                    CPython: compare variants, not absolute device load)
+
+--set NAME=VALUE overrides a firmware setting through config.py on the
+simulated board (ESP32_COMPLETE_FIRMWARE.py only; the single-file variants
+have no config import), e.g. --set RISE_LIMIT=0 for the threshold-only
+detector.
+
+Recorded traces (CSV of `seconds,adc`, see simulator.signals.recorded) are
+added with --trace and run as scenario `trace:<file name>`.
+
+    python -m bench.variants [--json] [--csv bench/results/variants.csv]
+                             [--trace FILE.csv] [--compare bench/results/variants.csv]
+                             [--set NAME=VALUE]
+
+--compare exits with status 1 if a tracked column got worse than the
+baseline by more than the tolerance; CPU time is reported but not compared.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+from simulator import Simulation, signals
+
+VARIANTS = ('ESP32_main.py', 'ESP32_THONNY_CODE.py', 'ESP32_CLEAN.py',
+            'ESP32_COMPLETE_FIRMWARE.py')
+
+THRESHOLD = 1200
+GPIO_RELAY = 33
+GPIO_BUZZER = 27
+TOPIC_STATUS = 'LPG/+/gas/status'
+
+T0 = 30.0                       # leak / command time, after boot and connect
+RUN_AFTER_S = 150.0             # virtual seconds simulated after T0
+DETECT_WINDOW_S = 60.0
+OFFSETS = [i * 0.25 for i in range(8)]
+
+COLUMNS = ('variant', 'scenario', 'runs', 'detect_mean_ms', 'detect_max_ms',
+           'missed', 'valve_mean_ms', 'valve_max_ms', 'alerts', 'cmd_mean_ms',
+           'cmd_max_ms', 'msgs_per_h', 'bytes_up_per_h', 'bytes_down_per_h',
+           'uart_bytes_per_h', 'cpu_s_per_h')
+
+# Column -> (relative, absolute) slack before --compare calls it a regression
+TRACKED = {
+    'detect_mean_ms': (0.10, 5), 'detect_max_ms': (0.10, 5),
+    'valve_mean_ms': (0.10, 5), 'valve_max_ms': (0.10, 5),
+    'cmd_mean_ms': (0.10, 5), 'cmd_max_ms': (0.10, 5),
+    'missed': (0, 0), 'alerts': (0, 0.01),
+    'msgs_per_h': (0.05, 1), 'bytes_up_per_h': (0.05, 50),
+}
+
+
+# ==========================================
+# Scenarios: offset index, onset time -> (signal, clean signal, commands)
+# ==========================================
+def step_leak(k, at):
+    s = signals.step(400, 1800, at=at, until=at + 90)
+    return s, s, []
+
+
+def slow_ramp(k, at):
+    s = signals.ramp(400, 1600, start=at, duration=60, until=at + 120)
+    return s, s, []
+
+
+def fast_ramp(k, at):
+    s = signals.ramp(400, 1800, start=at, duration=8, until=at + 90)
+    return s, s, []
+
+
+def noisy_leak(k, at):
+    clean = signals.step(400, 1800, at=at, until=at + 90)
+    return signals.noisy(clean, sigma=40, spike_rate=0.005, seed=1 + k), clean, []
+
+
+def transient(k, at):
+    s = signals.step(400, 1800, at=at, until=at + 1.5)
+    return s, s, []
+
+
+def noise_only(k, at):
+    s = signals.noisy(signals.constant(400), sigma=60, spike_rate=0.01, spike=900,
+                      seed=1 + k)
+    return s, None, []
+
+
+def command(k, at):
+    return signals.constant(400), None, [(at, 'TEST')]
+
+
+SCENARIOS = {
+    'step_leak': step_leak,
+    'slow_ramp': slow_ramp,
+    'fast_ramp': fast_ramp,
+    'noisy_leak': noisy_leak,
+    'transient': transient,
+    'noise_only': noise_only,
+    'command': command,
+}
+
+
+def recorded_scenario(path):
+    """Scenario replaying a CSV trace; the offset shifts it in time"""
+    trace = signals.recorded(path)
+
+    def scenario(k, at):
+        shift = at - T0
+        s = lambda t: trace(t - shift)
+        return s, s, []
+    return scenario
+
+
+def _first(clean, until_s, test, step_s=0.01):
+    """First virtual second test(noise-free signal) holds"""
+    if clean is None:
+        return None
+    n = int(until_s / step_s)
+    for i in range(n):
+        t = i * step_s
+        if test(clean(t)):
+            return t
+    return None
+
+
+def _crossing(clean, until_s):
+    """Threshold crossing and leak start (first rise above the t=0 level)"""
+    onset = _first(clean, until_s, lambda v: v > THRESHOLD)
+    if onset is None:
+        return None, None
+    base = clean(0)
+    return onset, _first(clean, onset + 0.01, lambda v: v > base)
+
+
+# ==========================================
+# Measurement
+# ==========================================
+def run_once(firmware, scenario, k, offset, settings=()):
+    at = T0 + offset
+    signal, clean, commands = scenario(k, at)
+    end = at + RUN_AFTER_S
+    sim = Simulation(signal=signal, config=dict(settings))
+    for t, payload in commands:
+        sim.command(t, payload)
+    run = sim.run(firmware, end)
+
+    alerts = [m for m in run.published(TOPIC_STATUS) if m.payload.startswith(b'GAS_DETECTED')]
+    out = {'alerts': len(alerts), 'summary': run.summary(), 'virtual_s': run.seconds,
+           'detect': None, 'valve': None, 'cmd': None, 'leak': False}
+
+    onset, start = _crossing(clean, end)
+    if onset is not None:
+        out['leak'] = True
+        window = (onset + DETECT_WINDOW_S) * 1e6
+        for m in alerts:
+            if start * 1e6 <= m.t_us <= window:
+                out['detect'] = (m.t_us - onset * 1e6) / 1000
+                break
+        valve = run.latency_ms(start, 'pin', GPIO_RELAY, 0)
+        if valve is not None:
+            valve -= (onset - start) * 1000
+            if valve <= DETECT_WINDOW_S * 1000:
+                out['valve'] = valve
+    for t, payload in commands:
+        out['cmd'] = run.latency_ms(t, 'pin', GPIO_BUZZER, 1)
+    return out
+
+
+def _mean_max(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None, None
+    return round(sum(values) / len(values), 1), round(max(values), 1)
+
+
+def measure(firmware, name, scenario, offsets=OFFSETS, settings=()):
+    if firmware != 'ESP32_COMPLETE_FIRMWARE.py':
+        settings = ()
+    runs = [run_once(firmware, scenario, k, o, settings) for k, o in enumerate(offsets)]
+    hours = sum(r['virtual_s'] for r in runs) / 3600
+    total = lambda key: sum(r['summary'][key] for r in runs)
+    row = {'variant': firmware, 'scenario': name, 'runs': len(runs)}
+    row['detect_mean_ms'], row['detect_max_ms'] = _mean_max([r['detect'] for r in runs])
+    row['valve_mean_ms'], row['valve_max_ms'] = _mean_max([r['valve'] for r in runs])
+    row['cmd_mean_ms'], row['cmd_max_ms'] = _mean_max([r['cmd'] for r in runs])
+    leaks = [r for r in runs if r['leak']]
+    row['missed'] = (round(sum(1 for r in leaks if r['detect'] is None) / len(leaks), 3)
+                     if leaks else None)
+    row['alerts'] = round(sum(r['alerts'] for r in runs) / len(runs), 2)
+    row['msgs_per_h'] = round(total('publishes') / hours, 1)
+    row['bytes_up_per_h'] = round(total('bytes_up') / hours)
+    row['bytes_down_per_h'] = round(total('bytes_down') / hours)
+    row['uart_bytes_per_h'] = round(total('uart_bytes') / hours)
+    row['cpu_s_per_h'] = round(total('cpu_s') / hours, 3)
+    return row
+
+
+def run_suite(variants=VARIANTS, scenarios=SCENARIOS, offsets=OFFSETS, settings=()):
+    return [measure(v, name, scenario, offsets, settings)
+            for name, scenario in scenarios.items() for v in variants]
+
+
+# ==========================================
+# Output and regression check
+# ==========================================
+def write_csv(rows, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: '' if row[k] is None else row[k] for k in COLUMNS})
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return [{k: (None if v == '' else v) for k, v in row.items()}
+                for row in csv.DictReader(f)]
+
+
+def compare(rows, baseline):
+    """Regressions against baseline rows: [(variant, scenario, column, old, new)]"""
+    old = {(r['variant'], r['scenario']): r for r in baseline}
+    worse = []
+    for row in rows:
+        base = old.get((row['variant'], row['scenario']))
+        if base is None:
+            continue
+        for column, (rel, slack) in TRACKED.items():
+            new, was = row[column], base.get(column)
+            if was is None:
+                continue
+            if new is None:
+                # no detection / response any more where there was one
+                if column != 'missed':
+                    worse.append((row['variant'], row['scenario'], column, was, None))
+                continue
+            was = float(was)
+            if new > was + abs(was) * rel + slack:
+                worse.append((row['variant'], row['scenario'], column, was, new))
+    return worse
+
+
+def print_table(rows):
+    fmt = "{:<28} {:<12} {:>15} {:>15} {:>7} {:>7} {:>15} {:>9} {:>10} {:>9}"
+    print(fmt.format('variant', 'scenario', 'detect ms', 'valve ms', 'missed', 'alerts',
+                     'command ms', 'msgs/h', 'bytes/h', 'cpu s/h'))
+    cell = lambda a, b: '-' if a is None else "{} / {}".format(a, b)
+    for r in rows:
+        print(fmt.format(r['variant'], r['scenario'],
+                         cell(r['detect_mean_ms'], r['detect_max_ms']),
+                         cell(r['valve_mean_ms'], r['valve_max_ms']),
+                         '-' if r['missed'] is None else r['missed'], r['alerts'],
+                         cell(r['cmd_mean_ms'], r['cmd_max_ms']),
+                         r['msgs_per_h'], r['bytes_up_per_h'] + r['bytes_down_per_h'],
+                         r['cpu_s_per_h']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench.variants')
+    parser.add_argument('--variant', action='append', choices=VARIANTS,
+                        help='limit to these variants (default: all four)')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='limit to these scenarios (default: all)')
+    parser.add_argument('--trace', action='append', default=[],
+                        help='recorded CSV trace (seconds,adc) to add as a scenario')
+    parser.add_argument('--offsets', type=int, default=len(OFFSETS),
+                        help='phase offsets per scenario (0.25 s apart)')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='firmware setting for the uasyncio firmware (config.py)')
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--csv', help='write the results table to this CSV file')
+    parser.add_argument('--compare', help='baseline CSV; exit 1 on regressions')
+    args = parser.parse_args(argv)
+
+    scenarios = {name: SCENARIOS[name] for name in (args.scenario or SCENARIOS)}
+    for path in args.trace:
+        scenarios['trace:' + os.path.basename(path)] = recorded_scenario(path)
+    offsets = [i * 0.25 for i in range(args.offsets)]
+
+    settings = [item.split('=', 1) for item in args.set]
+    if any(len(item) != 2 for item in settings):
+        parser.error('--set takes NAME=VALUE')
+
+    rows = run_suite(args.variant or VARIANTS, scenarios, offsets, settings)
+    if args.csv:
+        write_csv(rows, args.csv)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+    if args.compare:
+        worse = compare(rows, read_csv(args.compare))
+        for variant, scenario, column, was, new in worse:
+            print(f"REGRESSION {variant} {scenario} {column}: {was} -> {new}",
+                  file=sys.stderr)
+        if worse:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
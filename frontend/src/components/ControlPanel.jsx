@@ -148,7 +148,7 @@ export default function ControlPanel({ onCommand }) {
         <div className="mt-6 p-4 bg-blue-900 bg-opacity-30 border border-blue-700 rounded-lg text-blue-200 text-sm">
           <p><strong>How it works:</strong></p>
           <ul className="mt-2 space-y-1">
-            <li>• All commands are published to MQTT topic: LPG/system/control</li>
+            <li>• All commands are published to MQTT topic: LPG/all/system/control (every detector)</li>
             <li>• ESP32 receives commands and executes immediately</li>
             <li>• Responses published back to dashboard</li>
             <li>• Test each component individually first, then use integrated scenarios</li>
@@ -0,0 +1,2 @@
+# Shared MicroPython modules for the gas detector firmware.
+# Upload the whole lib/ directory to /lib on the ESP32.
@@ -0,0 +1,108 @@
+# Alarm state machine: hysteresis, N-of-M confirmation, time-based hold
+# MicroPython 1.20.0+
+
+import time
+
+# States
+NORMAL = 0
+PRE_ALARM = 1       # Some readings above `trip`, not yet confirmed
+ALARM = 2           # Confirmed: valve closed, vent open, buzzer on
+RECOVERING = 3      # Below `clear` after the hold; still in alarm outputs
+
+STATE_NAMES = ('NORMAL', 'PRE_ALARM', 'ALARM', 'RECOVERING')
+
+
+class Alarm:
+    """
+    Turns a stream of readings into alarm transitions. update() returns
+    the new state when one happens and None otherwise, so the caller
+    drives actuators and status messages from transitions only.
+
+    NORMAL -> PRE_ALARM   first hit
+    -> ALARM              `confirm_n` hits in the last `confirm_m` readings
+    PRE_ALARM -> NORMAL   no hits in the last `confirm_m`
+    ALARM -> RECOVERING   below `clear` once `hold_ms` passed in ALARM
+    RECOVERING -> ALARM   back at or above `clear` (hold restarts)
+    RECOVERING -> NORMAL  below `clear` for `recover_ms`
+
+    A hit is a reading above `trip` or, with `rise` set, one at or above
+    `rise_floor` rising at `rise` counts/s or faster (the caller passes
+    the rate, e.g. from filters.Slope), so a fast leak trips before it
+    reaches `trip`. Worst-case detection latency is confirm_n readings after the gas
+    crosses `trip`. `previous` is the state before the last transition;
+    `trips` counts entries into ALARM from NORMAL / PRE_ALARM.
+    """
+
+    def __init__(self, trip=1200, clear=1000, confirm_n=2, confirm_m=3,
+                 hold_ms=10000, recover_ms=5000, rise=0, rise_floor=0):
+        if not 0 < confirm_n <= confirm_m <= 30:
+            raise ValueError("need 0 < confirm_n <= confirm_m <= 30")
+        if clear > trip:
+            raise ValueError("clear must not be above trip")
+        self.trip = trip
+        self.clear = clear
+        self.confirm_n = confirm_n
+        self.confirm_m = confirm_m
+        self.hold_ms = hold_ms
+        self.recover_ms = recover_ms
+        self.rise = rise
+        self.rise_floor = rise_floor
+        self._mask = (1 << confirm_m) - 1
+        self._oldest = 1 << (confirm_m - 1)
+        self.trips = 0
+        self.reset()
+
+    def reset(self, now=None):
+        """Back to NORMAL with an empty confirmation window"""
+        self.state = NORMAL
+        self.previous = NORMAL
+        self.since = time.ticks_ms() if now is None else now
+        self.history = 0        # bit i: reading i updates ago was above trip
+        self.hits = 0
+
+    def state_name(self):
+        return STATE_NAMES[self.state]
+
+    def update(self, value, now=None, rate=0):
+        """Feed one reading (and its rise rate); the new state on a transition, else None"""
+        if now is None:
+            now = time.ticks_ms()
+        if value > self.trip:
+            hit = 1
+        elif self.rise and rate >= self.rise and value >= self.rise_floor:
+            hit = 1
+        else:
+            hit = 0
+        if self.history & self._oldest:
+            self.hits -= 1
+        self.history = ((self.history << 1) | hit) & self._mask
+        self.hits += hit
+
+        state = self.state
+        if state == NORMAL:
+            if self.hits >= self.confirm_n:
+                return self._enter(ALARM, now)
+            if hit:
+                return self._enter(PRE_ALARM, now)
+        elif state == PRE_ALARM:
+            if self.hits >= self.confirm_n:
+                return self._enter(ALARM, now)
+            if not self.hits:
+                return self._enter(NORMAL, now)
+        elif state == ALARM:
+            if value < self.clear and time.ticks_diff(now, self.since) >= self.hold_ms:
+                return self._enter(RECOVERING, now)
+        elif state == RECOVERING:
+            if value >= self.clear:
+                return self._enter(ALARM, now)
+            if time.ticks_diff(now, self.since) >= self.recover_ms:
+                return self._enter(NORMAL, now)
+        return None
+
+    def _enter(self, state, now):
+        if state == ALARM and self.state != RECOVERING:
+            self.trips += 1
+        self.previous = self.state
+        self.state = state
+        self.since = now
+        return state
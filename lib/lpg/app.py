@@ -0,0 +1,1089 @@
+# Complete IoT Gas Detection System - ESP32 Firmware
+# Handles all hardware control via MQTT commands
+# MicroPython 1.20.0+
+#
+# Imported by ESP32_COMPLETE_FIRMWARE.py (main.py on the board), which
+# calls run(). Precompile with tools/build_mpy.py so this lives in flash as
+# lpg/app.mpy; settings below can be overridden in config.py on the board.
+
+import network
+import time
+import machine
+from machine import Pin, PWM, ADC
+from umqtt.simple import MQTTClient
+import json
+import gc
+import uasyncio as asyncio
+from array import array
+from lpg.runtime import Sequencer, Outbox
+from lpg.alarm import Alarm, NORMAL, PRE_ALARM, ALARM, RECOVERING
+from lpg.sampler import Sampler
+from lpg.filters import GasFilter, Slope
+from lpg.batcher import Batcher
+from lpg.report import ExceptionReporter
+from lpg import frame
+from lpg.spool import Spool
+from lpg.mqttlink import MqttLink
+from lpg.wifi import FastJoin
+from lpg.gcgov import GcGovernor
+from lpg import log
+from lpg.metrics import Metrics
+from lpg.pacer import Pacer, LEVEL_MAX
+from lpg.power import Napper
+from lpg.mq2 import Mq2
+from lpg.outputs import Outputs, KEEP, RELAY, SERVO, BUZZER
+from lpg.servo import Motion, duty_table, parse_angle
+from lpg.sensors import Channel, Scanner, capacity
+from lpg.topics import device_id, topic, control_topics
+
+# ==========================================
+# GPIO Configuration
+# ==========================================
+GPIO_RELAY = 33          # Relay module (gas valve control)
+GPIO_SERVO = 14          # Servo motor (vent control) - PWM
+GPIO_SENSOR = 34         # MQ-2 Gas Sensor (ADC input)
+GPIO_BUZZER = 27         # Buzzer alarm
+GPIO_LED_GREEN = 25      # Green LED (status)
+GPIO_LED_RED = 26        # Red LED (alert)
+GPIO_SENSOR_DOUT = None  # MQ-2 module D0 (low on gas), e.g. 35: wakes light sleep
+
+# Servo calibration: PWM duty (50 Hz, 0-1023) at 0°, 90° and 180°.
+# Measure per unit and set in config.py; angles in between are interpolated
+SERVO_DUTY_0 = 38        # Vent closed
+SERVO_DUTY_90 = 77       # Vent open
+SERVO_DUTY_180 = 115     # Max ventilation
+SERVO_SPEED_DPS = 360    # Vent ramp speed in degrees/s (0: jump)
+SERVO_STEP_MS = 20       # Ramp step (one PWM frame)
+
+# Output scenes: (relay, servo, buzzer, red LED, green LED), KEEP = unchanged.
+# The vent moves separately (set_servo) so it can ramp
+SCENE_NORMAL = (1, KEEP, 0, 0, 1)    # Valve open, green
+SCENE_ALERT = (0, KEEP, 1, 1, 0)     # Valve closed, buzzer, red
+SCENE_OFF = (0, KEEP, 0, 0, 0)
+
+# ==========================================
+# Threshold Configuration
+# ==========================================
+THRESHOLD = 1200         # ADC value that trips the alarm
+CLEAR_THRESHOLD = 1000   # Alarm clears below this (hysteresis)
+CONFIRM_N = 2            # Detection passes above THRESHOLD needed...
+CONFIRM_M = 3            # ...out of the last CONFIRM_M to trip
+HOLD_MS = 10000          # Minimum time in ALARM before recovery starts
+RECOVER_MS = 5000        # Time below CLEAR_THRESHOLD before NORMAL
+
+# Thresholds in ppm (LPG): once the sensor is calibrated (CALIBRATE
+# command, in clean air) these replace THRESHOLD / CLEAR_THRESHOLD
+THRESHOLD_PPM = None     # e.g. 1000 (None: keep the ADC thresholds)
+CLEAR_THRESHOLD_PPM = None
+
+# MQ-2 calibration (readings are also published in ppm, via a lookup table)
+MQ2_R0_KOHM = 10.0       # Sensor resistance in clean air / 9.83, until calibrated
+MQ2_RL_KOHM = 5.0        # Load resistor on the module
+MQ2_DIVIDER = 1.5        # Sensor volts per ADC volt (5 V module, 3.3 V ADC)
+MQ2_PATH = 'mq2.json'    # Calibration on the ESP32 filesystem
+MQ2_LUT_PATH = 'ppm.lut' # Cached ADC -> ppm table (8 KB)
+CALIBRATE_MS = 5000      # Clean-air averaging time for CALIBRATE
+CALIBRATE_CHUNK = 256    # ppm table codes rebuilt between yields
+
+# Rate of rise: a fast leak trips the alarm before it reaches THRESHOLD
+RISE_LIMIT = 150         # ADC counts/s that count as a hit (0: off)
+RISE_FLOOR = 700         # ...once the reading is at least this
+RISE_WINDOW = 8          # Detection passes in the least-squares slope
+RISE_MIN_SPAN_MS = 500   # Shortest window the slope is trusted over
+
+# Extra analog sensors (other rooms, an MQ-5, a CO cell, ...) on free ADC1
+# pins (GPIO 32, 35, 36, 39). They are read round-robin after the main
+# MQ-2 on its timer, so each gets the sampling rate / len(SENSORS), and
+# have their own filter and alarm; any of them in ALARM raises the alert.
+# Entries: (name, GPIO, trip, clear, mq2) - trip/clear in ADC counts,
+# mq2 True for an MQ-2 with its own ppm calibration (CALIBRATE covers it)
+SENSOR_NAME = 'main'     # The GPIO 34 sensor in LPG/<device>/gas/sensors
+SENSORS = ()             # e.g. (('hall', 32, 1200, 1000, True), ('co', 36, 900, 700, False))
+SENSOR_BUFFER = 64       # Ring per extra sensor (samples, power of two)
+SCAN_BUDGET_PCT = 25     # CPU share the ADC scan may take (DIAG capacity estimate)
+
+# Filtering (in front of the threshold check)
+OVERSAMPLE = 4           # ADC reads averaged per stored sample
+MEDIAN_WINDOW = 5        # Running median length (samples)
+EMA_SHIFT = 3            # EMA smoothing, alpha = 1/2**EMA_SHIFT
+
+# ==========================================
+# Task Timing
+# ==========================================
+SAMPLE_RATE_HZ = 100         # Timer-driven ADC sampling rate, fastest (50-500 Hz)
+SAMPLE_BUFFER = 256          # Ring buffer size in samples (power of two)
+DETECT_INTERVAL_MS = 100     # Drain buffer + threshold check cadence
+REPORT_INTERVAL_MS = 2000    # Console reading cadence (DEBUG log level)
+TELEMETRY_INTERVAL_MS = 500  # Reading added to the telemetry batch
+BATCH_SIZE = 20              # Readings per batch message
+BATCH_WINDOW_MS = 10000      # Max age of a batch before it is sent
+MQTT_POLL_MS = 100           # Control message poll interval
+MQTT_STEP_MS = 10            # Loop interval while a (re)connect is in flight
+MQTT_BACKOFF_MS = 500        # First reconnect delay (doubles per failure)
+MQTT_BACKOFF_MAX_MS = 60000  # Reconnect delay cap
+
+# Adaptive pacing: the intervals above are the fastest; far below
+# THRESHOLD (and not climbing towards it) they relax to the slow ends
+ADAPTIVE_PACING = True       # False: fixed SAMPLE_RATE_HZ / DETECT / TELEMETRY
+SAMPLE_RATE_MIN_HZ = 20      # Sampling rate when far below THRESHOLD
+DETECT_INTERVAL_MAX_MS = 400
+TELEMETRY_INTERVAL_MAX_MS = 2000
+PACE_FAR = 600               # ADC counts below THRESHOLD that count as far
+PACE_LEAD_MS = 5000          # Speed up when THRESHOLD is this close at the current rise
+PACE_WAKE = 700              # A raw sample above this ends a relaxed wait early
+
+# Low power (battery / UPS units): while the gas is far below THRESHOLD
+# and nothing is pending, relaxed waits are spent in machine.lightsleep
+# and WiFi runs in power-save. Commands wait for the next wake (at most
+# DETECT_INTERVAL_MAX_MS); the D0 pin, if wired, ends a nap at once.
+LOW_POWER = False
+LOW_POWER_BURST = 3          # Samples taken on each wake (fresh median)
+
+# Report-by-exception (telemetry only goes out when something changed)
+REPORT_BY_EXCEPTION = True   # False: every reading goes into the batch
+DEADBAND = 25                # ADC counts a reading must move to be sent
+HEARTBEAT_MS = 60000         # Send a reading at least this often anyway
+
+# Store-and-forward (frames taken while MQTT is down, replayed afterwards)
+SPOOL_PATH = 'spool.bin'     # Circular log on the ESP32 filesystem
+SPOOL_SLOTS = 512            # Frames kept (24 bytes each on flash)
+REPLAY_BATCH = 10            # Frames per replay message
+REPLAY_INTERVAL_MS = 500     # Min gap between replay messages
+
+# Logging: records go to a RAM ring and are written out (console, and
+# LPG/<device>/system/log at LOG_REMOTE_LEVEL and above) once the other tasks have
+# run. The level can be changed at runtime with LOG_DEBUG / LOG_INFO / ...
+LOG_LEVEL = 'INFO'           # DEBUG adds every reading and command detail
+LOG_REMOTE_LEVEL = 'WARN'    # Lowest level also published to the backend
+LOG_RING = 64                # Entries held until flushed
+LOG_FLUSH_LINES = 8          # Max lines written before yielding
+
+# Metrics: per-stage ticks_us histograms, published as one snapshot
+METRICS_INTERVAL_MS = 60000  # Snapshot period (0: only on the METRICS command)
+
+# Garbage collection: the steady-state loop does not allocate, so the
+# governor only collects (in the idle gap after a detection pass) once
+# rare events (alerts, logs, batches) have used GC_THRESHOLD bytes.
+# DIAG alloc_iter / alloc_max check that on the board (the host
+# simulator's gc reports a fixed heap, so they read 0 there)
+GC_THRESHOLD = 8192          # Bytes allocated before an idle-time collect
+GC_MIN_FREE = 16384          # Collect anyway below this much free heap
+
+# ==========================================
+# MQTT Configuration
+# ==========================================
+MQTT_BROKER = 'd9224a87ae11416ebdfea8fc7ef45621.s1.eu.hivemq.cloud'
+MQTT_PORT = 8883
+MQTT_USER = 'LPG_Detection'
+MQTT_PASSWORD = 'Fire@101'
+
+# Topics are per unit, LPG/<DEVICE_ID>/gas/batch etc. (lib/lpg/topics.py);
+# commands arrive on the unit's own control topic, its group's and LPG/all
+DEVICE_ID = device_id()      # Hex machine.unique_id()
+DEVICE_GROUP = None          # e.g. 'floor2': also obey LPG/group/floor2/system/control
+
+# ==========================================
+# WiFi Configuration (Dual Network Fallback)
+# ==========================================
+WIFI_NETWORKS = [
+    ('IIC_WIFI', '!tah@rIntl2025'),
+    ('oh-ho!', 'Dangals.LM10')
+]
+WIFI_CACHE = 'wifi.json'         # Last good AP + IP lease (fast join)
+WIFI_JOIN_TIMEOUT_MS = 15000     # Per network after a scan
+WIFI_FAST_TIMEOUT_MS = 3000      # Cached AP before falling back to a scan
+
+# Local overrides (credentials, thresholds, ...) without rebuilding the .mpy
+try:
+    from config import *
+except ImportError:
+    pass
+
+# Per-device topics (after config.py, which may set DEVICE_ID / DEVICE_GROUP)
+MQTT_CLIENT_ID = 'esp32-gas-detector-' + DEVICE_ID
+MQTT_TOPIC_BATCH = topic(DEVICE_ID, 'gas/batch')
+MQTT_TOPIC_FRAME = topic(DEVICE_ID, 'gas/frame')       # Binary frames (lib/lpg/frame.py)
+MQTT_TOPIC_SENSORS = topic(DEVICE_ID, 'gas/sensors')   # All sensors in one message (SENSORS)
+MQTT_TOPIC_STATUS = topic(DEVICE_ID, 'gas/status')
+MQTT_TOPIC_LOG = topic(DEVICE_ID, 'system/log')
+MQTT_TOPIC_METRICS = topic(DEVICE_ID, 'system/metrics')
+MQTT_TOPICS_CONTROL = control_topics(DEVICE_ID, DEVICE_GROUP)
+
+# ==========================================
+# Global State
+# ==========================================
+wifi_connected = False
+mqtt_connected = False
+mqtt_client = None
+mqtt_link = None             # Step-by-step (re)connect, see mqtt_task
+gcgov = None                 # GcGovernor, created as the loop starts
+system_on = True
+alert_active = False
+last_gas_value = 0          # Filtered reading (published, drives alerts)
+last_raw_value = 0          # Unfiltered sample, for diagnostics
+alarm = Alarm(THRESHOLD, CLEAR_THRESHOLD, CONFIRM_N, CONFIRM_M, HOLD_MS, RECOVER_MS,
+              RISE_LIMIT, RISE_FLOOR)
+pacer = Pacer(THRESHOLD, PACE_FAR, PACE_LEAD_MS)
+mq2 = Mq2(MQ2_R0_KOHM, MQ2_RL_KOHM, divider=MQ2_DIVIDER, path=MQ2_PATH, lut_path=MQ2_LUT_PATH)
+detect_ms = DETECT_INTERVAL_MS      # Current (paced) intervals
+telemetry_ms = TELEMETRY_INTERVAL_MS
+rate_mark = 0                # Sampler count / ticks at the start of the metrics period
+rate_mark_ms = 0
+sequencer = Sequencer()      # Background TEST / emergency sequences
+calibration = None           # CALIBRATE task (its own: commands do not cancel it)
+outbox = Outbox()            # Messages waiting for the publish task (log lines last)
+batcher = Batcher(BATCH_SIZE, BATCH_WINDOW_MS)   # ppm table set at init
+reporter = ExceptionReporter(DEADBAND, HEARTBEAT_MS)
+framer = frame.FrameEncoder(machine.unique_id())
+spool = Spool(SPOOL_PATH, SPOOL_SLOTS, frame.FRAME_SIZE)
+metrics = Metrics()          # Per-stage latency histograms (us)
+h_eval = metrics.hist('eval')        # Drain + filter + threshold check
+h_jitter = metrics.hist('jitter')    # Detection pass start vs schedule
+h_check_msg = metrics.hist('check_msg')
+h_publish = metrics.hist('publish')
+h_actuator = metrics.hist('actuator')
+log_ready = asyncio.Event()  # Set when the log ring stops being empty
+logger = log.Logger(LOG_RING, log.LEVELS[LOG_LEVEL], log_ready.set)
+wifi = FastJoin(WIFI_NETWORKS, WIFI_CACHE, WIFI_JOIN_TIMEOUT_MS,
+                WIFI_FAST_TIMEOUT_MS, logger)
+# Frame buffers, reused in turn: more than the outbox can hold, so a
+# buffer is never rewritten while it is still queued
+frame_pool = [bytearray(frame.FRAME_SIZE) for _ in range(outbox.size + 2)]
+frame_next = 0
+
+# ==========================================
+# Hardware Initialization
+# ==========================================
+print("Initializing hardware...")
+
+# Relay (GPIO 33) - Controls gas valve
+relay = Pin(GPIO_RELAY, Pin.OUT)
+print("  ✓ Relay (GPIO 33) initialized")
+
+# Servo (GPIO 14) - PWM control
+servo = PWM(Pin(GPIO_SERVO), freq=50)
+print("  ✓ Servo (GPIO 14) PWM initialized")
+
+# Gas Sensor (GPIO 34) - ADC input
+adc = ADC(Pin(GPIO_SENSOR))
+adc.atten(ADC.ATTN_11DB)  # 3.3V range
+adc.width(ADC.WIDTH_12BIT)  # 12-bit (0-4095)
+print("  ✓ Gas Sensor (GPIO 34) ADC initialized")
+
+# Extra sensors (SENSORS), read from the sampler's timer
+channels = []
+for name, gpio, trip, clear, has_mq2 in SENSORS:
+    ch_adc = ADC(Pin(gpio))
+    ch_adc.atten(ADC.ATTN_11DB)
+    ch_adc.width(ADC.WIDTH_12BIT)
+    ch_mq2 = None
+    if has_mq2:
+        ch_mq2 = Mq2(MQ2_R0_KOHM, MQ2_RL_KOHM, divider=MQ2_DIVIDER,
+                     path=f"mq2_{name}.json", lut_path=f"ppm_{name}.lut")
+        ch_mq2.build()
+    channels.append(Channel(name, ch_adc, GasFilter(MEDIAN_WINDOW, EMA_SHIFT),
+                            Alarm(trip, clear, CONFIRM_N, CONFIRM_M, HOLD_MS, RECOVER_MS),
+                            ch_mq2, SENSOR_BUFFER, OVERSAMPLE, metrics.hist('scan_' + name)))
+    print(f"  ✓ Sensor '{name}' (GPIO {gpio}, trip {trip}) added")
+scanner = Scanner(channels)
+
+# Sampler - Timer 0 reads GPIO 34 (then the next extra sensor) at SAMPLE_RATE_HZ
+sampler = Sampler(adc, SAMPLE_RATE_HZ, SAMPLE_BUFFER, timer_id=0, oversample=OVERSAMPLE,
+                  hist=metrics.hist('adc'), extra=scanner)
+sample_block = array('H', [0] * SAMPLE_BUFFER)
+gas_filter = GasFilter(MEDIAN_WINDOW, EMA_SHIFT)
+gas_slope = Slope(RISE_WINDOW, RISE_MIN_SPAN_MS)
+print(f"  ✓ Sampler ({SAMPLE_RATE_HZ} Hz, {SAMPLE_BUFFER} samples) ready")
+
+# ADC -> ppm table (from flash after the first boot)
+batcher.lut = mq2.build()
+print(f"  ✓ ppm table ready (R0 {mq2.r0_kohm:.2f} kΩ, "
+      f"{'calibrated' if mq2.calibrated else 'NOT calibrated'})")
+
+# Light sleep (LOW_POWER), woken early by the MQ-2 D0 output if wired
+napper = None
+if LOW_POWER:
+    napper = Napper(None if GPIO_SENSOR_DOUT is None else Pin(GPIO_SENSOR_DOUT, Pin.IN))
+    print("  ✓ Low-power mode (light sleep between samples)")
+
+# Buzzer (GPIO 27) - Digital output
+buzzer = Pin(GPIO_BUZZER, Pin.OUT)
+print("  ✓ Buzzer (GPIO 27) initialized")
+
+# LEDs (GPIO 25, 26) - Digital outputs
+led_green = Pin(GPIO_LED_GREEN, Pin.OUT)
+led_red = Pin(GPIO_LED_RED, Pin.OUT)
+print("  ✓ LEDs (GPIO 25, 26) initialized")
+
+# All outputs go through the shadow; start safe: valve closed, vent closed
+outputs = Outputs(relay, servo, buzzer, led_red, led_green)
+vent = Motion(lambda duty: outputs.set(SERVO, duty),
+              duty_table(SERVO_DUTY_0, SERVO_DUTY_90, SERVO_DUTY_180),
+              SERVO_SPEED_DPS, SERVO_STEP_MS)
+vent_ready = asyncio.Event()    # Set when the vent has somewhere to go
+outputs.apply(SCENE_OFF)
+vent.move(0)
+
+print("\n✓ All hardware initialized!\n")
+
+# ==========================================
+# WiFi Connection (Dual Network with Fallback)
+# ==========================================
+def connect_wifi():
+    """Join WiFi: cached AP and IP first, then strongest known network"""
+    global wifi_connected
+    
+    wifi_connected = wifi.connect()
+    logger.flush(LOG_RING)      # join progress, before the lines below
+    if wifi_connected:
+        if LOW_POWER:
+            try:
+                wifi.wlan.config(pm=network.WLAN.PM_POWERSAVE)
+            except (AttributeError, ValueError):
+                pass            # firmware without WLAN power management
+        print(f"✓ Connected to {wifi.ssid}! IP: {wifi.wlan.ifconfig()[0]}")
+        print(f"  {wifi.method} join {wifi.join_ms} ms, boot -> WiFi {wifi.boot_ms} ms")
+    else:
+        print("✗ WiFi Connection Failed - All networks tried!")
+    return wifi_connected
+
+# ==========================================
+# MQTT Connection
+# ==========================================
+def on_mqtt_message(topic, msg):
+    """Handle incoming MQTT messages"""
+    global system_on, alert_active
+    
+    message = msg.decode('utf-8')
+    topic_str = topic.decode('utf-8') if isinstance(topic, bytes) else topic
+    
+    logger.debug("[MQTT] %s: %s", topic_str, message)
+    
+    if topic_str in MQTT_TOPICS_CONTROL:
+        handle_command(message)
+
+def handle_command(command):
+    """Execute control commands from backend"""
+    global system_on, alert_active, calibration
+    
+    logger.debug(">>> Executing command: %s", command)
+    t = time.ticks_us()
+    stage = command
+    
+    # A direct command always wins over a running TEST / emergency sequence
+    sequencer.cancel()
+    
+    if command == 'ON':
+        normal_mode()
+        alarm.reset()       # a leak still present trips again
+        scanner.reset()
+        logger.info("System turned ON")
+        
+    elif command == 'OFF':
+        all_off()
+        logger.info("System turned OFF")
+        
+    elif command == 'TEST':
+        sequencer.start(test_alert())
+        logger.info("Test alert triggered")
+    
+    # Relay commands
+    elif command == 'RELAY_ON':
+        outputs.set(RELAY, 1)   # Relay ON = gas valve OPEN
+        logger.info("Relay ON (Gas valve OPEN)")
+        
+    elif command == 'RELAY_OFF':
+        outputs.set(RELAY, 0)   # Relay OFF = gas valve CLOSED
+        logger.info("Relay OFF (Gas valve CLOSED)")
+    
+    # Servo commands
+    elif command.startswith('SERVO_') and parse_angle(command[6:]) is not None:
+        stage = 'SERVO'
+        set_servo(parse_angle(command[6:]))
+        logger.info("Servo moving to %d°", vent.target)
+    
+    # LED commands
+    elif command == 'LED_GREEN':
+        outputs.apply((KEEP, KEEP, KEEP, 0, 1))
+        logger.info("Green LED ON")
+        
+    elif command == 'LED_RED':
+        outputs.apply((KEEP, KEEP, KEEP, 1, 0))
+        logger.info("Red LED ON")
+        
+    elif command == 'LED_OFF':
+        outputs.apply((KEEP, KEEP, KEEP, 0, 0))
+        logger.info("All LEDs OFF")
+    
+    # Buzzer commands
+    elif command == 'BUZZER_ON':
+        outputs.set(BUZZER, 1)
+        logger.info("Buzzer ON")
+        
+    elif command == 'BUZZER_OFF':
+        outputs.set(BUZZER, 0)
+        logger.info("Buzzer OFF")
+    
+    # Integrated scenarios
+    elif command == 'ALERT_MODE':
+        alert_mode()
+        logger.info("ALERT MODE activated")
+        
+    elif command == 'NORMAL_MODE':
+        normal_mode()
+        alarm.reset()
+        scanner.reset()
+        logger.info("NORMAL MODE activated")
+        
+    elif command == 'SERVO_WITH_FAN':
+        sequencer.start(servo_with_fan())
+        logger.info("EMERGENCY: Servo 90° + Fan OFF + Alert")
+    
+    elif command == 'CALIBRATE':
+        if alarm.state != NORMAL or scanner.alarmed():
+            logger.warn("CALIBRATE refused: alarm %s (needs clean air)", alarm.state_name())
+        elif calibrating():
+            logger.warn("CALIBRATE refused: already calibrating")
+        else:
+            calibration = asyncio.create_task(calibrate())
+            logger.info("Calibrating MQ-2 for %d ms (clean air)", CALIBRATE_MS)
+    
+    elif command.startswith('LOG_'):
+        stage = 'LOG'
+        if logger.set_level(command[4:]):
+            publish(MQTT_TOPIC_LOG, "Log level " + command[4:])
+        else:
+            logger.warn("Unknown log level: %s", command)
+    
+    # Diagnostics
+    elif command == 'DIAG':
+        publish(MQTT_TOPIC_LOG, f"DIAG raw={last_raw_value} filtered={last_gas_value} "
+                 f"overruns={sampler.overruns} hz={sampler.rate_hz} sensors={len(scanner)} "
+                 f"pace={pacer.level} detect_ms={detect_ms} "
+                 f"naps={napper.naps if napper else 0} "
+                 f"woken={napper.woken if napper else 0} "
+                 f"mqtt={mqtt_link.state_name()} "
+                 f"attempts={mqtt_link.attempts} failures={mqtt_link.failures} "
+                 f"connect_ms={mqtt_link.last_ms} max_ms={mqtt_link.max_ms} "
+                 f"wifi={wifi.method} boot_wifi_ms={wifi.boot_ms} "
+                 f"alloc_iter={gcgov.alloc_last} alloc_max={gcgov.alloc_max} "
+                 f"gc_count={gcgov.collections} gc_max_us={gcgov.pause_max_us} "
+                 f"free={gc.mem_free()} alarm={alarm.state_name()} trips={alarm.trips} "
+                 f"rise={gas_slope.rate}/s ppm={mq2.lut[last_gas_value]} "
+                 f"out_writes={outputs.writes} out_skipped={outputs.skipped} "
+                 f"r0={mq2.r0_kohm:.2f} "
+                 f"log_level={log.LEVEL_NAMES[logger.level]} "
+                 f"log_dropped={logger.dropped}")
+    
+    elif command == 'METRICS':
+        publish(MQTT_TOPIC_METRICS, metrics_payload())
+    
+    elif command == 'SENSORS':
+        publish(MQTT_TOPIC_SENSORS, sensors_payload())
+        cost = scanner.cost_us() or metrics.hist('adc').percentile(50)
+        costs = " ".join([f"{ch.name}={ch.mean_cost_us()}us" for ch in scanner.channels])
+        cap = capacity(sampler.rate_hz, cost, SCAN_BUDGET_PCT) if cost else '-'
+        publish(MQTT_TOPIC_LOG, f"SCAN {costs} per_read={cost}us "
+                f"max_channels@{sampler.rate_hz}Hz={cap}")
+    
+    elif command == 'STATE':
+        publish(MQTT_TOPIC_LOG, f"STATE {outputs.report()} angle={vent.angle}")
+    
+    else:
+        logger.warn("Unknown command: %s", command)
+        return
+    
+    metrics.hist('cmd_' + stage).since(t)
+
+def set_servo(angle):
+    """Send the vent to an angle (0-180); servo_task ramps it there"""
+    t = time.ticks_us()
+    if vent.move(angle):
+        vent_ready.set()
+    h_actuator.since(t)
+
+def alert_mode():
+    """Activate alert mode"""
+    global alert_active
+    t = time.ticks_us()
+    alert_active = True
+    outputs.apply(SCENE_ALERT)  # Gas valve CLOSED first
+    set_servo(90)
+    h_actuator.since(t)
+    logger.debug("  ⚠️ ALERT MODE: Red LED + Relay OFF + Servo 90° + Buzzer ON")
+
+def normal_mode():
+    """Return to normal mode"""
+    global alert_active
+    t = time.ticks_us()
+    alert_active = False
+    set_servo(0)
+    outputs.apply(SCENE_NORMAL)  # Gas valve OPEN last
+    h_actuator.since(t)
+    logger.debug("  ✅ NORMAL MODE: Green LED + Relay ON + Servo 0° + Buzzer OFF")
+
+async def test_alert():
+    """Test alert sequence (runs as a background task)"""
+    logger.debug("  🧪 TEST ALERT SEQUENCE")
+    # Buzzer
+    for i in range(3):
+        outputs.set(BUZZER, 1)
+        await asyncio.sleep_ms(200)
+        outputs.set(BUZZER, 0)
+        await asyncio.sleep_ms(200)
+    
+    # LEDs
+    outputs.apply((KEEP, KEEP, KEEP, 1, 0))
+    await asyncio.sleep(1)
+    
+    # Servo
+    set_servo(90)
+    await asyncio.sleep(1)
+    
+    # Relay
+    outputs.set(RELAY, 0)
+    await asyncio.sleep(1)
+    
+    # Return to normal
+    normal_mode()
+
+async def servo_with_fan():
+    """Emergency: open vent and close gas valve, sound buzzer for 2s"""
+    outputs.apply(SCENE_ALERT)  # Gas closed, buzzer, red
+    set_servo(90)
+    logger.debug("  🚨 EMERGENCY: Servo open + Gas blocked + Alert!")
+    await asyncio.sleep(2)
+    outputs.set(BUZZER, 0)
+
+def calibrating():
+    return calibration is not None and not calibration.done()
+
+async def calibrate():
+    """Average the filtered reading for CALIBRATE_MS and take it as clean air"""
+    total = 0
+    totals = [0] * len(scanner)     # extra sensors with an MQ-2 calibration
+    n = 0
+    left = CALIBRATE_MS
+    while left > 0:
+        await asyncio.sleep_ms(DETECT_INTERVAL_MS)
+        left -= DETECT_INTERVAL_MS
+        if alarm.state != NORMAL or scanner.alarmed():
+            logger.warn("Calibration aborted: gas detected")
+            return
+        total += last_gas_value
+        for i, ch in enumerate(scanner.channels):
+            totals[i] += ch.value
+        n += 1
+    try:
+        mq2.set_clean_air(total // n)
+        for i, ch in enumerate(scanner.channels):
+            if ch.mq2 is not None:
+                ch.mq2.set_clean_air(totals[i] // n)
+    except ValueError as e:
+        logger.error("Calibration failed: %s", e)
+        return
+    # 4096 float conversions per table: a slice at a time, sampling runs between
+    for sensor in [mq2] + [ch.mq2 for ch in scanner.channels if ch.mq2 is not None]:
+        for _ in sensor.build_steps(CALIBRATE_CHUNK):
+            await asyncio.sleep_ms(0)
+    batcher.lut = mq2.lut
+    apply_ppm_thresholds()
+    publish(MQTT_TOPIC_LOG, f"MQ-2 calibrated: R0 {mq2.r0_kohm:.2f} kOhm "
+            f"(clean air {mq2.clean_adc} ADC)")
+    for ch in scanner.channels:
+        if ch.mq2 is not None:
+            publish(MQTT_TOPIC_LOG, f"MQ-2 '{ch.name}' calibrated: R0 "
+                    f"{ch.mq2.r0_kohm:.2f} kOhm (clean air {ch.mq2.clean_adc} ADC)")
+
+def apply_ppm_thresholds():
+    """Convert THRESHOLD_PPM / CLEAR_THRESHOLD_PPM to ADC codes (needs calibration)"""
+    global THRESHOLD, CLEAR_THRESHOLD
+    if THRESHOLD_PPM is None:
+        return
+    if not mq2.calibrated:
+        logger.warn("THRESHOLD_PPM ignored until CALIBRATE; using %d ADC", THRESHOLD)
+        return
+    trip = mq2.code_for(THRESHOLD_PPM)
+    clear = trip if CLEAR_THRESHOLD_PPM is None else mq2.code_for(CLEAR_THRESHOLD_PPM)
+    THRESHOLD = alarm.trip = pacer.trip = trip
+    CLEAR_THRESHOLD = alarm.clear = min(clear, trip)
+    logger.info("Thresholds in ppm: trip %d ADC, clear %d ADC", THRESHOLD, CLEAR_THRESHOLD)
+
+apply_ppm_thresholds()
+
+def all_off():
+    """Turn off everything"""
+    t = time.ticks_us()
+    outputs.apply(SCENE_OFF)
+    set_servo(0)
+    h_actuator.since(t)
+    logger.debug("  ⚫ All systems OFF")
+
+def console_sink(level, line):
+    """Logger sink: serial console (INFO lines unprefixed, as before)"""
+    if level == log.INFO:
+        print(line)
+    else:
+        print(f"[{log.LEVEL_NAMES[level]}] {line}")
+
+def mqtt_sink(level, line):
+    """Logger sink: LPG/<device>/system/log for the backend"""
+    if mqtt_connected:
+        outbox.put_low(MQTT_TOPIC_LOG, line)     # behind status and frames
+
+logger.add_sink(mqtt_sink, log.LEVELS[LOG_REMOTE_LEVEL])   # queued first, UART after
+logger.add_sink(console_sink)
+
+def publish(topic, payload):
+    """Queue a message; the publish task sends it"""
+    if mqtt_connected:
+        outbox.put(topic, payload)
+
+def connect_mqtt():
+    """Create the MQTT client; mqtt_task connects it in the background"""
+    global mqtt_client, mqtt_link
+    
+    print(f"Connecting to MQTT: {MQTT_BROKER}:{MQTT_PORT}... (device {DEVICE_ID})")
+    
+    mqtt_client = MQTTClient(
+        MQTT_CLIENT_ID,
+        MQTT_BROKER,
+        port=MQTT_PORT,
+        user=MQTT_USER,
+        password=MQTT_PASSWORD,
+        ssl=True,
+        ssl_params={"server_hostname": MQTT_BROKER},
+        keepalive=60
+    )
+    mqtt_client.set_callback(on_mqtt_message)
+    mqtt_link = MqttLink(mqtt_client, MQTT_TOPICS_CONTROL,
+                         MQTT_BACKOFF_MS, MQTT_BACKOFF_MAX_MS)
+
+def on_mqtt_connected():
+    """Link is up (first connect or reconnect)"""
+    global mqtt_connected
+    mqtt_connected = True
+    
+    if mqtt_link.successes == 1:
+        logger.info("✓ MQTT Connected! (%d ms)", mqtt_link.last_ms)
+        publish(MQTT_TOPIC_STATUS, "SYSTEM_READY")
+        publish(MQTT_TOPIC_LOG, "System started")
+        publish(MQTT_TOPIC_LOG, f"WiFi {wifi.ssid} ({wifi.method} join {wifi.join_ms} ms), "
+                f"boot -> WiFi {wifi.boot_ms} ms, boot -> MQTT {time.ticks_ms()} ms")
+    else:
+        logger.info("MQTT reconnected after %d ms down (%d attempts, %d failed)",
+                    mqtt_link.down_ms, mqtt_link.attempts, mqtt_link.failures)
+
+# ==========================================
+# Tasks
+# ==========================================
+def check_gas(gas_value):
+    """Feed the alarm on every drained block; actuators and status follow transitions"""
+    state = alarm.update(gas_value, rate=gas_slope.rate)
+    if state is None:
+        return
+    
+    if state == ALARM and alarm.previous != RECOVERING:
+        # Local safety actions first, then the alert goes out immediately
+        sequencer.cancel()
+        alert_mode()
+        add_reading(gas_value)
+        reporter.force(gas_value)
+        flush_batch()
+        publish(MQTT_TOPIC_STATUS, f"GAS_DETECTED - Value: {gas_value} - EMERGENCY")
+        if gas_value > THRESHOLD:
+            logger.warn("⚠️  GAS ALERT! Value %d (raw %d, threshold %d)",
+                        gas_value, last_raw_value, THRESHOLD)
+        else:
+            logger.warn("⚠️  GAS ALERT! Value %d rising %d/s (limit %d/s)",
+                        gas_value, gas_slope.rate, RISE_LIMIT)
+    
+    elif state == ALARM:
+        logger.info("Gas back up (%d) while recovering, alarm held", gas_value)
+    
+    elif state == PRE_ALARM:
+        logger.debug("Gas above threshold (%d), confirming", gas_value)
+    
+    elif state == RECOVERING:
+        logger.info("Gas below %d (%d), recovering", CLEAR_THRESHOLD, gas_value)
+    
+    elif alarm.previous == RECOVERING:
+        if scanner.alarmed():
+            logger.info("Gas at %s recovered (%d), other sensors still in alarm",
+                        SENSOR_NAME, gas_value)
+            return
+        normal_mode()
+        add_reading(gas_value)
+        reporter.force(gas_value)
+        flush_batch()
+        publish(MQTT_TOPIC_STATUS, "NORMAL")
+        logger.info("System recovered. Gas: %d", gas_value)
+    
+    else:
+        logger.debug("Gas spike not confirmed (%d)", gas_value)
+
+def check_channels():
+    """Filter the extra sensors and act on their alarm transitions"""
+    for ch in scanner.channels:
+        state = ch.process()
+        if state is None or not system_on:
+            continue
+        if state == ALARM and ch.alarm.previous != RECOVERING:
+            if not alert_active:
+                sequencer.cancel()
+                alert_mode()
+            publish(MQTT_TOPIC_STATUS, f"GAS_DETECTED - {ch.name}: {ch.value} - EMERGENCY")
+            publish(MQTT_TOPIC_SENSORS, sensors_payload())
+            logger.warn("⚠️  GAS ALERT at %s! Value %d (threshold %d)",
+                        ch.name, ch.value, ch.alarm.trip)
+        elif state == RECOVERING:
+            logger.info("Gas at %s below %d (%d), recovering", ch.name, ch.alarm.clear, ch.value)
+        elif state == NORMAL and ch.alarm.previous == RECOVERING:
+            publish(MQTT_TOPIC_SENSORS, sensors_payload())
+            if alarm.state == NORMAL and not scanner.alarmed():
+                normal_mode()
+                publish(MQTT_TOPIC_STATUS, "NORMAL")
+                logger.info("System recovered. %s: %d", ch.name, ch.value)
+            else:
+                logger.info("Gas at %s recovered (%d), other sensors still in alarm",
+                            ch.name, ch.value)
+
+def sensors_payload():
+    """All sensors in one message: names, filtered ADC, ppm (None: no table), alarm"""
+    names = [SENSOR_NAME]
+    values = [last_gas_value]
+    ppm = [mq2.lut[last_gas_value]]
+    states = [alarm.state_name()]
+    for ch in scanner.channels:
+        names.append(ch.name)
+        values.append(ch.value)
+        ppm.append(ch.ppm())
+        states.append(ch.alarm.state_name())
+    return json.dumps({'t': time.ticks_ms(), 'n': names, 'v': values, 'ppm': ppm,
+                       'a': states}, separators=(',', ':'))
+
+def report_gas(gas_value):
+    """Periodic console reading"""
+    logger.debug("Gas: %d ADC (%s)", gas_value, alarm.state_name())
+
+def pace(wake=False):
+    """Set sampling rate and task intervals from the latest reading"""
+    global detect_ms, telemetry_ms
+    if wake:
+        pacer.wake()
+    else:
+        # The sensor closest to its own trip point sets the pace
+        value = last_gas_value
+        for ch in channels:
+            v = ch.value + THRESHOLD - ch.alarm.trip
+            if v > value:
+                value = v
+        pacer.update(value, gas_slope.rate if value == last_gas_value else 0)
+    # Whole 10 Hz steps, so the timer is not re-armed for every small change
+    hz = pacer.scale(SAMPLE_RATE_HZ, SAMPLE_RATE_MIN_HZ) // 10 * 10
+    sampler.set_rate(hz if hz > SAMPLE_RATE_MIN_HZ else SAMPLE_RATE_MIN_HZ)
+    detect_ms = pacer.scale(DETECT_INTERVAL_MS, DETECT_INTERVAL_MAX_MS)
+    telemetry_ms = pacer.scale(TELEMETRY_INTERVAL_MS, TELEMETRY_INTERVAL_MAX_MS)
+
+def sample_rate():
+    """Measured ADC samples per second since the last call"""
+    global rate_mark, rate_mark_ms
+    now = time.ticks_ms()
+    elapsed = time.ticks_diff(now, rate_mark_ms)
+    n = sampler.samples_since(rate_mark)
+    rate_mark = sampler.count()
+    rate_mark_ms = now
+    return n * 1000 // elapsed if elapsed > 0 else 0
+
+def can_nap():
+    """Light sleep only when far from tripping and nothing is in flight"""
+    return (pacer.level == LEVEL_MAX and alarm.state == NORMAL and not sequencer.busy()
+            and not calibrating()
+            and not vent.moving() and not scanner.alarmed()
+            and not len(outbox) and not logger.count and mqtt_link.waiting()
+            and not (mqtt_connected and spool.pending()))
+
+async def nap(ms):
+    """
+    Spend ms in light sleep with the sampling timer stopped: a fresh
+    sample after each nap, and a burst for the filter at the end. Returns
+    True if a wake source or a high sample cut it short.
+    """
+    sampler.stop()
+    woke = False
+    try:
+        while ms > 0 and can_nap():
+            step = ms if napper.wake_pin is not None or ms < DETECT_INTERVAL_MS \
+                else DETECT_INTERVAL_MS
+            t = time.ticks_ms()
+            woke = napper.nap(step)
+            ms -= time.ticks_diff(time.ticks_ms(), t)
+            sampler.sample()
+            if woke or sampler.latest() > PACE_WAKE:
+                woke = True
+                break
+            await asyncio.sleep_ms(0)   # tasks that fell due while asleep
+    finally:
+        sampler.sample(LOW_POWER_BURST)
+        sampler.start()
+    if ms > 0 and not woke:
+        await asyncio.sleep_ms(ms)      # something became pending: plain wait
+    return woke
+
+async def detect_task():
+    """Drain the sampler and check the threshold every detect_ms"""
+    global last_gas_value, last_raw_value
+    
+    due = time.ticks_us()
+    while True:
+        t = time.ticks_us()
+        h_jitter.add(time.ticks_diff(t, due))
+        gcgov.lap()
+        try:
+            n = sampler.drain(sample_block)
+            for i in range(n):
+                gas_filter.update(sample_block[i])
+            if n:
+                last_raw_value = gas_filter.raw
+                last_gas_value = gas_filter.value
+                gas_slope.update(last_gas_value, time.ticks_ms())
+                if system_on:
+                    check_gas(last_gas_value)
+                if ADAPTIVE_PACING:
+                    pace()
+            if channels:
+                check_channels()
+        except Exception as e:
+            logger.error("Error in detect task: %s", e)
+        h_eval.since(t)
+        gcgov.poll()    # idle until the next pass: collect here if due
+        if napper is not None and detect_ms > DETECT_INTERVAL_MS and can_nap():
+            if await nap(detect_ms):
+                pace(True)
+            due = time.ticks_us()
+            continue
+        # Wait detect_ms, but glance at the newest sample every
+        # DETECT_INTERVAL_MS so a sudden leak cuts a relaxed wait short
+        left = detect_ms
+        while left > 0:
+            step = DETECT_INTERVAL_MS if left > DETECT_INTERVAL_MS else left
+            due = time.ticks_add(time.ticks_us(), step * 1000)
+            await asyncio.sleep_ms(step)
+            left -= step
+            if left > 0 and sampler.latest() > PACE_WAKE:
+                pace(True)
+                break
+
+def state_flags():
+    """Frame flag bits for the current system state"""
+    flags = 0
+    if alert_active:
+        flags |= frame.FLAG_ALERT
+    if system_on:
+        flags |= frame.FLAG_SYSTEM_ON
+    if outputs.get(RELAY):
+        flags |= frame.FLAG_VALVE_OPEN
+    if outputs.get(BUZZER):
+        flags |= frame.FLAG_BUZZER
+    return flags
+
+def add_reading(gas_value):
+    """Report a reading: into the JSON batch and as a binary frame"""
+    global frame_next
+    full = batcher.add(gas_value)
+    data = framer.encode_into(frame_pool[frame_next], time.ticks_ms(),
+                              last_raw_value, gas_value, state_flags())
+    frame_next = (frame_next + 1) % len(frame_pool)
+    if mqtt_connected:
+        outbox.put(MQTT_TOPIC_FRAME, data)
+    else:
+        spool.append(data)
+    if full:
+        flush_batch()
+
+def flush_batch():
+    """Queue the pending telemetry batch, if any"""
+    payload = batcher.flush()
+    if payload is not None:
+        publish(MQTT_TOPIC_BATCH, payload)
+        if channels:
+            publish(MQTT_TOPIC_SENSORS, sensors_payload())
+
+async def report_task():
+    """Console reading every REPORT_INTERVAL_MS"""
+    while True:
+        await asyncio.sleep_ms(REPORT_INTERVAL_MS)
+        try:
+            if system_on:
+                report_gas(last_gas_value)
+        except Exception as e:
+            logger.error("Error in report task: %s", e)
+
+async def telemetry_task():
+    """Add a reading every telemetry_ms (if it changed); send when due"""
+    while True:
+        await asyncio.sleep_ms(telemetry_ms)
+        try:
+            if not REPORT_BY_EXCEPTION or reporter.update(last_gas_value):
+                add_reading(last_gas_value)
+            if batcher.due():
+                flush_batch()
+        except Exception as e:
+            logger.error("Error in telemetry task: %s", e)
+
+async def mqtt_task():
+    """Drain incoming control messages; (re)connect one step at a time"""
+    global mqtt_connected
+    
+    while True:
+        if mqtt_connected:
+            try:
+                # check_msg() allocates even when idle; ask the poller first
+                if mqtt_link.readable():
+                    t = time.ticks_us()
+                    while mqtt_client.check_msg() is not None:
+                        pass
+                    h_check_msg.since(t)
+            except OSError as e:
+                logger.warn("✗ MQTT disconnected, reconnecting in background...")
+                mqtt_connected = False
+                mqtt_link.lost()
+            except Exception as e:
+                logger.error("Error in MQTT task: %s", e)
+        else:
+            failures = mqtt_link.failures
+            if mqtt_link.step():
+                on_mqtt_connected()
+                mqtt_link.deliver()     # commands that arrived while subscribing
+            elif mqtt_link.failures != failures:
+                logger.warn("✗ MQTT connect failed: %s", mqtt_link.last_error)
+        await asyncio.sleep_ms(MQTT_POLL_MS if mqtt_link.waiting() else MQTT_STEP_MS)
+
+async def publish_task():
+    """Send queued messages without holding up sampling or commands"""
+    while True:
+        await outbox.wait()
+        topic, payload = outbox.get()
+        if mqtt_connected:
+            try:
+                t = time.ticks_us()
+                mqtt_link.publish(topic, payload)
+                h_publish.since(t)
+            except Exception as e:
+                logger.warn("✗ Publish failed: %s", e)
+                if topic == MQTT_TOPIC_FRAME:
+                    spool.append(payload)
+        elif topic == MQTT_TOPIC_FRAME:
+            spool.append(payload)
+        await asyncio.sleep_ms(0)
+
+async def replay_task():
+    """Send spooled frames in order once MQTT is back, behind live traffic"""
+    while True:
+        await asyncio.sleep_ms(REPLAY_INTERVAL_MS)
+        if not mqtt_connected or not spool.pending() or len(outbox):
+            continue
+        try:
+            data = spool.take(REPLAY_BATCH)
+            for i in range(1, len(data), frame.FRAME_SIZE):
+                data[i] |= frame.FLAG_REPLAY
+            t = time.ticks_us()
+            mqtt_link.publish(MQTT_TOPIC_FRAME, data)
+            h_publish.since(t)
+            spool.ack(len(data) // frame.FRAME_SIZE)
+            if not spool.pending():
+                logger.info("Replay complete (dropped %d)", spool.dropped)
+        except Exception as e:
+            logger.warn("✗ Replay failed: %s", e)
+
+def metrics_payload():
+    """Compact JSON snapshot for LPG/<device>/system/metrics; starts a new period"""
+    try:
+        rssi = wifi.wlan.status('rssi')
+    except OSError:
+        rssi = None
+    return json.dumps({
+        'up': metrics.uptime_s(),
+        'rssi': rssi,
+        'heap': gc.mem_free(),
+        'hz': sample_rate(),
+        'awake': napper.duty() if napper is not None else 1000,
+        'alloc': gcgov.alloc_max,
+        'gc_us': gcgov.pause_max_us,
+        'mqtt': [mqtt_link.attempts, mqtt_link.failures, mqtt_link.max_ms],
+        'drop': [outbox.dropped, spool.dropped, logger.dropped, sampler.overruns,
+                 outbox.low_dropped, batcher.dropped],
+        'us': metrics.snapshot(),
+    }, separators=(',', ':'))
+
+async def metrics_task():
+    """Publish a metrics snapshot every METRICS_INTERVAL_MS"""
+    while True:
+        await asyncio.sleep_ms(METRICS_INTERVAL_MS)
+        if not mqtt_connected:
+            continue            # keep accumulating until it can be sent
+        try:
+            publish(MQTT_TOPIC_METRICS, metrics_payload())
+        except Exception as e:
+            logger.error("Error in metrics task: %s", e)
+
+async def servo_task():
+    """Ramp the vent to its target, one step every SERVO_STEP_MS"""
+    while True:
+        await vent_ready.wait()
+        vent_ready.clear()
+        while vent.advance():
+            await asyncio.sleep_ms(SERVO_STEP_MS)
+
+async def log_task():
+    """Write out buffered log lines while the other tasks are idle"""
+    while True:
+        await log_ready.wait()
+        log_ready.clear()
+        await asyncio.sleep_ms(0)   # let the task that logged finish first
+        while logger.flush(LOG_FLUSH_LINES):
+            await asyncio.sleep_ms(0)
+
+async def main():
+    global gcgov
+    gcgov = GcGovernor(GC_THRESHOLD, GC_MIN_FREE)
+    sampler.start()
+    sample_rate()               # start the first measurement period
+    print(f"Boot -> sampling: {time.ticks_ms()} ms")
+    asyncio.create_task(mqtt_task())
+    asyncio.create_task(publish_task())
+    asyncio.create_task(report_task())
+    asyncio.create_task(telemetry_task())
+    asyncio.create_task(replay_task())
+    asyncio.create_task(log_task())
+    asyncio.create_task(servo_task())
+    if METRICS_INTERVAL_MS:
+        asyncio.create_task(metrics_task())
+    await detect_task()
+
+# ==========================================
+# Main Program
+# ==========================================
+def run():
+    print("\n=== IoT Gas Leakage Detection System ===\n")
+    
+    # Connect to WiFi
+    if connect_wifi():
+        # MQTT connects in the background; monitoring does not wait for it
+        connect_mqtt()
+        print("\n✓ System Ready! Starting monitoring...\n")
+        
+        # Initialize normal mode
+        normal_mode()
+        
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            logger.flush(LOG_RING)
+            print("\nShutdown...")
+            sampler.stop()
+            all_off()
+    else:
+        print("Failed to connect to WiFi. Check credentials.")
+    
+    print("\nSystem halted.")
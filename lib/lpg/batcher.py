@@ -0,0 +1,81 @@
+# Batched telemetry: many readings per MQTT publish
+# MicroPython 1.20.0+
+
+import json
+import time
+from array import array
+
+
+class Batcher:
+    """
+    Collects readings with sequence numbers and tick timestamps and turns
+    them into one JSON message per batch:
+
+        {"seq":120,"t":5234000,"dt":[0,500,1000],"v":[412,415,409]}
+
+    `seq` is the sequence number of the first reading (the rest follow
+    consecutively), `t` its time.ticks_ms() value and `dt` each reading's
+    offset from it. A batch is due when it holds `size` readings or its
+    oldest reading is `window_ms` old; flush() can also be forced, e.g. on
+    a threshold crossing. add() returns True once the batch is full: flush
+    it then. A reading added to a full batch discards the batch and counts
+    its readings in `dropped`, so the gap in `seq` can be told apart from
+    lost messages.
+
+    With `lut` (e.g. the array from lpg.mq2.Mq2.build(), indexed by ADC
+    code) the message also carries each reading converted through it:
+
+        {..., "v":[412,415,409], "ppm":[11,11,10]}
+    """
+
+    def __init__(self, size=10, window_ms=10000, lut=None):
+        self.size = size
+        self.window_ms = window_ms
+        self.lut = lut
+        self.values = array('H', [0] * size)
+        self.offsets = array('L', [0] * size)
+        self.seq = 0            # sequence number of the next reading
+        self.n = 0
+        self.t0 = 0
+        self.dropped = 0        # readings discarded unsent (batch full, no flush)
+
+    def add(self, value, now=None):
+        """Add a reading; True when the batch is now full"""
+        if now is None:
+            now = time.ticks_ms()
+        if self.n == self.size:
+            self.dropped += self.n  # caller missed a flush; start over rather than grow
+            self.n = 0
+        if self.n == 0:
+            self.t0 = now
+        self.values[self.n] = value
+        self.offsets[self.n] = time.ticks_diff(now, self.t0)
+        self.n += 1
+        self.seq += 1
+        return self.n == self.size
+
+    def due(self, now=None):
+        if self.n == 0:
+            return False
+        if self.n >= self.size:
+            return True
+        if now is None:
+            now = time.ticks_ms()
+        return time.ticks_diff(now, self.t0) >= self.window_ms
+
+    def flush(self):
+        """Payload for the pending readings (None if empty); resets the batch"""
+        n = self.n
+        if n == 0:
+            return None
+        self.n = 0
+        msg = {
+            'seq': self.seq - n,
+            't': self.t0,
+            'dt': [self.offsets[i] for i in range(n)],
+            'v': [self.values[i] for i in range(n)],
+        }
+        lut = self.lut
+        if lut is not None:
+            msg['ppm'] = [lut[self.values[i]] for i in range(n)]
+        return json.dumps(msg, separators=(',', ':'))
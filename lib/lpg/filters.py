@@ -0,0 +1,167 @@
+# Streaming filters for the MQ-2 reading
+# Integer-only, fixed-size state: every update costs the same
+# MicroPython 1.20.0+
+
+import time
+from array import array
+
+
+class RunningMedian:
+    """Median of the last `window` samples (window is small and odd)"""
+
+    def __init__(self, window=5):
+        self.window = window
+        self.ring = array('H', [0] * window)    # arrival order
+        self.sorted = array('H', [0] * window)  # same values, ascending
+        self.pos = 0
+        self.count = 0
+
+    def update(self, x):
+        s = self.sorted
+        n = self.count
+        if n == self.window:
+            # Drop the oldest value from the sorted window
+            old = self.ring[self.pos]
+            i = 0
+            while s[i] != old:
+                i += 1
+            while i < n - 1:
+                s[i] = s[i + 1]
+                i += 1
+            n -= 1
+        # Insert x keeping the window sorted
+        i = n
+        while i > 0 and s[i - 1] > x:
+            s[i] = s[i - 1]
+            i -= 1
+        s[i] = x
+        self.count = n + 1
+        self.ring[self.pos] = x
+        self.pos += 1
+        if self.pos == self.window:
+            self.pos = 0
+        return s[self.count >> 1]
+
+
+class Ema:
+    """Exponential moving average with alpha = 1 / 2**shift, fixed point"""
+
+    def __init__(self, shift=3):
+        self.shift = shift
+        self.acc = -1
+
+    def update(self, x):
+        if self.acc < 0:
+            self.acc = x << self.shift
+        else:
+            self.acc += x - (self.acc >> self.shift)
+        return self.acc >> self.shift
+
+    @property
+    def value(self):
+        return self.acc >> self.shift if self.acc >= 0 else 0
+
+
+class GasFilter:
+    """
+    Median (kills single-sample ADC spikes) followed by EMA (smooths the
+    remaining noise). Oversampling happens earlier, in the Sampler.
+    """
+
+    def __init__(self, median_window=5, ema_shift=3):
+        self.median = RunningMedian(median_window)
+        self.ema = Ema(ema_shift)
+        self.raw = 0
+        self.value = 0
+
+    def update(self, raw):
+        self.raw = raw
+        self.value = self.ema.update(self.median.update(raw))
+        return self.value
+
+
+class Slope:
+    """
+    Least-squares slope of the last `window` (ticks_ms, value) pairs, in
+    counts per second, kept as running sums so update() is O(1). Sums are
+    taken relative to the oldest pair in the window and re-based as it
+    slides, which keeps them in small ints for windows of a few seconds.
+    rate() is 0 until the window is full and spans `min_span_ms`.
+    """
+
+    def __init__(self, window=8, min_span_ms=300):
+        self.window = window
+        self.min_span_ms = min_span_ms
+        self.times = array('l', [0] * window)
+        self.values = array('H', [0] * window)
+        self.pos = 0            # oldest pair once the window is full
+        self.count = 0
+        self.st = 0             # sum of (t - t0)
+        self.sx = 0             # sum of (x - x0)
+        self.stt = 0
+        self.stx = 0
+        self.rate = 0
+
+    def update(self, x, t):
+        """Add reading x taken at ticks_ms() t; returns rate() afterwards"""
+        window = self.window
+        times = self.times
+        values = self.values
+        pos = self.pos
+        n = self.count
+        full = n == window
+        if full:
+            # The oldest pair is the origin, so dropping it leaves the sums
+            # unchanged; move the origin to the next one instead
+            n -= 1
+            nxt = pos + 1
+            if nxt == window:
+                nxt = 0
+            d = time.ticks_diff(times[nxt], times[pos])
+            e = values[nxt] - values[pos]
+            st = self.st
+            sx = self.sx
+            self.stx -= e * st + d * sx - n * d * e
+            self.stt -= 2 * d * st - n * d * d
+            self.st = st - n * d
+            self.sx = sx - n * e
+            t0 = times[nxt]
+            x0 = values[nxt]
+        elif n:
+            t0 = times[pos]
+            x0 = values[pos]
+        else:
+            t0 = t
+            x0 = x
+        dt = time.ticks_diff(t, t0)
+        dx = x - x0
+        self.st += dt
+        self.sx += dx
+        self.stt += dt * dt
+        self.stx += dt * dx
+
+        if full:
+            times[pos] = t
+            values[pos] = x
+            self.pos = nxt
+        else:
+            times[n] = t
+            values[n] = x
+            self.count = n + 1
+        self.rate = self._rate(dt)
+        return self.rate
+
+    def _rate(self, span):
+        n = self.count
+        if n < self.window or span < self.min_span_ms:
+            return 0
+        den = (n * self.stt - self.st * self.st) // 1000
+        if den <= 0:
+            return 0
+        return (n * self.stx - self.st * self.sx) // den
+
+    def reset(self):
+        self.pos = 0
+        self.count = 0
+        self.st = self.sx = self.stt = self.stx = 0
+        self.rate = 0
@@ -0,0 +1,122 @@
+# Binary gas sample frame (firmware encoder + host decoder)
+# MicroPython 1.20.0+ / CPython 3
+#
+# Layout (little-endian, 20 bytes):
+#
+#   off  size  field
+#     0     1  version      (FRAME_VERSION)
+#     1     1  flags        (FLAG_* bits)
+#     2     6  device id    (machine.unique_id(), zero padded)
+#     8     4  seq          (uint32, +1 per frame, wraps)
+#    12     4  ticks        (time.ticks_ms() when sampled)
+#    16     2  raw          (last unfiltered ADC sample)
+#    18     2  filtered     (value the threshold check uses)
+
+import struct
+from collections import namedtuple
+
+FRAME_VERSION = 1
+FRAME_FORMAT = '<BB6sIIHH'
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)
+
+FLAG_ALERT = 0x01        # Alert mode active
+FLAG_SYSTEM_ON = 0x02    # System ON (not OFF command)
+FLAG_VALVE_OPEN = 0x04   # Relay on, gas flowing
+FLAG_BUZZER = 0x08       # Buzzer sounding
+FLAG_REPLAY = 0x10       # Sent late from the store-and-forward log
+
+_SEQ_MASK = 0xFFFFFFFF
+
+Frame = namedtuple('Frame', ('version', 'flags', 'device', 'seq', 'ticks',
+                             'raw', 'filtered'))
+
+
+class FrameEncoder:
+    """Packs readings for one device, numbering them consecutively"""
+
+    def __init__(self, device_id):
+        self.device = bytes(device_id[:6])
+        self.seq = 0            # sequence number of the next frame
+
+    def encode(self, ticks, raw, filtered, flags=0):
+        seq = self.seq
+        self.seq = (seq + 1) & _SEQ_MASK
+        return struct.pack(FRAME_FORMAT, FRAME_VERSION, flags, self.device,
+                           seq, ticks, raw, filtered)
+
+    def encode_into(self, buf, ticks, raw, filtered, flags=0):
+        """Like encode(), written into a FRAME_SIZE buffer (no allocation)"""
+        seq = self.seq
+        self.seq = (seq + 1) & _SEQ_MASK
+        struct.pack_into(FRAME_FORMAT, buf, 0, FRAME_VERSION, flags, self.device,
+                         seq, ticks, raw, filtered)
+        return buf
+
+
+def decode(data):
+    """Frame from bytes; ValueError on wrong length or unknown version"""
+    if len(data) != FRAME_SIZE:
+        raise ValueError("frame length %d != %d" % (len(data), FRAME_SIZE))
+    if data[0] != FRAME_VERSION:
+        raise ValueError("unsupported frame version %d" % data[0])
+    return Frame(*struct.unpack(FRAME_FORMAT, data))
+
+
+def decode_many(data):
+    """Frames from a payload of back-to-back frames (replayed batches)"""
+    if len(data) % FRAME_SIZE:
+        raise ValueError("payload length %d not a multiple of %d"
+                         % (len(data), FRAME_SIZE))
+    return [decode(data[i:i + FRAME_SIZE])
+            for i in range(0, len(data), FRAME_SIZE)]
+
+
+class SequenceTracker:
+    """
+    Host side: per-device loss, reorder and duplicate counts from frame
+    sequence numbers. A gap counts its frames as lost; if one of them
+    shows up later it moves from `lost` to `reordered`. Seq 0 after
+    other frames means the device restarted, unless it is a frame
+    skipped when the sequence wrapped.
+    """
+
+    MAX_TRACKED = 1024          # gaps wider than this are only counted
+
+    def __init__(self):
+        self.next_seq = {}      # device -> sequence number expected next
+        self.missing = {}       # device -> set of seqs skipped over
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+        self.restarts = 0
+
+    def add(self, frame):
+        """Account for a frame; returns 'ok', 'gap', 'late', 'dup' or 'reset'"""
+        self.received += 1
+        device = frame.device
+        expected = self.next_seq.get(device)
+        missing = self.missing.setdefault(device, set())
+        if frame.seq == 0 and expected and 0 not in missing:
+            missing.clear()
+            self.next_seq[device] = 1
+            self.restarts += 1
+            return 'reset'
+        if expected is None or frame.seq == expected:
+            self.next_seq[device] = (frame.seq + 1) & _SEQ_MASK
+            return 'ok'
+        ahead = (frame.seq - expected) & _SEQ_MASK
+        if ahead < 0x80000000:
+            if ahead <= self.MAX_TRACKED:
+                for i in range(ahead):
+                    missing.add((expected + i) & _SEQ_MASK)
+            self.lost += ahead
+            self.next_seq[device] = (frame.seq + 1) & _SEQ_MASK
+            return 'gap'
+        if frame.seq in missing:
+            missing.discard(frame.seq)
+            self.lost -= 1
+            self.reordered += 1
+            return 'late'
+        self.duplicates += 1
+        return 'dup'
@@ -0,0 +1,64 @@
+# GC governor: collect in idle windows, measure allocation and pauses
+# MicroPython 1.20.0+
+
+import gc
+import time
+
+
+class GcGovernor:
+    """
+    Keeps garbage collection off the hot path. gc.threshold() is raised to
+    `backstop` bytes so the allocator only collects on its own if the loop
+    misbehaves; poll(), called where the loop has time to spare, runs
+    gc.collect() once `threshold` bytes were allocated since the last
+    collection or free heap fell below `min_free`.
+
+    lap() is called once per loop iteration and records the bytes
+    allocated since the previous lap (alloc_last / alloc_max); laps that
+    span a collection are skipped. Collections are timed with ticks_us
+    (pause_last_us / pause_max_us).
+    """
+
+    def __init__(self, threshold=8192, min_free=16384, backstop=None):
+        self.threshold = threshold
+        self.min_free = min_free
+        self.collections = 0
+        self.pause_last_us = 0
+        self.pause_max_us = 0
+        self.alloc_last = 0
+        self.alloc_max = 0
+        self.laps = 0
+        self._skip = True
+        gc.threshold(backstop or 4 * threshold)
+        self._collect()
+        self._mark = gc.mem_alloc()
+
+    def lap(self):
+        now = gc.mem_alloc()
+        n = now - self._mark
+        self._mark = now
+        if n < 0 or self._skip:      # a collection ran during the lap
+            self._skip = False
+            return
+        self.alloc_last = n
+        if n > self.alloc_max:
+            self.alloc_max = n
+        self.laps += 1
+
+    def poll(self):
+        """Collect if due; True if a collection ran"""
+        if gc.mem_alloc() - self.base < self.threshold and gc.mem_free() >= self.min_free:
+            return False
+        self._collect()
+        self._skip = True
+        return True
+
+    def _collect(self):
+        t = time.ticks_us()
+        gc.collect()
+        pause = time.ticks_diff(time.ticks_us(), t)
+        self.base = gc.mem_alloc()
+        self.collections += 1
+        self.pause_last_us = pause
+        if pause > self.pause_max_us:
+            self.pause_max_us = pause
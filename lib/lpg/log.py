@@ -0,0 +1,125 @@
+# Leveled logger: fixed RAM ring, lazy formatting, flushed in idle time
+# MicroPython 1.20.0+
+
+DEBUG = 10
+INFO = 20
+WARN = 30
+ERROR = 40
+
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARN': WARN, 'ERROR': ERROR}
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARN: 'WARN', ERROR: 'ERROR'}
+
+_NO_ARG = object()
+
+
+class Logger:
+    """
+    debug() / info() / warn() / error() record a message into a ring of
+    `size` entries and return: the format string and up to three
+    arguments are stored as given and only formatted ('%') by flush(), so
+    a disabled level costs one comparison and an enabled one no heap.
+    When the ring is full the oldest entry is overwritten (`dropped`).
+
+    flush() formats up to `max_lines` pending entries, oldest first, and
+    hands each line to the sinks added with add_sink(sink, level), each
+    a callable sink(level, line) with its own minimum level. Call it
+    where the loop has time to spare; slow sinks (the UART) then never
+    hold up sampling. `notify`, if given, is called when an entry lands
+    in an empty ring (e.g. to wake a flush task).
+    """
+
+    def __init__(self, size=64, level=INFO, notify=None):
+        self.size = size
+        self.level = level
+        self.notify = notify
+        self.levels = bytearray(size)
+        self.fmts = [None] * size
+        self.arg_a = [None] * size
+        self.arg_b = [None] * size
+        self.arg_c = [None] * size
+        self.nargs = bytearray(size)
+        self.head = 0           # next slot to write
+        self.count = 0          # entries waiting for flush()
+        self.dropped = 0
+        self.sinks = []
+
+    def add_sink(self, sink, level=DEBUG):
+        self.sinks.append((sink, level))
+
+    def set_level(self, name):
+        """Change the level by name ('DEBUG', ...); False if unknown"""
+        level = LEVELS.get(name)
+        if level is None:
+            return False
+        self.level = level
+        return True
+
+    def enabled(self, level):
+        return level >= self.level
+
+    # ------------------------------------------
+    # Recording
+    # ------------------------------------------
+    def debug(self, fmt, a=_NO_ARG, b=_NO_ARG, c=_NO_ARG):
+        if DEBUG >= self.level:
+            self._record(DEBUG, fmt, a, b, c)
+
+    def info(self, fmt, a=_NO_ARG, b=_NO_ARG, c=_NO_ARG):
+        if INFO >= self.level:
+            self._record(INFO, fmt, a, b, c)
+
+    def warn(self, fmt, a=_NO_ARG, b=_NO_ARG, c=_NO_ARG):
+        if WARN >= self.level:
+            self._record(WARN, fmt, a, b, c)
+
+    def error(self, fmt, a=_NO_ARG, b=_NO_ARG, c=_NO_ARG):
+        if ERROR >= self.level:
+            self._record(ERROR, fmt, a, b, c)
+
+    def _record(self, level, fmt, a, b, c):
+        i = self.head
+        self.levels[i] = level
+        self.fmts[i] = fmt
+        self.arg_a[i] = a
+        self.arg_b[i] = b
+        self.arg_c[i] = c
+        self.nargs[i] = 0 if a is _NO_ARG else 1 if b is _NO_ARG else 2 if c is _NO_ARG else 3
+        self.head = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+            if self.count == 1 and self.notify is not None:
+                self.notify()
+        else:
+            self.dropped += 1
+
+    # ------------------------------------------
+    # Output
+    # ------------------------------------------
+    def flush(self, max_lines=8):
+        """Format and emit up to max_lines entries; returns how many"""
+        n = 0
+        while self.count and n < max_lines:
+            i = (self.head - self.count) % self.size
+            level = self.levels[i]
+            line = self._format(i)
+            self.fmts[i] = self.arg_a[i] = self.arg_b[i] = self.arg_c[i] = None
+            self.count -= 1
+            n += 1
+            for sink, min_level in self.sinks:
+                if level >= min_level:
+                    sink(level, line)
+        return n
+
+    def _format(self, i):
+        fmt = self.fmts[i]
+        nargs = self.nargs[i]
+        try:
+            if nargs == 0:
+                return fmt
+            if nargs == 1:
+                return fmt % (self.arg_a[i],)
+            if nargs == 2:
+                return fmt % (self.arg_a[i], self.arg_b[i])
+            return fmt % (self.arg_a[i], self.arg_b[i], self.arg_c[i])
+        except (TypeError, ValueError):
+            return "%s (bad log arguments)" % fmt
@@ -0,0 +1,104 @@
+# On-device latency histograms and the periodic metrics snapshot
+# MicroPython 1.20.0+
+
+import time
+from array import array
+
+
+class Histogram:
+    """
+    Durations in microseconds, counted in log2 buckets: bucket i holds
+    [2**i, 2**(i+1)) us (0 us lands in bucket 0), the last bucket
+    everything above. add() only touches preallocated storage, so it can
+    run in a timer callback. percentile() is the upper edge of the bucket
+    holding that rank (capped at max): within a factor of two.
+    """
+
+    def __init__(self, buckets=21):
+        self.counts = array('L', [0] * buckets)
+        self.last = buckets - 1
+        self.n = 0
+        self.min = 0
+        self.max = 0
+
+    def add(self, us):
+        if us < 0:
+            us = 0
+        if self.n == 0 or us < self.min:
+            self.min = us
+        if us > self.max:
+            self.max = us
+        self.n += 1
+        i = 0
+        us >>= 1
+        while us and i < self.last:
+            us >>= 1
+            i += 1
+        self.counts[i] += 1
+
+    def since(self, t_us):
+        """add() the time elapsed since ticks_us() value t_us"""
+        self.add(time.ticks_diff(time.ticks_us(), t_us))
+
+    def percentile(self, p):
+        if not self.n:
+            return 0
+        rank = (self.n * p + 99) // 100
+        seen = 0
+        for i in range(len(self.counts)):
+            seen += self.counts[i]
+            if seen >= rank:
+                if i == self.last:
+                    return self.max
+                edge = (2 << i) - 1
+                return edge if edge < self.max else self.max
+        return self.max
+
+    def summary(self):
+        """[count, min, p50, p99, max] in us"""
+        return [self.n, self.min, self.percentile(50), self.percentile(99), self.max]
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.n = 0
+        self.min = 0
+        self.max = 0
+
+
+class Metrics:
+    """
+    Named histograms, one per instrumented stage, kept in creation order.
+    hist(name) returns the stage's histogram, creating it on first use;
+    snapshot() summarises every stage that saw samples and, with
+    reset=True, starts the next period.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.hists = {}
+        self.started_ms = time.ticks_ms()
+        self.uptime_ms = 0      # accumulated, so it survives ticks_ms() wrap
+
+    def hist(self, name):
+        h = self.hists.get(name)
+        if h is None:
+            h = self.hists[name] = Histogram()
+            self.names.append(name)
+        return h
+
+    def uptime_s(self):
+        now = time.ticks_ms()
+        self.uptime_ms += time.ticks_diff(now, self.started_ms)
+        self.started_ms = now
+        return self.uptime_ms // 1000
+
+    def snapshot(self, reset=True):
+        stages = {}
+        for name in self.names:
+            h = self.hists[name]
+            if h.n:
+                stages[name] = h.summary()
+                if reset:
+                    h.reset()
+        return stages
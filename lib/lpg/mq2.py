@@ -0,0 +1,170 @@
+# MQ-2 calibration and the ADC code -> ppm lookup table
+# MicroPython 1.20.0+
+
+import json
+import math
+import struct
+from array import array
+
+ADC_CODES = 4096
+PPM_MAX = 65535             # LUT entries saturate here ('H')
+CLEAN_AIR_RATIO = 9.83      # Rs / R0 in clean air (datasheet)
+
+# LPG line of the datasheet sensitivity chart, log10(Rs/R0) = M * log10(ppm) + B,
+# through (200 ppm, 1.6) and (10000 ppm, 0.26)
+LPG_M = -0.4644
+LPG_B = 1.2727
+
+_LUT_MAGIC = b'PPM1'
+_LUT_HEADER = '<4sf'        # magic, R0 the table was built for
+
+
+class Mq2:
+    """
+    Converts MQ-2 readings to LPG ppm through a 4096-entry array('H')
+    indexed by the 12-bit ADC code, so a conversion costs one lookup.
+
+    As on the usual MQ-2 module, the sensor is the top of a divider fed
+    from `vc` volts and the output is the voltage across the load
+    resistor `rl_kohm` below it, so Rs = RL * (Vc - Vout) / Vout;
+    `divider` is output volts per ADC volt (e.g. 1.5 for a 5 V module
+    scaled into the 3.3 V ADC). The table
+    depends on R0 (the sensor's resistance in clean air / 9.83):
+    calibrate() measures it, and it is kept in `path` (JSON) with the
+    built table cached in `lut_path`, so a reboot neither recalibrates
+    nor recomputes the 4096 float conversions.
+    """
+
+    def __init__(self, r0_kohm=10.0, rl_kohm=5.0, vc=5.0, vref=3.3, divider=1.5,
+                 path='mq2.json', lut_path='ppm.lut'):
+        self.rl_kohm = rl_kohm
+        self.vc = vc
+        self.vref = vref
+        self.divider = divider
+        self.path = path
+        self.lut_path = lut_path
+        self.r0_kohm = r0_kohm
+        self.calibrated = False
+        self.clean_adc = None
+        self.lut = None
+        self._load()
+
+    # ------------------------------------------
+    # Conversion
+    # ------------------------------------------
+    def rs_kohm(self, code):
+        """Sensor resistance for an ADC code (None if out of range)"""
+        vs = code * self.vref * self.divider / (ADC_CODES - 1)
+        if vs <= 0 or vs >= self.vc:
+            return None
+        return self.rl_kohm * (self.vc - vs) / vs
+
+    def ppm_of(self, code):
+        """ppm for an ADC code computed in floats (what the table holds)"""
+        rs = self.rs_kohm(code)
+        if rs is None:
+            return 0 if code <= 0 else PPM_MAX
+        ppm = 10 ** ((math.log10(rs / self.r0_kohm) - LPG_B) / LPG_M)
+        return PPM_MAX if ppm >= PPM_MAX else int(ppm)
+
+    def build(self):
+        """Table for the current R0, from the flash cache if it matches"""
+        for _ in self.build_steps():
+            pass
+        return self.lut
+
+    def build_steps(self, chunk=ADC_CODES):
+        """
+        build() as a generator that computes `chunk` codes per step, so an
+        async caller can yield between steps. `lut` keeps the old table
+        until the new one is complete.
+        """
+        lut = self._load_lut()
+        if lut is None:
+            lut = array('H', [0] * ADC_CODES)
+            last = 0
+            for start in range(0, ADC_CODES, chunk):
+                for code in range(start, min(start + chunk, ADC_CODES)):
+                    ppm = self.ppm_of(code)
+                    if ppm < last:
+                        ppm = last      # keep it monotonic past the rails
+                    lut[code] = last = ppm
+                if start + chunk < ADC_CODES:
+                    yield
+            self._save_lut(lut)
+        self.lut = lut
+
+    def code_for(self, ppm):
+        """Lowest ADC code reading at least `ppm` (for thresholds in ppm)"""
+        lut = self.lut
+        lo = 0
+        hi = ADC_CODES - 1
+        if lut[hi] < ppm:
+            return hi
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if lut[mid] >= ppm:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    # ------------------------------------------
+    # Calibration
+    # ------------------------------------------
+    def calibrate(self, clean_adc):
+        """Set R0 from the mean ADC code in clean air; saves it and rebuilds"""
+        self.set_clean_air(clean_adc)
+        return self.build()
+
+    def set_clean_air(self, clean_adc):
+        """calibrate() without the rebuild (follow with build / build_steps)"""
+        rs = self.rs_kohm(clean_adc)
+        if rs is None:
+            raise ValueError("clean-air reading %d out of range" % clean_adc)
+        self.r0_kohm = rs / CLEAN_AIR_RATIO
+        self.clean_adc = clean_adc
+        self.calibrated = True
+        try:
+            with open(self.path, 'w') as f:
+                json.dump({'r0_kohm': self.r0_kohm, 'clean_adc': clean_adc}, f)
+        except OSError as e:
+            print(f"  MQ-2 calibration not saved: {e}")
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self.r0_kohm = float(saved['r0_kohm'])
+            self.clean_adc = saved.get('clean_adc')
+            self.calibrated = True
+        except (OSError, ValueError, KeyError):
+            pass
+
+    # ------------------------------------------
+    # Table cache (header + 8 KB)
+    # ------------------------------------------
+    def _load_lut(self):
+        size = struct.calcsize(_LUT_HEADER)
+        try:
+            with open(self.lut_path, 'rb') as f:
+                header = f.read(size)
+                if len(header) != size:
+                    return None
+                magic, r0 = struct.unpack(_LUT_HEADER, header)
+                if magic != _LUT_MAGIC or abs(r0 - self.r0_kohm) > 1e-3:
+                    return None
+                lut = array('H', [0] * ADC_CODES)
+                if f.readinto(lut) != 2 * ADC_CODES:
+                    return None
+                return lut
+        except (OSError, ValueError):
+            return None
+
+    def _save_lut(self, lut):
+        try:
+            with open(self.lut_path, 'wb') as f:
+                f.write(struct.pack(_LUT_HEADER, _LUT_MAGIC, self.r0_kohm))
+                f.write(lut)
+        except OSError as e:
+            print(f"  ppm table not cached: {e}")
@@ -0,0 +1,358 @@
+# Incremental MQTT (re)connect: one short step per call, with backoff
+# MicroPython 1.20.0+
+
+import time
+import errno
+import random
+import struct
+import usocket
+import ussl
+import uselect
+
+# Link states
+DOWN = 0        # Waiting out the backoff delay
+DNS = 1         # Resolve the broker hostname
+TCP = 2         # Non-blocking TCP connect in progress
+TLS = 3         # TLS handshake
+CONNECT = 4     # CONNECT sent, waiting for CONNACK
+SUBSCRIBE = 5   # SUBSCRIBE sent, waiting for SUBACK
+UP = 6
+
+STATE_NAMES = ('DOWN', 'DNS', 'TCP', 'TLS', 'CONNECT', 'SUBSCRIBE', 'UP')
+
+_POLLIN = uselect.POLLIN
+_POLLOUT = uselect.POLLOUT
+_POLLERR = uselect.POLLERR | uselect.POLLHUP
+
+
+def _field(value):
+    if isinstance(value, str):
+        value = value.encode()
+    return struct.pack('!H', len(value)) + value
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return out
+
+
+class MqttLink:
+    """
+    Drives an umqtt.simple MQTTClient from disconnected to subscribed one
+    step per step() call (DNS, TCP, TLS, CONNECT, SUBSCRIBE), so the
+    caller's loop keeps sampling and acting between steps. The TCP
+    connect and the CONNACK / SUBACK waits are polled, never blocked on;
+    DNS and the TLS handshake are single blocking calls (MicroPython has
+    no non-blocking form of either).
+
+    A failed attempt waits an exponentially growing delay with jitter
+    (between half and all of min(backoff_max_ms, backoff_ms * 2**n))
+    before the next one. On success the connected socket is handed to
+    the client, so client.check_msg() / publish() work as usual.
+
+    Counters: attempts, failures, successes, last_ms (duration of the
+    last successful attempt), max_ms, down_ms (last outage, from lost()
+    to UP).
+
+    Replies are read by their fixed header, never by an assumed size: a
+    PUBLISH the broker sends between SUBACKs (a retained control message,
+    say) is held and handed to the client's callback by deliver() once UP,
+    and only SUBACKs count towards the subscriptions.
+
+    Once UP, readable() and publish() give the steady-state loop a
+    non-allocating alternative to check_msg() polling and
+    MQTTClient.publish().
+    """
+
+    def __init__(self, client, topics, backoff_ms=500, backoff_max_ms=60000,
+                 timeout_ms=10000):
+        self.client = client
+        self.topics = topics
+        self.backoff_ms = backoff_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.timeout_ms = timeout_ms
+        self.state = DOWN
+        self.sock = None
+        self.addr = None
+        self.poller = uselect.poll()
+        self.rx = bytearray()
+        self.hdr = bytearray(5)     # PUBLISH fixed header, reused
+        self.fields = {}            # topic -> pre-encoded length + name
+        self.pending_subs = 0
+        self.held = []              # (topic, msg) PUBLISHes received before UP
+        self.retry_at = time.ticks_ms()
+        self.started = 0        # ticks when the current attempt began
+        self.lost_at = self.retry_at
+        self.step_at = 0        # ticks when the current step began
+        self.fail_streak = 0
+        self.attempts = 0
+        self.failures = 0
+        self.successes = 0
+        self.last_ms = 0
+        self.max_ms = 0
+        self.down_ms = 0
+        self.last_error = None
+
+    def state_name(self):
+        return STATE_NAMES[self.state]
+
+    def waiting(self):
+        """True while nothing is in flight (backoff or connected)"""
+        return self.state == DOWN or self.state == UP
+
+    def lost(self):
+        """Connection dropped: close it and reconnect after a short backoff"""
+        self._close()
+        self.state = DOWN
+        self.fail_streak = 0
+        self.lost_at = time.ticks_ms()
+        self.retry_at = self.lost_at
+
+    # ------------------------------------------
+    # State machine
+    # ------------------------------------------
+    def step(self):
+        """Advance at most one state; returns True when the link came UP"""
+        now = time.ticks_ms()
+        state = self.state
+        if state == UP:
+            return False
+        if state == DOWN:
+            if time.ticks_diff(now, self.retry_at) < 0:
+                return False
+            self.attempts += 1
+            self.started = now
+            self._enter(DNS, now)
+            return False
+        try:
+            if state == DNS:
+                self.addr = usocket.getaddrinfo(self.client.server, self.client.port)[0][-1]
+                self.sock = usocket.socket()
+                self.sock.setblocking(False)
+                try:
+                    self.sock.connect(self.addr)
+                except OSError as e:
+                    # errno, not a literal: the ESP32 port uses newlib numbers (119)
+                    if e.args[0] not in (errno.EINPROGRESS, errno.EALREADY):
+                        raise
+                self.poller.register(self.sock, _POLLOUT)
+                self._enter(TCP, now)
+            elif state == TCP:
+                events = self._poll()
+                if events & _POLLERR:
+                    raise OSError("TCP connect failed")
+                if events & _POLLOUT:
+                    self._enter(TLS if self.client.ssl else CONNECT, now)
+                    if not self.client.ssl:
+                        self._send_connect()
+            elif state == TLS:
+                self.poller.unregister(self.sock)
+                self.sock.setblocking(True)
+                self.sock = ussl.wrap_socket(self.sock, **self.client.ssl_params)
+                self.poller.register(self.sock, _POLLIN)
+                self._send_connect()
+                self._enter(CONNECT, now)
+            elif state == CONNECT:
+                packet = self._packet()
+                if packet is not None:
+                    if packet[0] != 0x20 or len(packet) != 4:
+                        raise OSError("expected CONNACK, got 0x%02x" % packet[0])
+                    if packet[3] != 0:
+                        raise OSError("CONNACK refused: %d" % packet[3])
+                    self._send_subscribe()
+                    self._enter(SUBSCRIBE, now)
+            elif state == SUBSCRIBE:
+                packet = self._packet()
+                if packet is not None:
+                    if packet[0] == 0x90:
+                        if packet[-1] == 0x80:
+                            raise OSError("SUBACK refused")
+                        self.pending_subs -= 1
+                        if not self.pending_subs:
+                            return self._up(now)
+                    elif packet[0] >> 4 == 3:
+                        self._hold(packet)
+            if self.state == state and state != DNS and state != TLS \
+                    and time.ticks_diff(now, self.step_at) >= self.timeout_ms:
+                raise OSError("%s timeout" % STATE_NAMES[state])
+        except Exception as e:
+            self._fail(e, now)
+        return False
+
+    def _enter(self, state, now):
+        self.state = state
+        self.step_at = now
+
+    def _up(self, now):
+        self.poller.modify(self.sock, _POLLIN)
+        self.client.sock = self.sock
+        self.state = UP
+        self.fail_streak = 0
+        self.successes += 1
+        self.last_ms = time.ticks_diff(now, self.started)
+        if self.last_ms > self.max_ms:
+            self.max_ms = self.last_ms
+        self.down_ms = time.ticks_diff(now, self.lost_at)
+        return True
+
+    def deliver(self):
+        """Pass the PUBLISHes held while subscribing to the client's callback"""
+        held = self.held
+        self.held = []
+        for topic, msg in held:
+            self.client.cb(topic, msg)
+
+    def _fail(self, error, now):
+        self._close()
+        self.failures += 1
+        self.fail_streak += 1
+        self.last_error = error
+        delay = self.backoff_ms << (self.fail_streak - 1 if self.fail_streak < 16 else 15)
+        if delay > self.backoff_max_ms:
+            delay = self.backoff_max_ms
+        half = delay >> 1
+        self.retry_at = time.ticks_add(now, half + (half * random.getrandbits(16) >> 16))
+        self.state = DOWN
+
+    def _close(self):
+        if self.sock is not None:
+            try:
+                self.poller.unregister(self.sock)
+            except Exception:
+                pass
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+        self.rx = bytearray()
+        self.held = []
+
+    # ------------------------------------------
+    # Steady state (UP)
+    # ------------------------------------------
+    def readable(self):
+        """True if check_msg() has something to do (data, EOF or error)"""
+        for _ in self.poller.ipoll(0):
+            return True
+        return False
+
+    def publish(self, topic, msg):
+        """QoS 0 PUBLISH from pre-encoded pieces; no heap use after first use of a topic"""
+        field = self.fields.get(topic)
+        if field is None:
+            field = self.fields[topic] = _field(topic)
+        if isinstance(msg, str):
+            msg = msg.encode()
+        hdr = self.hdr
+        n = len(field) + len(msg)
+        i = 1
+        while True:
+            byte = n & 0x7F
+            n >>= 7
+            hdr[i] = byte | 0x80 if n else byte
+            i += 1
+            if not n:
+                break
+        hdr[0] = 0x30
+        sock = self.sock
+        sock.write(hdr, i)
+        sock.write(field)
+        sock.write(msg)
+
+    # ------------------------------------------
+    # Packets
+    # ------------------------------------------
+    def _poll(self):
+        events = 0
+        for _, ev in self.poller.poll(0):
+            events |= ev
+        return events
+
+    def _size(self):
+        """Length of the packet in rx once its fixed header is in, else None"""
+        rx = self.rx
+        n = 0
+        for i in range(1, len(rx)):
+            n |= (rx[i] & 0x7F) << 7 * (i - 1)
+            if not rx[i] & 0x80:
+                return i + 1 + n
+            if i == 4:
+                raise OSError("bad remaining length")
+        return None
+
+    def _packet(self):
+        """
+        The next complete packet (fixed header included), or None while it
+        is still arriving. Reads no further than its end, so whatever
+        follows stays in the socket for the client.
+        """
+        events = self._poll()
+        if events & _POLLIN:
+            self.sock.setblocking(False)
+            try:
+                while True:
+                    size = self._size()
+                    want = 1 if size is None else size - len(self.rx)
+                    if not want:
+                        break
+                    data = self.sock.read(want)
+                    if data == b'':
+                        raise OSError("connection closed")
+                    if not data:
+                        break
+                    self.rx.extend(data)
+            finally:
+                self.sock.setblocking(True)
+        elif events & _POLLERR:
+            raise OSError("connection lost")
+        size = self._size()
+        if size is None or len(self.rx) < size:
+            return None
+        packet = self.rx
+        self.rx = bytearray()
+        return packet
+
+    def _hold(self, packet):
+        """Keep a PUBLISH that arrived before UP for deliver()"""
+        i = 1
+        while packet[i] & 0x80:                         # skip the remaining length
+            i += 1
+        tlen = packet[i + 1] << 8 | packet[i + 2]
+        i += 3
+        topic = bytes(packet[i:i + tlen])
+        i += tlen
+        if packet[0] & 6:
+            i += 2                                      # packet id (QoS > 0)
+        self.held.append((topic, bytes(packet[i:])))
+
+    def _send_connect(self):
+        c = self.client
+        flags = 0x02                                    # clean session
+        payload = _field(c.client_id)
+        if c.lw_topic:
+            flags |= 0x04 | (c.lw_qos & 3) << 3
+            if c.lw_retain:
+                flags |= 0x20
+            payload += _field(c.lw_topic) + _field(c.lw_msg)
+        if c.user is not None:
+            flags |= 0xC0
+            payload += _field(c.user) + _field(c.pswd)
+        variable = b'\x00\x04MQTT\x04' + bytes([flags]) + struct.pack('!H', c.keepalive)
+        self.sock.write(b'\x10' + _varint(len(variable) + len(payload)))
+        self.sock.write(variable)
+        self.sock.write(payload)
+
+    def _send_subscribe(self):
+        c = self.client
+        for topic in self.topics:
+            c.pid += 1
+            body = struct.pack('!H', c.pid) + _field(topic) + b'\x00'
+            self.sock.write(b'\x82' + _varint(len(body)))
+            self.sock.write(body)
+        self.pending_subs = len(self.topics)
@@ -0,0 +1,68 @@
+# Actuator shadow: only changed outputs are written, scenes in safety order
+# MicroPython 1.20.0+
+
+# Output indexes (scene tuple positions)
+RELAY = 0       # 1: valve open (gas flowing)
+SERVO = 1       # PWM duty
+BUZZER = 2
+RED = 3
+GREEN = 4
+
+NAMES = ('relay', 'servo', 'buzzer', 'red', 'green')
+KEEP = None     # Scene entry: leave this output as it is
+
+# Write order: a scene that closes the gas valve does that first, one
+# that opens it does that last, once the vent and alarm are settled
+CLOSE_ORDER = (RELAY, SERVO, BUZZER, RED, GREEN)
+OPEN_ORDER = (SERVO, BUZZER, RED, GREEN, RELAY)
+
+
+class Outputs:
+    """
+    Holds the last value written to each output and touches the hardware
+    only when a new value differs, so repeating a mode (or a command) costs
+    a comparison instead of a GPIO write, and the servo is not re-driven
+    with the duty it already has.
+
+    A scene is a tuple with one entry per output in index order (KEEP to
+    leave one alone). apply() writes it without yielding, so no other
+    task sees half a scene, and in safety order: the valve is closed
+    before the vent moves or the alarm sounds, and opened only after the
+    rest of the scene is in place. The shadow starts unknown, so the
+    first scene writes everything.
+    """
+
+    def __init__(self, relay, servo, buzzer, red, green):
+        self.pins = (relay, servo, buzzer, red, green)
+        self.shadow = [None] * len(NAMES)
+        self.writes = 0
+        self.skipped = 0
+
+    def set(self, index, value):
+        """Drive one output; True if the hardware was written"""
+        if self.shadow[index] == value:
+            self.skipped += 1
+            return False
+        if index == SERVO:
+            self.pins[SERVO].duty(value)
+        else:
+            self.pins[index].value(value)
+        self.shadow[index] = value
+        self.writes += 1
+        return True
+
+    def get(self, index):
+        return self.shadow[index]
+
+    def apply(self, scene):
+        """Write a scene in safety order; returns the number of outputs changed"""
+        changed = 0
+        for index in OPEN_ORDER if scene[RELAY] else CLOSE_ORDER:
+            value = scene[index]
+            if value is not KEEP and self.set(index, value):
+                changed += 1
+        return changed
+
+    def report(self):
+        """Current outputs, e.g. 'relay=1 servo=38 buzzer=0 red=0 green=1'"""
+        return ' '.join(f"{NAMES[i]}={self.shadow[i]}" for i in range(len(NAMES)))
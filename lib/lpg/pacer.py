@@ -0,0 +1,61 @@
+# Adaptive pacing: work faster the closer the gas is to tripping
+# MicroPython 1.20.0+
+
+LEVEL_MAX = 256
+
+
+class Pacer:
+    """
+    Turns the filtered reading and its rise rate into a `level` between
+    0 (at the trip point, sample as fast as allowed) and LEVEL_MAX (at
+    least `far` counts below it, relax to the slowest periods), and
+    scales configured periods with it.
+
+    Distance sets the level linearly. A rising reading also caps it by
+    the projected time to `trip`: reaching it within `lead_ms` pulls the
+    level down in proportion, so a fast climb from far below speeds up
+    sampling before the distance alone would. The level drops at once
+    but climbs by at most `relax` per update, so a reading that dips
+    and recovers does not flip the cadence back and forth; wake() skips
+    straight to level 0.
+    """
+
+    def __init__(self, trip=1200, far=600, lead_ms=5000, relax=16):
+        self.trip = trip
+        self.far = far
+        self.lead_ms = lead_ms
+        self.relax = relax
+        self.level = LEVEL_MAX
+
+    def update(self, value, rate=0):
+        """New level for a reading (ADC counts) rising at `rate` counts/s"""
+        margin = self.trip - value
+        if margin <= 0:
+            target = 0
+        elif margin >= self.far:
+            target = LEVEL_MAX
+        else:
+            target = margin * LEVEL_MAX // self.far
+        if rate > 0 and target:
+            eta_ms = margin * 1000 // rate
+            if eta_ms < self.lead_ms:
+                eta_level = eta_ms * LEVEL_MAX // self.lead_ms
+                if eta_level < target:
+                    target = eta_level
+        level = self.level
+        if target < level:
+            level = target
+        elif target > level + self.relax:
+            level += self.relax
+        else:
+            level = target
+        self.level = level
+        return level
+
+    def wake(self):
+        """Jump to the fastest pace (e.g. on a raw sample far above the filter)"""
+        self.level = 0
+
+    def scale(self, fast, slow):
+        """`fast` at level 0, `slow` at LEVEL_MAX, linear in between"""
+        return fast + (slow - fast) * self.level // LEVEL_MAX
@@ -0,0 +1,68 @@
+# Light sleep between detection passes, with awake-time accounting
+# MicroPython 1.20.0+
+
+import time
+import machine
+
+try:
+    import esp32
+except ImportError:
+    esp32 = None
+
+
+class Napper:
+    """
+    Spends idle waits in machine.lightsleep() instead of the uasyncio
+    scheduler spinning, and measures the awake share of the time.
+
+    Hardware timers stop in light sleep, so the caller stops timer-driven
+    sampling before nap() and reads the sensor itself on waking. The WiFi
+    association survives in modem power-save; packets that arrive during
+    a nap wait in the socket until the next poll, as the ESP32 cannot wake
+    from light sleep on WiFi traffic.
+
+    If `wake_pin` is given (e.g. the MQ-2 module's D0 comparator output,
+    low above its potentiometer setting) a nap also ends the moment that
+    pin goes to `wake_level`.
+    """
+
+    def __init__(self, wake_pin=None, wake_level=0):
+        self.wake_pin = wake_pin
+        self.wake_level = wake_level
+        if wake_pin is not None and esp32 is not None:
+            esp32.wake_on_ext0(wake_pin, esp32.WAKEUP_ANY_HIGH if wake_level
+                               else esp32.WAKEUP_ALL_LOW)
+        self.naps = 0
+        self.woken = 0          # naps cut short by the wake pin
+        self.asleep_ms = 0      # total
+        self.period_start = time.ticks_ms()
+        self.period_asleep = 0
+
+    def pin_active(self):
+        return self.wake_pin is not None and self.wake_pin.value() == self.wake_level
+
+    def nap(self, ms):
+        """Light sleep up to ms; returns True if the wake pin ended it early"""
+        if self.pin_active():
+            return True
+        t = time.ticks_ms()
+        machine.lightsleep(ms)
+        slept = time.ticks_diff(time.ticks_ms(), t)
+        self.naps += 1
+        self.asleep_ms += slept
+        self.period_asleep += slept
+        if slept < ms and self.pin_active():
+            self.woken += 1
+            return True
+        return False
+
+    def duty(self):
+        """Awake share since the last call, in per mille (1000: never slept)"""
+        now = time.ticks_ms()
+        elapsed = time.ticks_diff(now, self.period_start)
+        asleep = self.period_asleep
+        self.period_start = now
+        self.period_asleep = 0
+        if elapsed <= 0:
+            return 1000
+        return (elapsed - asleep) * 1000 // elapsed
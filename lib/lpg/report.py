@@ -0,0 +1,36 @@
+# Report-by-exception: publish only what changed
+# MicroPython 1.20.0+
+
+import time
+
+
+class ExceptionReporter:
+    """
+    Decides whether a reading is worth sending: it moved more than
+    `deadband` from the last reported value, or `heartbeat_ms` passed
+    since the last report (so a quiet detector still proves it is alive).
+    """
+
+    def __init__(self, deadband=25, heartbeat_ms=60000):
+        self.deadband = deadband
+        self.heartbeat_ms = heartbeat_ms
+        self.last_value = None
+        self.last_ticks = 0
+        self.suppressed = 0
+
+    def update(self, value, now=None):
+        """True if value should be reported (and records it as reported)"""
+        if now is None:
+            now = time.ticks_ms()
+        if (self.last_value is None
+                or abs(value - self.last_value) > self.deadband
+                or time.ticks_diff(now, self.last_ticks) >= self.heartbeat_ms):
+            self.force(value, now)
+            return True
+        self.suppressed += 1
+        return False
+
+    def force(self, value, now=None):
+        """Record a value that was reported through another path (alerts)"""
+        self.last_value = value
+        self.last_ticks = time.ticks_ms() if now is None else now
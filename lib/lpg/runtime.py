@@ -0,0 +1,76 @@
+# Cooperative runtime helpers for the uasyncio firmware
+# MicroPython 1.20.0+
+
+import uasyncio as asyncio
+from collections import deque
+
+
+class Sequencer:
+    """
+    Runs at most one timed actuator sequence (TEST, SERVO_WITH_FAN, ...)
+    as a background task. Starting a new sequence or calling cancel()
+    stops the current one at its next sleep.
+    """
+
+    def __init__(self):
+        self.task = None
+
+    def start(self, coro):
+        self.cancel()
+        self.task = asyncio.create_task(coro)
+
+    def cancel(self):
+        if self.task is not None:
+            if not self.task.done():
+                self.task.cancel()
+            self.task = None
+
+    def busy(self):
+        return self.task is not None and not self.task.done()
+
+
+class Outbox:
+    """
+    Bounded queue of (topic, payload) waiting to be published.
+    When full the oldest message is dropped so fresh readings win.
+
+    Low-priority messages (log lines) go to a second, smaller queue
+    that is only drained while the main one is empty, so a burst of
+    them can never push a status message or frame out.
+    """
+
+    def __init__(self, size=16, low_size=8):
+        self.queue = deque((), size)
+        self.low = deque((), low_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.low_dropped = 0
+        self.size = size
+        self.low_size = low_size
+
+    def put(self, topic, payload):
+        if len(self.queue) >= self.size:
+            self.queue.popleft()
+            self.dropped += 1
+        self.queue.append((topic, payload))
+        self.ready.set()
+
+    def put_low(self, topic, payload):
+        if len(self.low) >= self.low_size:
+            self.low.popleft()
+            self.low_dropped += 1
+        self.low.append((topic, payload))
+        self.ready.set()
+
+    def get(self):
+        if self.queue:
+            return self.queue.popleft()
+        return self.low.popleft()
+
+    def __len__(self):
+        return len(self.queue) + len(self.low)
+
+    async def wait(self):
+        while not self.queue and not self.low:
+            self.ready.clear()
+            await self.ready.wait()
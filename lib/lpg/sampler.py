@@ -0,0 +1,120 @@
+# Timer-driven ADC sampling into a preallocated ring buffer
+# MicroPython 1.20.0+
+
+import time
+from array import array
+from machine import Timer
+
+# Counters wrap here so they stay small ints (no heap use in the callback)
+_WRAP = 1 << 28
+_WRAP_MASK = _WRAP - 1
+
+
+class Sampler:
+    """
+    Reads one ADC channel at a fixed rate from a hardware timer callback
+    into an array('H') ring. The callback only indexes and stores, so it
+    never allocates; the main loop pulls samples out with drain().
+
+    The timer callback is the only writer of `written`, the consumer the
+    only writer of `read`, so no locking is needed. If the consumer falls
+    more than `size` samples behind, the oldest are dropped and counted in
+    `overruns`.
+
+    With oversample > 1 each stored sample is the mean of that many
+    back-to-back ADC reads, which averages out conversion noise.
+
+    If `hist` (an lpg.metrics.Histogram) is given, each callback's ADC
+    reads are timed into it.
+
+    `extra` (an lpg.sensors.Scanner) is ticked after every sample, so
+    further channels share this timer instead of needing their own.
+    """
+
+    def __init__(self, adc, rate_hz=100, size=256, timer_id=0, oversample=1,
+                 hist=None, extra=None):
+        if size & (size - 1):
+            raise ValueError("size must be a power of two")
+        self.adc = adc
+        self.rate_hz = rate_hz
+        self.oversample = oversample
+        self.size = size
+        self.mask = size - 1
+        self.buf = array('H', [0] * size)
+        self.written = 0
+        self.read = 0
+        self.overruns = 0
+        self.hist = hist
+        self.timer = Timer(timer_id)
+        self._cb = self._tick  # bind once: a bound method allocates per lookup
+        self._extra = extra.tick if extra is not None and len(extra) else None
+
+    def start(self):
+        self.timer.init(mode=Timer.PERIODIC, freq=self.rate_hz, callback=self._cb)
+
+    def stop(self):
+        self.timer.deinit()
+
+    def set_rate(self, rate_hz):
+        """Change the sampling rate; restarts the timer only if it differs"""
+        if rate_hz != self.rate_hz:
+            self.rate_hz = rate_hz
+            self.timer.init(mode=Timer.PERIODIC, freq=rate_hz, callback=self._cb)
+
+    def sample(self, n=1):
+        """Take n samples right now (e.g. while the timer is stopped)"""
+        for _ in range(n):
+            self._tick(None)
+
+    def count(self):
+        """Samples taken so far (wraps at 2**28, see samples_since())"""
+        return self.written
+
+    def samples_since(self, mark):
+        """Samples taken since count() returned `mark`"""
+        return (self.written - mark) & _WRAP_MASK
+
+    def _tick(self, t):
+        adc = self.adc
+        hist = self.hist
+        if hist is not None:
+            t = time.ticks_us()
+        total = 0
+        for _ in range(self.oversample):
+            total += adc.read()
+        if hist is not None:
+            hist.since(t)
+        w = self.written
+        self.buf[w & self.mask] = total // self.oversample
+        self.written = (w + 1) & _WRAP_MASK
+        if self._extra is not None:
+            self._extra()
+
+    # ------------------------------------------
+    # Consumer API
+    # ------------------------------------------
+    def available(self):
+        n = (self.written - self.read) & _WRAP_MASK
+        return n if n < self.size else self.size
+
+    def latest(self):
+        return self.buf[(self.written - 1) & self.mask]
+
+    def drain(self, out):
+        """Copy the oldest unread samples into `out`; returns how many"""
+        w = self.written
+        r = self.read
+        n = (w - r) & _WRAP_MASK
+        if n > self.size:
+            self.overruns += n - self.size
+            r = (w - self.size) & _WRAP_MASK
+            n = self.size
+        if n > len(out):
+            n = len(out)
+        buf = self.buf
+        mask = self.mask
+        for i in range(n):
+            out[i] = buf[(r + i) & mask]
+        self.read = (r + n) & _WRAP_MASK
+        return n
+
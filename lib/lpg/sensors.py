@@ -0,0 +1,145 @@
+# Extra analog gas sensors scanned round-robin from the sampler timer
+# MicroPython 1.20.0+
+
+import time
+from array import array
+
+_WRAP = 1 << 28
+_WRAP_MASK = _WRAP - 1
+_COST_SPAN = 1 << 16    # reads the mean cost is (roughly) taken over
+
+
+class Channel:
+    """
+    One analog sensor besides the main MQ-2 (another room, an MQ-5, a CO
+    cell, ...): its own array('H') ring, filter, alarm thresholds and,
+    for an MQ-2, its own calibration (an lpg.mq2.Mq2, whose table gives
+    ppm). read() runs in the timer callback and only stores; process()
+    runs in the detection pass.
+
+    Every read is timed: `cost_us` / `reads` is the mean scan cost of the
+    channel (ADC conversions included), and `hist` (an
+    lpg.metrics.Histogram) gets each one for the metrics snapshot.
+    """
+
+    def __init__(self, name, adc, gas_filter, alarm, mq2=None, size=64,
+                 oversample=1, hist=None):
+        if size & (size - 1):
+            raise ValueError("size must be a power of two")
+        self.name = name
+        self.adc = adc
+        self.filter = gas_filter
+        self.alarm = alarm
+        self.mq2 = mq2          # None: ADC counts only
+        self.oversample = oversample
+        self.size = size
+        self.mask = size - 1
+        self.buf = array('H', [0] * size)
+        self.written = 0
+        self.read_pos = 0
+        self.overruns = 0
+        self.hist = hist
+        self.cost_us = 0
+        self.reads = 0
+        self.value = 0
+
+    def read(self):
+        """Take one sample into the ring (timer callback: no allocation)"""
+        t = time.ticks_us()
+        adc = self.adc
+        total = 0
+        for _ in range(self.oversample):
+            total += adc.read()
+        w = self.written
+        self.buf[w & self.mask] = total // self.oversample
+        self.written = (w + 1) & _WRAP_MASK
+        us = time.ticks_diff(time.ticks_us(), t)
+        if self.reads == _COST_SPAN:
+            self.cost_us >>= 1          # keep the totals small ints
+            self.reads >>= 1
+        self.cost_us += us
+        self.reads += 1
+        if self.hist is not None:
+            self.hist.add(us)
+
+    def process(self, now=None):
+        """Filter the unread samples; the alarm transition, or None"""
+        w = self.written
+        r = self.read_pos
+        n = (w - r) & _WRAP_MASK
+        if not n:
+            return None
+        if n > self.size:
+            self.overruns += n - self.size
+            r = (w - self.size) & _WRAP_MASK
+            n = self.size
+        buf = self.buf
+        mask = self.mask
+        gas_filter = self.filter
+        for i in range(n):
+            gas_filter.update(buf[(r + i) & mask])
+        self.read_pos = w
+        self.value = self.filter.value
+        return self.alarm.update(self.value, now)
+
+    def ppm(self):
+        return None if self.mq2 is None else self.mq2.lut[self.value]
+
+    def mean_cost_us(self):
+        return self.cost_us // self.reads if self.reads else 0
+
+
+class Scanner:
+    """
+    Registry of extra channels, read round-robin: tick() (called from the
+    Sampler's timer callback, after the main sensor) reads the next one,
+    so each of N channels is sampled at the sampler rate / N and a tick
+    costs one channel however many are registered.
+    """
+
+    def __init__(self, channels):
+        self.channels = tuple(channels)
+        self.next = 0
+
+    def __len__(self):
+        return len(self.channels)
+
+    def tick(self):
+        channels = self.channels
+        if not channels:
+            return
+        i = self.next
+        channels[i].read()
+        i += 1
+        self.next = 0 if i == len(channels) else i
+
+    def alarmed(self):
+        """True if any channel's alarm is not NORMAL"""
+        for ch in self.channels:
+            if ch.alarm.state:
+                return True
+        return False
+
+    def reset(self):
+        for ch in self.channels:
+            ch.alarm.reset()
+
+    def cost_us(self):
+        """Highest mean read cost among the channels (us), 0 before any read"""
+        cost = 0
+        for ch in self.channels:
+            c = ch.mean_cost_us()
+            if c > cost:
+                cost = c
+        return cost
+
+
+def capacity(rate_hz, cost_us, budget_pct=25):
+    """
+    Channels that can each be read rate_hz times a second at cost_us per
+    read (e.g. Scanner.cost_us()) without the ADC scan taking more than
+    budget_pct of the CPU
+    """
+    if rate_hz <= 0 or cost_us <= 0:
+        return 0
+    return 10000 * budget_pct // (rate_hz * cost_us)
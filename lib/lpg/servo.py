@@ -0,0 +1,84 @@
+# Vent servo: calibrated angle -> duty table and non-blocking motion
+# MicroPython 1.20.0+
+
+from array import array
+
+ANGLE_MAX = 180
+
+
+def duty_table(duty_0, duty_90, duty_180):
+    """
+    PWM duty for every whole degree 0-180, piecewise linear through the
+    three calibration points (set per device in config.py), rounded in
+    integers once at boot so moving the servo never does float math.
+    """
+    table = array('H', [0] * (ANGLE_MAX + 1))
+    for angle in range(ANGLE_MAX + 1):
+        if angle <= 90:
+            table[angle] = duty_0 + ((duty_90 - duty_0) * angle + 45) // 90
+        else:
+            table[angle] = duty_90 + ((duty_180 - duty_90) * (angle - 90) + 45) // 90
+    return table
+
+
+def parse_angle(text):
+    """'135' -> 135; None unless a whole number of degrees in 0-180"""
+    if not text or not text.isdigit() or len(text) > 3:
+        return None
+    angle = int(text)
+    return angle if angle <= ANGLE_MAX else None
+
+
+class Motion:
+    """
+    Moves the servo towards a target angle at `speed_dps` degrees per
+    second in steps of `step_ms`, instead of jumping there in one duty
+    write. move() only sets the target; the caller calls advance() every
+    `step_ms` (a uasyncio task or a timer) until it returns False, so a
+    ramp never blocks sampling. speed_dps=0 jumps, as does the first move
+    (the servo's position is unknown until then).
+
+    `write` takes a duty value, e.g. Outputs.set bound to the servo, so
+    a step that lands on the same duty costs no PWM write.
+    """
+
+    def __init__(self, write, table, speed_dps=360, step_ms=20):
+        self.write = write
+        self.table = table
+        self.step_ms = step_ms
+        self.step = speed_dps * step_ms // 1000 if speed_dps else ANGLE_MAX
+        if self.step < 1:
+            self.step = 1
+        self.angle = None       # last angle written
+        self.target = None
+
+    def move(self, angle):
+        """Head for angle; True if advance() calls are needed to get there"""
+        if angle < 0:
+            angle = 0
+        elif angle > ANGLE_MAX:
+            angle = ANGLE_MAX
+        self.target = angle
+        if self.angle is None or self.step >= ANGLE_MAX:
+            self._go(angle)
+        return self.angle != angle
+
+    def moving(self):
+        return self.angle != self.target
+
+    def advance(self):
+        """One step towards the target; False once it is reached"""
+        angle = self.angle
+        target = self.target
+        if angle == target:
+            return False
+        if target > angle:
+            angle = target if target - angle <= self.step else angle + self.step
+        else:
+            angle = target if angle - target <= self.step else angle - self.step
+        self._go(angle)
+        return angle != target
+
+    def _go(self, angle):
+        self.angle = angle
+        self.write(self.table[angle])
@@ -0,0 +1,135 @@
+# Store-and-forward: fixed-size circular log on the ESP32 filesystem
+# MicroPython 1.20.0+
+
+import struct
+
+
+class Spool:
+    """
+    Append-only ring of fixed-size records in one preallocated file.
+
+    Each slot holds a 4-byte spool sequence number followed by the record
+    (e.g. a 20-byte lpg.frame). Record n always lands in slot n % slots, so
+    every slot is rewritten once per lap of the ring: flash wear is even
+    and bounded by the number of appends. When the ring is full the oldest
+    unsent record is overwritten and counted in `dropped`.
+
+    Replay is take(n) -> ack(n). ack() stores the sequence number of the
+    next record to send in a 4-byte side file, once per replayed batch. On
+    boot the slots are scanned to find the newest record, so anything not
+    yet acknowledged survives a reset. A slot whose number does not match
+    its position (torn by a reset mid-write) is ignored, and an unreadable
+    side file means replaying everything still in the ring. RAM use is
+    one slot buffer.
+    """
+
+    def __init__(self, path='spool.bin', slots=512, record_size=20):
+        self.path = path
+        self.index_path = path + '.idx'
+        self.slots = slots
+        self.record_size = record_size
+        self.slot_size = 4 + record_size
+        self.buf = bytearray(self.slot_size)
+        self.mv = memoryview(self.buf)
+        self.head = 1           # sequence number of the next record
+        self.tail = 1           # oldest record not yet acknowledged
+        self.dropped = 0
+        self.writes = 0         # slot writes since boot (flash wear)
+        self.file = self._open()
+
+    def _open(self):
+        size = self.slots * self.slot_size
+        try:
+            f = open(self.path, 'r+b')
+            if f.seek(0, 2) == size:
+                self._scan(f)
+                return f
+            f.close()
+        except OSError:
+            pass
+        # New log (or different geometry): preallocate all slots once
+        f = open(self.path, 'w+b')
+        empty = bytes(self.slot_size)
+        for _ in range(self.slots):
+            f.write(empty)
+        f.flush()
+        self._save_tail()
+        return f
+
+    def _scan(self, f):
+        newest = 0
+        oldest = 0
+        f.seek(0)
+        for slot in range(self.slots):
+            f.readinto(self.buf)
+            seq = struct.unpack_from('<I', self.buf, 0)[0]
+            # A slot whose number does not belong there was torn mid-write
+            if seq and seq % self.slots == slot:
+                if seq > newest:
+                    newest = seq
+                if not oldest or seq < oldest:
+                    oldest = seq
+        self.head = newest + 1
+        tail = self._load_tail()
+        if oldest > tail or tail > self.head:
+            tail = oldest or self.head     # garbled index: replay all kept
+        self.tail = tail
+
+    def _load_tail(self):
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read(4)
+        except OSError:
+            return 1
+        return struct.unpack('<I', data)[0] if len(data) == 4 else 1
+
+    def _save_tail(self):
+        with open(self.index_path, 'wb') as f:
+            f.write(struct.pack('<I', self.tail))
+
+    def _seek(self, seq):
+        self.file.seek((seq % self.slots) * self.slot_size)
+
+    # ------------------------------------------
+    # Writer
+    # ------------------------------------------
+    def append(self, record):
+        seq = self.head
+        struct.pack_into('<I', self.buf, 0, seq)
+        self.mv[4:] = record
+        self._seek(seq)
+        self.file.write(self.buf)
+        self.file.flush()
+        self.writes += 1
+        self.head = seq + 1
+        if self.head - self.tail > self.slots:
+            self.tail = self.head - self.slots
+            self.dropped += 1
+
+    # ------------------------------------------
+    # Replay
+    # ------------------------------------------
+    def pending(self):
+        return self.head - self.tail
+
+    def take(self, n):
+        """Up to n oldest unsent records, concatenated (not yet removed)"""
+        if n > self.head - self.tail:
+            n = self.head - self.tail
+        size = self.record_size
+        out = bytearray(n * size)
+        for i in range(n):
+            self._seek(self.tail + i)
+            self.file.readinto(self.buf)
+            out[i * size:(i + 1) * size] = self.mv[4:]
+        return out
+
+    def ack(self, n):
+        """Mark the first n records from take() as sent"""
+        self.tail += n
+        if self.tail > self.head:
+            self.tail = self.head
+        self._save_tail()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,37 @@
+# Per-device MQTT topics, so many detectors can share one broker
+# MicroPython 1.20.0+ / CPython 3
+#
+#   LPG/<device>/gas/value            readings, status, batches, ... of one unit
+#   LPG/<device>/system/control       commands for that unit only
+#   LPG/group/<group>/system/control  commands for every unit in a group
+#   LPG/all/system/control            commands for every unit
+#
+# <device> is the hex machine.unique_id() (the WiFi MAC on the ESP32), so
+# it never collides with 'group' or 'all'.
+
+ROOT = 'LPG'
+GROUP = 'group'
+BROADCAST = 'all'
+CONTROL = 'system/control'
+
+
+def device_id(uid=None):
+    """Hex string naming this unit, e.g. '246f281a2b3c'"""
+    if uid is None:
+        import machine
+        uid = machine.unique_id()
+    return ''.join('%02x' % b for b in uid)
+
+
+def topic(device, leaf):
+    """Topic of one unit, e.g. topic(dev, 'gas/status') -> 'LPG/<dev>/gas/status'"""
+    return f"{ROOT}/{device}/{leaf}"
+
+
+def control_topics(device, group=None):
+    """Control topics a unit subscribes to: its own, its group's, broadcast"""
+    topics = [topic(device, CONTROL)]
+    if group:
+        topics.append(f"{ROOT}/{GROUP}/{group}/{CONTROL}")
+    topics.append(f"{ROOT}/{BROADCAST}/{CONTROL}")
+    return tuple(topics)
@@ -0,0 +1,178 @@
+# Fast WiFi join: cached AP + IP lease first, RSSI-ranked scan after
+# MicroPython 1.20.0+
+
+import json
+import time
+import network
+
+_FAILED = (network.STAT_NO_AP_FOUND, network.STAT_WRONG_PASSWORD,
+           network.STAT_ASSOC_FAIL, network.STAT_BEACON_TIMEOUT,
+           network.STAT_HANDSHAKE_TIMEOUT)
+
+
+class FastJoin:
+    """
+    Joins one of `networks` ([(ssid, password), ...]) as quickly as it can:
+
+    1. cache: the last good SSID/BSSID, joined without the full channel
+       scan; the cached IP configuration is applied statically while it
+       associates, then DHCP takes the interface back and asks for that
+       address again (one request/ack instead of a full exchange), so the
+       lease is renewed and a reassigned address is picked up
+    2. scan: one scan, known SSIDs tried strongest RSSI first (by BSSID)
+    3. list: plain connect() in list order (hidden SSIDs)
+
+    The cache file is only rewritten when the AP or lease changes, and is
+    ignored once a fast join fails. `method`, `ssid`, `rssi`, `join_ms`
+    (this join) and `boot_ms` (ticks since boot when connected) describe
+    the result. Progress goes to `logger` (an lpg.log.Logger) if given,
+    else to the console.
+    """
+
+    def __init__(self, networks, path='wifi.json', timeout_ms=15000,
+                 fast_timeout_ms=3000, logger=None):
+        self.networks = networks
+        self.logger = logger
+        self.path = path
+        self.timeout_ms = timeout_ms
+        self.fast_timeout_ms = fast_timeout_ms
+        self.wlan = network.WLAN(network.STA_IF)
+        self.method = None
+        self.ssid = None
+        self.bssid = None       # AP joined (None when joined by name only)
+        self.rssi = None
+        self.join_ms = 0
+        self.boot_ms = 0
+
+    def connect(self):
+        wlan = self.wlan
+        wlan.active(True)
+        start = time.ticks_ms()
+        cache = self._load()
+        keys = dict(self.networks)
+
+        ok = False
+        if cache and cache['ssid'] in keys:
+            self._info("Fast join: %s (%s, ch %d)...", cache['ssid'], cache['bssid'],
+                       cache['channel'])
+            wlan.ifconfig(tuple(cache['ip']))
+            bssid = bytes.fromhex(cache['bssid']) if cache['bssid'] else None
+            ok = self._join(cache['ssid'], keys[cache['ssid']], bssid,
+                            self.fast_timeout_ms) and self._renew(self.fast_timeout_ms)
+            if ok:
+                self.method = 'cache'
+            else:
+                self._warn("  Fast join failed (AP or lease), scanning...")
+                wlan.disconnect()
+                wlan.ifconfig('dhcp')
+                cache = None
+
+        if not ok:
+            for ssid, bssid, rssi in self._ranked(keys):
+                self._info("Attempting: %s (%d dBm)...", ssid, rssi)
+                if self._join(ssid, keys[ssid], bssid, self.timeout_ms):
+                    self.method = 'scan'
+                    ok = True
+                    break
+
+        if not ok:
+            for ssid, password in self.networks:
+                self._info("Attempting: %s...", ssid)
+                if self._join(ssid, password, None, self.timeout_ms):
+                    self.method = 'list'
+                    ok = True
+                    break
+
+        now = time.ticks_ms()
+        self.join_ms = time.ticks_diff(now, start)
+        if not ok:
+            return False
+        self.boot_ms = now
+        self.ssid = wlan.config('essid')
+        try:
+            self.rssi = wlan.status('rssi')
+        except OSError:
+            self.rssi = None
+        self._save(cache)
+        return True
+
+    def _join(self, ssid, password, bssid, timeout_ms):
+        wlan = self.wlan
+        self.bssid = bssid
+        if bssid is None:
+            wlan.connect(ssid, password)
+        else:
+            wlan.connect(ssid, password, bssid=bssid)
+        start = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), start) < timeout_ms:
+            if wlan.isconnected():
+                return True
+            if wlan.status() in _FAILED:
+                break
+            time.sleep_ms(50)
+        wlan.disconnect()
+        return False
+
+    def _renew(self, timeout_ms):
+        """Hand the interface back to DHCP; True once it holds a lease"""
+        wlan = self.wlan
+        wlan.ifconfig('dhcp')
+        start = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), start) < timeout_ms:
+            if wlan.isconnected() and wlan.ifconfig()[0] != '0.0.0.0':
+                return True
+            time.sleep_ms(10)
+        wlan.disconnect()
+        return False
+
+    def _info(self, fmt, *args):
+        if self.logger is not None:
+            self.logger.info(fmt, *args)
+        else:
+            print(fmt % args)
+
+    def _warn(self, fmt, *args):
+        if self.logger is not None:
+            self.logger.warn(fmt, *args)
+        else:
+            print(fmt % args)
+
+    def _ranked(self, keys):
+        """(ssid, bssid, rssi) of visible known APs, strongest first"""
+        try:
+            found = self.wlan.scan()
+        except OSError:
+            return []
+        aps = []
+        for ap in found:
+            ssid = ap[0].decode()
+            if ssid in keys:
+                aps.append((ssid, ap[1], ap[3]))
+        aps.sort(key=lambda ap: -ap[2])
+        return aps
+
+    # ------------------------------------------
+    # Flash cache
+    # ------------------------------------------
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save(self, old):
+        wlan = self.wlan
+        new = {
+            'ssid': self.ssid,
+            'bssid': self.bssid.hex() if self.bssid else '',
+            'channel': wlan.config('channel'),
+            'ip': list(wlan.ifconfig()),
+        }
+        if old == new:
+            return
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(new, f)
+        except OSError as e:
+            self._warn("  WiFi cache not saved: %s", e)
@@ -0,0 +1,19 @@
+"""
+Host-side ESP32 simulator for the gas detector firmware.
+
+Runs the MicroPython firmware unmodified under CPython with stand-ins for
+`machine`, `network`, `usocket`/`ussl` and `umqtt.simple`, a virtual clock
+behind `time.sleep`/`time.ticks_*`, and an in-process MQTT broker.
+"""
+
+from .broker import Broker, Link, Message
+from .clock import SimulationHalt, VirtualClock
+from .device import Device
+from .simulation import Run, Simulation
+from .trace import Event, Trace
+from .wifi import AccessPoint, WifiEnv
+
+__all__ = [
+    'AccessPoint', 'Broker', 'Device', 'Event', 'Link', 'Message', 'Run',
+    'Simulation', 'SimulationHalt', 'Trace', 'VirtualClock', 'WifiEnv',
+]
@@ -0,0 +1,70 @@
+"""
+Command-line runner.
+
+    python -m simulator ESP32_COMPLETE_FIRMWARE.py --seconds 300 --leak-at 60
+    python -m simulator ESP32_main.py --command 30:TEST --json
+    python -m simulator ESP32_CLEAN.py --trace capture.csv --seconds 600
+    python -m simulator ESP32_COMPLETE_FIRMWARE.py --set LOW_POWER=True --dout 900
+"""
+
+import argparse
+import json
+
+from . import signals
+from .simulation import Simulation
+
+GPIO_RELAY = 33
+GPIO_DOUT = 35
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m simulator')
+    parser.add_argument('firmware')
+    parser.add_argument('--seconds', type=float, default=120)
+    parser.add_argument('--baseline', type=int, default=400)
+    parser.add_argument('--leak-at', type=float, default=None,
+                        help='virtual second at which gas steps up')
+    parser.add_argument('--level', type=int, default=1800)
+    parser.add_argument('--trace', help='recorded CSV trace (seconds,adc) to replay')
+    parser.add_argument('--noise', type=float, default=0,
+                        help='ADC noise sigma in LSB (adds 1%% spikes)')
+    parser.add_argument('--command', action='append', default=[],
+                        help='T:PAYLOAD control message at virtual second T')
+    parser.add_argument('--dout', type=int, default=None,
+                        help='MQ-2 D0 comparator on GPIO %d, low at this ADC level' % GPIO_DOUT)
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='firmware setting, written to config.py on the board')
+    parser.add_argument('--echo', action='store_true', help='show the firmware console')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        signal = signals.recorded(args.trace)
+    elif args.leak_at is None:
+        signal = signals.constant(args.baseline)
+    else:
+        signal = signals.step(args.baseline, args.level, at=args.leak_at)
+    if args.noise:
+        signal = signals.noisy(signal, sigma=args.noise, spike_rate=0.01)
+
+    config = dict(item.split('=', 1) for item in args.set)
+    sim = Simulation(signal=signal, echo=args.echo, config=config)
+    if args.dout is not None:
+        sim.comparator(GPIO_DOUT, args.dout)
+    for spec in args.command:
+        t, payload = spec.split(':', 1)
+        sim.command(float(t), payload)
+    run = sim.run(args.firmware, args.seconds)
+
+    result = run.summary()
+    if args.leak_at is not None:
+        result['leak_to_relay_off_ms'] = run.latency_ms(args.leak_at, 'pin', GPIO_RELAY, 0)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for key, value in result.items():
+            print("{:<22} {}".format(key, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""
+In-process MQTT 3.1.1 broker speaking the real wire format.
+
+Devices reach it through the simulated `usocket`/`ussl` modules, so every
+byte the firmware writes is parsed, counted and routed exactly as a real
+broker would see it. Host-side code (tests, the backend stand-in, load
+generators) can inject publishes and observe topics directly.
+"""
+
+from collections import namedtuple
+
+Message = namedtuple('Message', 't_us sender topic payload')
+
+
+class Link:
+    """Timing model for the path between the ESP32 and the broker"""
+
+    def __init__(self, latency_ms=40, dns_ms=60, tls_ms=1800,
+                 connect_timeout_ms=3000, write_us=1500, byte_us=10):
+        self.latency_us = int(latency_ms * 1000)   # one way
+        self.dns_us = int(dns_ms * 1000)
+        self.tls_us = int(tls_ms * 1000)           # handshake on the ESP32
+        self.connect_timeout_us = int(connect_timeout_ms * 1000)
+        self.write_us = write_us                   # per socket write (TLS record)
+        self.byte_us = byte_us
+
+    def write_cost_us(self, nbytes):
+        return self.write_us + self.byte_us * nbytes
+
+
+def topic_matches(pattern, topic):
+    """MQTT filter match with + and # wildcards"""
+    p = pattern.split('/')
+    t = topic.split('/')
+    for i, part in enumerate(p):
+        if part == '#':
+            return True
+        if i >= len(t):
+            return False
+        if part != '+' and part != t[i]:
+            return False
+    return len(p) == len(t)
+
+
+def encode_length(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+
+def encode_publish(topic, payload, retain=False):
+    t = topic.encode()
+    body = len(t).to_bytes(2, 'big') + t + payload
+    return bytes([0x30 | (1 if retain else 0)]) + encode_length(len(body)) + body
+
+
+class Session:
+    """One TCP connection between a device socket and the broker"""
+
+    def __init__(self, broker, owner=None):
+        self.broker = broker
+        self.owner = owner
+        self.client_id = None
+        self.filters = []
+        self.open = True
+        self.bytes_up = 0
+        self.bytes_down = 0
+        self._inbox = bytearray()
+        self._rx = bytearray()
+
+    # device -> broker
+    def send_up(self, data):
+        self.bytes_up += len(data)
+        self.broker.bytes_up += len(data)
+        self.broker.clock.call_later(self.broker.link.latency_us, self._arrive, bytes(data))
+
+    def _arrive(self, data):
+        if not self.open:
+            return
+        self._inbox += data
+        while self.open:
+            packet = self._next_packet()
+            if packet is None:
+                break
+            self.broker._handle(self, *packet)
+
+    def _next_packet(self):
+        buf = self._inbox
+        if len(buf) < 2:
+            return None
+        length = 0
+        shift = 0
+        i = 1
+        while True:
+            if i >= len(buf):
+                return None
+            byte = buf[i]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            i += 1
+            if not byte & 0x80:
+                break
+        if len(buf) < i + length:
+            return None
+        header = buf[0]
+        body = bytes(buf[i:i + length])
+        del buf[:i + length]
+        return header >> 4, header & 0x0F, body
+
+    # broker -> device
+    def send_down(self, data):
+        self.bytes_down += len(data)
+        self.broker.bytes_down += len(data)
+        self.broker.clock.call_later(self.broker.link.latency_us, self._deliver, bytes(data))
+
+    def _deliver(self, data):
+        if self.open:
+            self._rx += data
+
+    def pending(self):
+        return len(self._rx)
+
+    def take(self, n):
+        data = bytes(self._rx[:n])
+        del self._rx[:n]
+        return data
+
+    def close(self):
+        if not self.open:
+            return
+        self.open = False
+        if self in self.broker.sessions:
+            self.broker.sessions.remove(self)
+            self.broker._unindex(self)
+        if self.owner is not None and self.client_id is not None:
+            self.owner.trace.record('mqtt', 'disconnect', self.client_id)
+
+
+class Broker:
+    def __init__(self, clock, link=None):
+        self.clock = clock
+        self.link = link or Link()
+        self.online = True
+        self.sessions = []
+        # Subscriptions by filter: exact topics -> sessions (one dict lookup
+        # per publish however many units are connected), and the sessions
+        # holding a wildcard filter, which are matched one by one
+        self._exact = {}
+        self._wild = []
+        self.watchers = []
+        self.retained = {}
+        self.log = []
+        self.bytes_up = 0       # device -> broker, all sessions
+        self.bytes_down = 0
+
+    # ------------------------------------------
+    # Host-side API
+    # ------------------------------------------
+    def publish(self, topic, payload, sender='host', retain=False):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._route(topic, payload, sender, retain)
+
+    def subscribe(self, pattern, callback):
+        """callback(Message) for every publish matching pattern"""
+        self.watchers.append((pattern, callback))
+
+    def set_online(self, online):
+        self.online = online
+        if not online:
+            for session in list(self.sessions):
+                session.close()
+
+    def open_session(self, owner=None):
+        session = Session(self, owner)
+        self.sessions.append(session)
+        return session
+
+    def messages(self, topic=None, sender=None):
+        return [m for m in self.log
+                if (topic is None or topic_matches(topic, m.topic))
+                and (sender is None or m.sender == sender)]
+
+    def _index(self, session, pattern):
+        if '+' in pattern or '#' in pattern:
+            if session not in self._wild:
+                self._wild.append(session)
+        else:
+            subs = self._exact.setdefault(pattern, [])
+            if session not in subs:
+                subs.append(session)
+
+    def _unindex(self, session):
+        """Drop every subscription of session from the index"""
+        if session in self._wild:
+            self._wild.remove(session)
+        for pattern in session.filters:
+            subs = self._exact.get(pattern)
+            if subs and session in subs:
+                subs.remove(session)
+                if not subs:
+                    del self._exact[pattern]
+
+    # ------------------------------------------
+    # Protocol handling
+    # ------------------------------------------
+    def _route(self, topic, payload, sender, retain=False):
+        msg = Message(self.clock.now_us, sender, topic, payload)
+        self.log.append(msg)
+        if retain:
+            if payload:
+                self.retained[topic] = payload
+            else:
+                self.retained.pop(topic, None)
+        packet = None
+        targets = list(self._exact.get(topic, ()))
+        for session in self._wild:
+            if session not in targets and any(topic_matches(f, topic) for f in session.filters):
+                targets.append(session)
+        for session in targets:
+            if session.open:
+                if packet is None:
+                    packet = encode_publish(topic, payload)
+                session.send_down(packet)
+        for pattern, callback in self.watchers:
+            if topic_matches(pattern, topic):
+                callback(msg)
+
+    def _handle(self, session, ptype, flags, body):
+        if ptype == 1:      # CONNECT
+            name_len = int.from_bytes(body[0:2], 'big')
+            pos = 2 + name_len + 4
+            id_len = int.from_bytes(body[pos:pos + 2], 'big')
+            session.client_id = body[pos + 2:pos + 2 + id_len].decode()
+            session.send_down(b'\x20\x02\x00\x00')
+            if session.owner is not None:
+                session.owner.trace.record('mqtt', 'connect', session.client_id)
+        elif ptype == 3:    # PUBLISH
+            qos = (flags >> 1) & 3
+            tlen = int.from_bytes(body[0:2], 'big')
+            topic = body[2:2 + tlen].decode()
+            pos = 2 + tlen
+            pid = None
+            if qos:
+                pid = body[pos:pos + 2]
+                pos += 2
+            payload = body[pos:]
+            if session.owner is not None:
+                session.owner.trace.record('pub', topic, payload)
+            self._route(topic, payload, session.client_id, bool(flags & 1))
+            if qos == 1:
+                session.send_down(b'\x40\x02' + pid)
+        elif ptype == 8:    # SUBSCRIBE
+            pid = body[0:2]
+            pos = 2
+            granted = bytearray()
+            new = []
+            while pos < len(body):
+                tlen = int.from_bytes(body[pos:pos + 2], 'big')
+                pattern = body[pos + 2:pos + 2 + tlen].decode()
+                pos += 2 + tlen + 1
+                session.filters.append(pattern)
+                self._index(session, pattern)
+                new.append(pattern)
+                granted.append(0)
+            session.send_down(bytes([0x90]) + encode_length(2 + len(granted)) + pid + bytes(granted))
+            for topic, payload in self.retained.items():
+                if any(topic_matches(p, topic) for p in new):
+                    session.send_down(encode_publish(topic, payload, retain=True))
+        elif ptype == 10:   # UNSUBSCRIBE
+            pid = body[0:2]
+            pos = 2
+            while pos < len(body):
+                tlen = int.from_bytes(body[pos:pos + 2], 'big')
+                pattern = body[pos + 2:pos + 2 + tlen].decode()
+                pos += 2 + tlen
+                if pattern in session.filters:
+                    self._unindex(session)
+                    session.filters.remove(pattern)
+                    for f in session.filters:
+                        self._index(session, f)
+            session.send_down(b'\xb0\x02' + pid)
+        elif ptype == 12:   # PINGREQ
+            session.send_down(b'\xd0\x00')
+        elif ptype == 14:   # DISCONNECT
+            session.close()
@@ -0,0 +1,126 @@
+"""
+Virtual clock shared by everything inside one simulation.
+
+Time only moves when the firmware blocks (sleep, socket wait) or when a
+stand-in charges the cost of an operation (TLS handshake, UART write).
+Callbacks scheduled with call_at()/call_later() fire in order as time
+passes, which is how timers, broker deliveries and scripted events run.
+"""
+
+import heapq
+
+# MicroPython ticks wrap at 2**30 on the ESP32 port
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD >> 1
+
+
+class SimulationHalt(BaseException):
+    """
+    Raised from a blocking call once the run's virtual deadline is reached.
+    Derives from BaseException so the firmware's `except Exception` and
+    `except KeyboardInterrupt` handlers let it through untouched.
+    """
+
+
+class VirtualClock:
+    """Monotonic microsecond clock with an ordered callback queue"""
+
+    def __init__(self, start_us=0):
+        self.now_us = start_us
+        self.deadline_us = None
+        self.busy_us = 0      # time charged by operations
+        self.idle_us = 0      # time spent blocked / sleeping
+        self._queue = []
+        self._seq = 0
+
+    # ------------------------------------------
+    # Scheduling
+    # ------------------------------------------
+    def call_at(self, due_us, fn, *args):
+        """Run fn(*args) when the clock reaches due_us; returns a handle"""
+        self._seq += 1
+        entry = [max(int(due_us), self.now_us), self._seq, fn, args, True]
+        heapq.heappush(self._queue, entry)
+        return entry
+
+    def call_later(self, delay_us, fn, *args):
+        return self.call_at(self.now_us + delay_us, fn, *args)
+
+    @staticmethod
+    def cancel(handle):
+        if handle is not None:
+            handle[4] = False
+
+    def next_due(self):
+        """Due time of the earliest pending callback, or None"""
+        while self._queue and not self._queue[0][4]:
+            heapq.heappop(self._queue)
+        return self._queue[0][0] if self._queue else None
+
+    # ------------------------------------------
+    # Moving time
+    # ------------------------------------------
+    def _run_until(self, target_us, interrupt):
+        while True:
+            due = self.next_due()
+            if due is None or due > target_us:
+                break
+            entry = heapq.heappop(self._queue)
+            self.now_us = due
+            entry[4] = False
+            entry[2](*entry[3])
+            if interrupt is not None and interrupt():
+                return False
+        self.now_us = max(self.now_us, target_us)
+        return True
+
+    def advance(self, us):
+        """Charge `us` of busy time; never halts the run"""
+        us = int(us)
+        if us <= 0:
+            return
+        start = self.now_us
+        self._run_until(start + us, None)
+        self.busy_us += self.now_us - start
+
+    def sleep_until(self, target_us, interrupt=None):
+        """
+        Block until target_us, or earlier if interrupt() turns true after a
+        callback fires. Raises SimulationHalt at the deadline.
+        Returns True if the full wait elapsed.
+        """
+        halt = False
+        if self.deadline_us is not None and target_us >= self.deadline_us:
+            target_us = self.deadline_us
+            halt = True
+        start = self.now_us
+        finished = self._run_until(target_us, interrupt)
+        self.idle_us += self.now_us - start
+        if halt and finished:
+            raise SimulationHalt()
+        return finished
+
+    def sleep_us(self, us):
+        self.sleep_until(self.now_us + max(0, int(us)))
+
+    # ------------------------------------------
+    # MicroPython time API
+    # ------------------------------------------
+    def ticks_us(self):
+        return self.now_us & TICKS_MAX
+
+    def ticks_ms(self):
+        return (self.now_us // 1000) & TICKS_MAX
+
+    @staticmethod
+    def ticks_add(ticks, delta):
+        return (ticks + delta) & TICKS_MAX
+
+    @staticmethod
+    def ticks_diff(end, start):
+        return ((end - start + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+    @property
+    def seconds(self):
+        return self.now_us / 1_000_000
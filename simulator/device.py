@@ -0,0 +1,108 @@
+"""
+State of one simulated ESP32 board.
+
+The MicroPython stand-ins in simulator/mp are module-level, like the real
+ones, so they act on whichever Device is currently active.
+"""
+
+from . import signals
+from .trace import Trace
+from .wifi import WifiEnv
+
+_active = None
+
+
+def active():
+    if _active is None:
+        raise RuntimeError("no simulated device is active")
+    return _active
+
+
+def activate(device):
+    global _active
+    _active = device
+
+
+class Device:
+    def __init__(self, clock, broker, signal=None, uid=None, wifi=None):
+        self.clock = clock
+        self.broker = broker
+        self.trace = Trace(clock)
+        if signal is None:
+            signal = signals.constant()
+        # A bare function drives the MQ-2 on GPIO 34; a dict maps GPIO -> signal
+        self.signals = signal if isinstance(signal, dict) else {34: signal}
+        self.uid = uid or b'\x24\x6f\x28\x1a\x2b\x3c'
+        self.wifi = wifi or WifiEnv()
+        self.pins = {}
+        self.duty = {}
+        self.adc_reads = 0
+        self.interfaces = {}
+        self.timers = {}
+        # Light sleep: hardware timers stop, the WiFi modem keeps running
+        self.asleep = False
+        self.sleep_us = 0
+        self.sleeps = 0
+        self.ext0 = None            # (gpio, level) that ends a light sleep
+        # GPIO -> (ADC GPIO, level): digital comparator output such as the
+        # MQ-2 module's D0, low while that signal is at or above level
+        self.comparators = {}
+        # MicroPython heap, as the `gc` stand-in reports it. CPython objects
+        # say nothing about MicroPython allocation, so usage stays fixed;
+        # a collection only costs its (typical ESP32) pause time.
+        self.heap_size = 111_000
+        self.heap_used = 24_000
+        self.gc_pause_us = 1_500
+        self.gc_threshold = -1
+        self.gc_collections = 0
+
+    # ------------------------------------------
+    # Hardware
+    # ------------------------------------------
+    def read_adc(self, gpio):
+        self.adc_reads += 1
+        source = self.signals.get(gpio)
+        if source is None:
+            return 0
+        value = int(source(self.clock.seconds))
+        return 0 if value < 0 else 4095 if value > 4095 else value
+
+    def read_pin(self, gpio):
+        comparator = self.comparators.get(gpio)
+        if comparator is not None:
+            source = self.signals.get(comparator[0])
+            level = source(self.clock.seconds) if source is not None else 0
+            return 0 if level >= comparator[1] else 1
+        return self.pins.get(gpio, 0)
+
+    def wake_pending(self):
+        """True if the ext0 wake source is at its wake level"""
+        return self.ext0 is not None and self.read_pin(self.ext0[0]) == self.ext0[1]
+
+    def write_pin(self, gpio, value):
+        value = 1 if value else 0
+        self.pins[gpio] = value
+        self.trace.record('pin', gpio, value)
+
+    def write_duty(self, gpio, duty):
+        self.duty[gpio] = duty
+        self.trace.record('pwm', gpio, duty)
+
+    def gc_collect(self):
+        self.gc_collections += 1
+        self.clock.advance(self.gc_pause_us)
+
+    def gc_set_threshold(self, amount=None):
+        if amount is None:
+            return self.gc_threshold
+        self.gc_threshold = amount
+
+    # ------------------------------------------
+    # Network
+    # ------------------------------------------
+    def station(self):
+        return self.interfaces.get(0)
+
+    def online(self):
+        sta = self.station()
+        return sta is not None and sta.isconnected()
@@ -0,0 +1,17 @@
+"""Stand-in for the MicroPython `esp32` module (wake sources)"""
+
+from simulator.device import active
+
+WAKEUP_ALL_LOW = 0
+WAKEUP_ANY_HIGH = 1
+
+
+def wake_on_ext0(pin, level):
+    """Wake light / deep sleep when `pin` reads `level` (None: disable)"""
+    dev = active()
+    dev.ext0 = None if pin is None else (pin.id, 1 if level else 0)
+    dev.trace.record('wake', 'ext0', dev.ext0)
+
+
+def raw_temperature():
+    return 120
@@ -0,0 +1,209 @@
+"""Stand-in for the MicroPython `machine` module (ESP32 port subset)"""
+
+from simulator.device import active
+
+_CPU_HZ = 160_000_000
+
+
+def unique_id():
+    return active().uid
+
+
+def freq(hz=None):
+    global _CPU_HZ
+    if hz is None:
+        return _CPU_HZ
+    _CPU_HZ = hz
+
+
+def reset():
+    from simulator.clock import SimulationHalt
+    active().trace.record('reset', 'soft', None)
+    raise SimulationHalt()
+
+
+def idle():
+    pass
+
+
+# Granularity of the ext0 wake check while light sleeping (the signal is a
+# continuous function of time, so the pin is sampled rather than watched)
+_WAKE_POLL_US = 5000
+
+
+def lightsleep(time_ms=None):
+    """
+    Light sleep for time_ms (or until the esp32.wake_on_ext0 pin reaches
+    its level). Timer callbacks are skipped while asleep, as the hardware
+    timers stop; broker traffic still reaches the sockets.
+    """
+    dev = active()
+    clock = dev.clock
+    start = clock.now_us
+    target = start + (int(time_ms) * 1000 if time_ms is not None else 1 << 62)
+    dev.asleep = True
+    dev.sleeps += 1
+    try:
+        if dev.ext0 is None:
+            clock.sleep_until(target)
+        else:
+            while clock.now_us < target and not dev.wake_pending():
+                clock.sleep_until(min(target, clock.now_us + _WAKE_POLL_US))
+    finally:
+        dev.asleep = False
+        dev.sleep_us += clock.now_us - start
+        dev.trace.record('sleep', 'light', (clock.now_us - start) // 1000)
+
+
+def deepsleep(time_ms=None):
+    reset()
+
+
+def disable_irq():
+    return 0
+
+
+def enable_irq(state=0):
+    pass
+
+
+class Pin:
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_DOWN = 1
+    PULL_UP = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        self.mode = mode
+        if value is not None:
+            self.value(value)
+
+    def value(self, v=None):
+        dev = active()
+        if v is None:
+            return dev.read_pin(self.id)
+        dev.write_pin(self.id, v)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def __call__(self, v=None):
+        return self.value(v)
+
+    def irq(self, handler=None, trigger=IRQ_RISING | IRQ_FALLING):
+        return None
+
+    def __repr__(self):
+        return "Pin({})".format(self.id)
+
+
+class PWM:
+    def __init__(self, pin, freq=5000, duty=None, duty_u16=None):
+        self.pin = pin
+        self._freq = freq
+        if duty is not None:
+            self.duty(duty)
+        elif duty_u16 is not None:
+            self.duty_u16(duty_u16)
+
+    def freq(self, hz=None):
+        if hz is None:
+            return self._freq
+        self._freq = hz
+
+    def duty(self, d=None):
+        dev = active()
+        if d is None:
+            return dev.duty.get(self.pin.id, 0)
+        dev.write_duty(self.pin.id, int(d))
+
+    def duty_u16(self, d=None):
+        if d is None:
+            return self.duty() << 6
+        self.duty(int(d) >> 6)
+
+    def deinit(self):
+        pass
+
+
+class ADC:
+    ATTN_0DB = 0
+    ATTN_2_5DB = 1
+    ATTN_6DB = 2
+    ATTN_11DB = 3
+    WIDTH_9BIT = 0
+    WIDTH_10BIT = 1
+    WIDTH_11BIT = 2
+    WIDTH_12BIT = 3
+
+    def __init__(self, pin, atten=None):
+        self.pin = pin
+        self._atten = atten
+        self._width = ADC.WIDTH_12BIT
+
+    def atten(self, attn):
+        self._atten = attn
+
+    def width(self, width):
+        self._width = width
+
+    def read(self):
+        raw = active().read_adc(self.pin.id)
+        return raw >> (3 - self._width)
+
+    def read_u16(self):
+        return active().read_adc(self.pin.id) << 4
+
+    def read_uv(self):
+        return active().read_adc(self.pin.id) * 3_300_000 // 4095
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id, **kwargs):
+        self.id = id
+        self._handle = None
+        self._callback = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self.deinit()
+        if freq > 0:
+            self._period_us = 1_000_000 // freq
+        else:
+            self._period_us = period * 1000
+        self._mode = mode
+        self._callback = callback
+        dev = active()
+        dev.timers[self.id] = self
+        self._handle = dev.clock.call_later(self._period_us, self._fire)
+
+    def _fire(self):
+        dev = active()
+        clock = dev.clock
+        if self._mode == Timer.PERIODIC:
+            self._handle = clock.call_later(self._period_us, self._fire)
+        else:
+            self._handle = None
+        if self._callback is not None and not dev.asleep:
+            self._callback(self)
+
+    def deinit(self):
+        if self._handle is not None:
+            active().clock.cancel(self._handle)
+            self._handle = None
@@ -0,0 +1,30 @@
+"""Stand-in for the MicroPython `micropython` module"""
+
+
+def const(value):
+    return value
+
+
+def schedule(fn, arg):
+    # Simulated timer callbacks already run outside the firmware's code path
+    fn(arg)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def opt_level(level=None):
+    return 0 if level is None else None
+
+
+def mem_info(verbose=False):
+    pass
+
+
+def native(fn):
+    return fn
+
+
+def viper(fn):
+    return fn
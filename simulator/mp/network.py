@@ -0,0 +1,180 @@
+"""Stand-in for the MicroPython `network` module (station interface)"""
+
+from simulator.device import active
+
+STA_IF = 0
+AP_IF = 1
+
+STAT_IDLE = 1000
+STAT_CONNECTING = 1001
+STAT_GOT_IP = 1010
+STAT_BEACON_TIMEOUT = 200
+STAT_NO_AP_FOUND = 201
+STAT_WRONG_PASSWORD = 202
+STAT_ASSOC_FAIL = 203
+STAT_HANDSHAKE_TIMEOUT = 204
+
+AUTH_OPEN = 0
+AUTH_WPA2_PSK = 3
+
+_NEVER = 1 << 62
+
+
+class WLAN:
+    PM_NONE = 0
+    PM_PERFORMANCE = 1
+    PM_POWERSAVE = 2
+
+    def __new__(cls, interface_id=STA_IF):
+        dev = active()
+        wlan = dev.interfaces.get(interface_id)
+        if wlan is None:
+            wlan = object.__new__(cls)
+            wlan._setup(dev, interface_id)
+            dev.interfaces[interface_id] = wlan
+        return wlan
+
+    def __init__(self, interface_id=STA_IF):
+        pass
+
+    def _setup(self, dev, interface_id):
+        self._dev = dev
+        self._if = interface_id
+        self._active = False
+        self._ap = None
+        self._ready_at = _NEVER
+        self._fail_at = _NEVER
+        self._fail_status = STAT_IDLE
+        self._static = None
+        self._lease_at = 0      # DHCP renewing until then (address 0.0.0.0)
+        self._pm = WLAN.PM_PERFORMANCE
+        self._reported = False
+        self.join_started_us = None
+        self.joined_us = None
+
+    # ------------------------------------------
+    # Interface control
+    # ------------------------------------------
+    def active(self, is_active=None):
+        if is_active is None:
+            return self._active
+        self._active = bool(is_active)
+        if not self._active:
+            self.disconnect()
+
+    def connect(self, ssid=None, key=None, *, bssid=None):
+        dev = self._dev
+        env = dev.wifi
+        now = dev.clock.now_us
+        if not self._active:
+            raise OSError("STA must be active")
+        self._ap = None
+        self._reported = False
+        self.join_started_us = now
+        self.joined_us = None
+        scan = env.directed_scan_us if bssid is not None else env.scan_us
+        ap = env.find(ssid, bssid)
+        if ap is None or env.down_at(now):
+            self._ready_at = _NEVER
+            self._fail_at = now + scan
+            self._fail_status = STAT_NO_AP_FOUND
+            return
+        if ap.password is not None and ap.password != key:
+            self._ready_at = _NEVER
+            self._fail_at = now + scan + env.assoc_us
+            self._fail_status = STAT_WRONG_PASSWORD
+            return
+        self._ap = ap
+        self._fail_at = _NEVER
+        self._ready_at = now + scan + env.assoc_us + (0 if self._static else env.dhcp_us)
+
+    def disconnect(self):
+        if self._ap is not None and self._reported:
+            self._dev.trace.record('wifi', 'down', self._ap.ssid)
+        self._ap = None
+        self._ready_at = _NEVER
+        self._fail_at = _NEVER
+        self._fail_status = STAT_IDLE
+        self._reported = False
+
+    def _ready_time(self):
+        """Virtual time at which the link is (or will be) usable"""
+        env = self._dev.wifi
+        ready = self._ready_at
+        restored = env.last_restore(self._dev.clock.now_us)
+        if restored is not None and restored > self.join_started_us:
+            rejoin = restored + env.assoc_us + (0 if self._static else env.dhcp_us)
+            ready = max(ready, rejoin)
+        return ready
+
+    def isconnected(self):
+        if self._ap is None:
+            return False
+        now = self._dev.clock.now_us
+        up = now >= self._ready_time() and not self._dev.wifi.down_at(now)
+        if up and not self._reported:
+            self._reported = True
+            if self.joined_us is None:
+                self.joined_us = now
+            self._dev.trace.record('wifi', 'up', self._ap.ssid)
+        elif not up and self._reported:
+            self._reported = False
+            self._dev.trace.record('wifi', 'down', self._ap.ssid)
+        return up
+
+    def status(self, param=None):
+        if param == 'rssi':
+            if not self.isconnected():
+                raise OSError("not connected")
+            return self._ap.rssi
+        if param is not None:
+            raise ValueError("unknown status param")
+        if self.isconnected():
+            return STAT_GOT_IP
+        if self._dev.clock.now_us >= self._fail_at:
+            return self._fail_status
+        if self._ap is not None or self._fail_at != _NEVER:
+            return STAT_CONNECTING
+        return STAT_IDLE
+
+    def scan(self):
+        dev = self._dev
+        dev.clock.advance(dev.wifi.scan_us)
+        if dev.wifi.down_at(dev.clock.now_us):
+            return []
+        return [(ap.ssid.encode(), ap.bssid, ap.channel, ap.rssi, AUTH_WPA2_PSK, False)
+                for ap in dev.wifi.aps]
+
+    def ifconfig(self, config=None):
+        if config == 'dhcp':
+            if self._static is not None and self._ap is not None:
+                # Static -> DHCP while associated: the client asks for the
+                # address again (INIT-REBOOT) and holds none until the ACK
+                self._lease_at = self._dev.clock.now_us + self._dev.wifi.renew_us
+            self._static = None
+            return None
+        if config is not None:
+            self._static = tuple(config)
+            return None
+        if self._static is not None:
+            return self._static
+        if self.isconnected() and self._dev.clock.now_us >= self._lease_at:
+            return ('192.168.1.{}'.format(50 + self._dev.uid[-1] % 150),
+                    '255.255.255.0', '192.168.1.1', '192.168.1.1')
+        return ('0.0.0.0', '0.0.0.0', '0.0.0.0', '0.0.0.0')
+
+    def config(self, *args, **kwargs):
+        if kwargs:
+            if 'pm' in kwargs:
+                self._pm = kwargs['pm']
+            return None
+        param = args[0]
+        if param == 'mac':
+            return self._dev.uid
+        if param in ('essid', 'ssid'):
+            return self._ap.ssid if self._ap else ''
+        if param == 'channel':
+            return self._ap.channel if self._ap else 0
+        if param == 'pm':
+            return self._pm
+        raise ValueError("unknown config param")
@@ -0,0 +1,271 @@
+"""
+Stand-in for MicroPython `uasyncio` scheduled on the virtual clock.
+
+Covers the subset the firmware uses: run, create_task, sleep, sleep_ms,
+Task.cancel, Event, ThreadSafeFlag, gather and current_task. When every
+task is waiting, the loop sleeps the virtual clock until the next timer,
+broker delivery or scripted event.
+"""
+
+import heapq
+import types
+from collections import deque
+
+from simulator.device import active
+
+
+class CancelledError(BaseException):
+    pass
+
+
+class TimeoutError(Exception):
+    pass
+
+
+class _Sleep:
+    __slots__ = ('us',)
+
+    def __init__(self, us):
+        self.us = us
+
+    def __await__(self):
+        yield self
+
+
+class _Park:
+    """Suspend the current task on a waiter list"""
+    __slots__ = ('waiters',)
+
+    def __init__(self, waiters):
+        self.waiters = waiters
+
+    def __await__(self):
+        yield self
+
+
+class Task:
+    def __init__(self, coro):
+        self.coro = coro
+        self.finished = False
+        self.result = None
+        self.exc = None
+        self.waiters = []
+        self._parked = None
+        self._sleep_entry = None
+        self._pending_exc = None
+
+    def done(self):
+        return self.finished
+
+    def cancel(self):
+        if self.finished:
+            return False
+        _loop.throw(self, CancelledError())
+        return True
+
+    def __await__(self):
+        if not self.finished:
+            yield _Park(self.waiters)
+        if self.exc is not None:
+            raise self.exc
+        return self.result
+
+
+class Event:
+    def __init__(self):
+        self.state = False
+        self.waiting = []
+
+    def is_set(self):
+        return self.state
+
+    def set(self):
+        self.state = True
+        while self.waiting:
+            _loop.wake(self.waiting.pop(0))
+
+    def clear(self):
+        self.state = False
+
+    @types.coroutine
+    def wait(self):
+        if not self.state:
+            yield _Park(self.waiting)
+        return True
+
+
+class ThreadSafeFlag:
+    """Single-waiter flag that ISRs and timer callbacks may set"""
+
+    def __init__(self):
+        self.state = False
+        self.waiting = []
+
+    def set(self):
+        self.state = True
+        while self.waiting:
+            _loop.wake(self.waiting.pop(0))
+
+    def clear(self):
+        self.state = False
+
+    @types.coroutine
+    def wait(self):
+        if not self.state:
+            yield _Park(self.waiting)
+        self.state = False
+
+
+class _Loop:
+    def __init__(self):
+        self.ready = deque()
+        self.sleeping = []
+        self.seq = 0
+        self.current = None
+
+    def create_task(self, coro):
+        task = Task(coro)
+        self.ready.append((task, None))
+        return task
+
+    def wake(self, task):
+        task._parked = None
+        self.ready.append((task, None))
+
+    def throw(self, task, exc):
+        if task._sleep_entry is not None:
+            task._sleep_entry[3] = False
+            task._sleep_entry = None
+        if task._parked is not None:
+            if task in task._parked:
+                task._parked.remove(task)
+            task._parked = None
+        for i, (queued, _) in enumerate(self.ready):
+            if queued is task:
+                del self.ready[i]
+                break
+        if task is self.current:
+            # Cancelling ourselves: delivered at the next suspension point
+            task._pending_exc = exc
+            return
+        self.ready.append((task, exc))
+
+    def _finish(self, task, result=None, exc=None):
+        task.finished = True
+        task.result = result
+        task.exc = exc
+        for waiter in task.waiters:
+            self.wake(waiter)
+        task.waiters = []
+
+    def _step(self, task, exc):
+        self.current = task
+        try:
+            if exc is not None:
+                request = task.coro.throw(exc)
+            else:
+                request = task.coro.send(None)
+        except StopIteration as e:
+            self._finish(task, result=e.value)
+            return
+        except CancelledError as e:
+            self._finish(task, exc=e)
+            return
+        except Exception as e:
+            had_waiters = bool(task.waiters)
+            self._finish(task, exc=e)
+            if not had_waiters:
+                print("Task exception wasn't retrieved:", repr(e))
+            return
+        finally:
+            self.current = None
+
+        pending = task._pending_exc
+        if pending is not None:
+            task._pending_exc = None
+            self.ready.append((task, pending))
+            return
+        if isinstance(request, _Sleep):
+            self.seq += 1
+            entry = [active().clock.now_us + request.us, self.seq, task, True]
+            task._sleep_entry = entry
+            heapq.heappush(self.sleeping, entry)
+        elif isinstance(request, _Park):
+            task._parked = request.waiters
+            request.waiters.append(task)
+        else:
+            self.ready.append((task, None))
+
+    def _wake_sleepers(self, now):
+        while self.sleeping and (not self.sleeping[0][3] or self.sleeping[0][0] <= now):
+            entry = heapq.heappop(self.sleeping)
+            if entry[3]:
+                entry[2]._sleep_entry = None
+                self.ready.append((entry[2], None))
+
+    def run_until_complete(self, main):
+        clock = active().clock
+        while not main.finished:
+            self._wake_sleepers(clock.now_us)
+            if self.ready:
+                task, exc = self.ready.popleft()
+                if not task.finished:
+                    self._step(task, exc)
+                continue
+            while self.sleeping and not self.sleeping[0][3]:
+                heapq.heappop(self.sleeping)
+            if self.sleeping:
+                target = self.sleeping[0][0]
+            else:
+                due = clock.next_due()
+                target = due if due is not None else clock.now_us + 1_000_000
+            clock.sleep_until(target, lambda: bool(self.ready))
+        if main.exc is not None:
+            raise main.exc
+        return main.result
+
+
+_loop = _Loop()
+
+
+def get_event_loop():
+    return _loop
+
+
+def new_event_loop():
+    global _loop
+    _loop = _Loop()
+    return _loop
+
+
+def create_task(coro):
+    return _loop.create_task(coro)
+
+
+def current_task():
+    return _loop.current
+
+
+def sleep(t):
+    return _Sleep(int(t * 1_000_000))
+
+
+def sleep_ms(t):
+    return _Sleep(int(t * 1000))
+
+
+def run(coro):
+    return _loop.run_until_complete(_loop.create_task(coro))
+
+
+async def gather(*aws, return_exceptions=False):
+    tasks = [aw if isinstance(aw, Task) else create_task(aw) for aw in aws]
+    results = []
+    for task in tasks:
+        try:
+            results.append(await task)
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
@@ -0,0 +1,185 @@
+"""
+Stand-in for micropython-lib `umqtt.simple` over the simulated sockets.
+
+Same constructor, methods and blocking behaviour as the library, and the
+same write pattern per packet (header, topic, payload as separate socket
+writes), so TLS record overhead shows up the way it does on the board.
+"""
+
+import struct
+
+import usocket
+import ussl
+from simulator.device import active
+
+
+class MQTTException(Exception):
+    pass
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+
+def _as_bytes(value):
+    return value.encode() if isinstance(value, str) else bytes(value)
+
+
+def _field(value):
+    value = _as_bytes(value)
+    return struct.pack('!H', len(value)) + value
+
+
+class MQTTClient:
+    def __init__(self, client_id, server, port=0, user=None, password=None,
+                 keepalive=0, ssl=False, ssl_params={}):
+        if port == 0:
+            port = 8883 if ssl else 1883
+        self.client_id = client_id
+        self.server = server
+        self.port = port
+        self.user = user
+        self.pswd = password
+        self.keepalive = keepalive
+        self.ssl = ssl
+        self.ssl_params = ssl_params
+        self.sock = None
+        self.cb = None
+        self.pid = 0
+        self.lw_topic = None
+        self.lw_msg = None
+        self.lw_qos = 0
+        self.lw_retain = False
+
+    def set_callback(self, f):
+        self.cb = f
+
+    def set_last_will(self, topic, msg, retain=False, qos=0):
+        self.lw_topic = topic
+        self.lw_msg = msg
+        self.lw_qos = qos
+        self.lw_retain = retain
+
+    # ------------------------------------------
+    # Connection
+    # ------------------------------------------
+    def connect(self, clean_session=True):
+        self.sock = usocket.socket()
+        addr = usocket.getaddrinfo(self.server, self.port)[0][-1]
+        self.sock.connect(addr)
+        if self.ssl:
+            self.sock = ussl.wrap_socket(self.sock, **self.ssl_params)
+
+        flags = 0x02 if clean_session else 0
+        payload = _field(self.client_id)
+        if self.lw_topic:
+            flags |= 0x04 | (self.lw_qos & 1) << 3 | (self.lw_qos & 2) << 3
+            flags |= 0x20 if self.lw_retain else 0
+            payload += _field(self.lw_topic) + _field(self.lw_msg)
+        if self.user is not None:
+            flags |= 0xC0
+            payload += _field(self.user) + _field(self.pswd)
+        variable = b'\x00\x04MQTT\x04' + bytes([flags]) + struct.pack('!H', self.keepalive)
+        self.sock.write(b'\x10' + _varint(len(variable) + len(payload)))
+        self.sock.write(variable)
+        self.sock.write(payload)
+
+        resp = self.sock.read(4)
+        if not resp or resp[0] != 0x20 or resp[1] != 0x02:
+            raise MQTTException("bad CONNACK")
+        if resp[3] != 0:
+            raise MQTTException(resp[3])
+        return resp[2] & 1
+
+    def disconnect(self):
+        self.sock.write(b'\xe0\x00')
+        self.sock.close()
+
+    def ping(self):
+        self.sock.write(b'\xc0\x00')
+
+    # ------------------------------------------
+    # Publish / subscribe
+    # ------------------------------------------
+    def publish(self, topic, msg, retain=False, qos=0):
+        topic = _as_bytes(topic)
+        msg = _as_bytes(msg)
+        size = 2 + len(topic) + len(msg)
+        if qos > 0:
+            size += 2
+        self.sock.write(bytes([0x30 | qos << 1 | retain]) + _varint(size))
+        self.sock.write(_field(topic))
+        if qos > 0:
+            self.pid += 1
+            self.sock.write(struct.pack('!H', self.pid))
+        self.sock.write(msg)
+        if qos == 1:
+            while True:
+                op = self.wait_msg()
+                if op == 0x40:
+                    self.sock.read(3)
+                    return
+
+    def subscribe(self, topic, qos=0):
+        if self.cb is None:
+            raise MQTTException("subscribe callback is not set")
+        self.pid += 1
+        body = struct.pack('!H', self.pid) + _field(topic) + bytes([qos])
+        self.sock.write(b'\x82' + _varint(len(body)))
+        self.sock.write(body)
+        while True:
+            op = self.wait_msg()
+            if op == 0x90:
+                resp = self.sock.read(4)
+                if resp[3] == 0x80:
+                    raise MQTTException(resp[3])
+                return
+
+    def _read_length(self):
+        n = 0
+        shift = 0
+        while True:
+            byte = self.sock.read(1)[0]
+            n |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return n
+            shift += 7
+
+    def wait_msg(self):
+        """Process one incoming packet; returns its opcode or None"""
+        res = self.sock.read(1)
+        self.sock.setblocking(True)
+        if res is None:
+            return None
+        if res == b'':
+            raise OSError(-1)
+        op = res[0]
+        if op == 0xD0:                     # PINGRESP
+            self.sock.read(1)
+            return None
+        if op & 0xF0 != 0x30:
+            return op
+        size = self._read_length()
+        tlen = struct.unpack('!H', self.sock.read(2))[0]
+        topic = self.sock.read(tlen)
+        size -= tlen + 2
+        pid = None
+        if op & 6:
+            pid = self.sock.read(2)
+            size -= 2
+        msg = self.sock.read(size)
+        active().trace.record('recv', topic.decode(), msg)
+        self.cb(topic, msg)
+        if op & 6 == 2:
+            self.sock.write(b'\x40\x02' + pid)
+        return op
+
+    def check_msg(self):
+        self.sock.setblocking(False)
+        return self.wait_msg()
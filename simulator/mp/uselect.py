@@ -0,0 +1,60 @@
+"""
+Stand-in for MicroPython `uselect` (poll only) over the simulated sockets.
+
+poll(0) reports readiness at the current virtual time; a positive timeout
+sleeps on the virtual clock until a registered socket changes state.
+"""
+
+from simulator.device import active
+
+POLLIN = 0x01
+POLLOUT = 0x04
+POLLERR = 0x08
+POLLHUP = 0x10
+
+
+class _Poll:
+    def __init__(self):
+        self._objs = {}
+
+    def register(self, obj, eventmask=POLLIN | POLLOUT):
+        self._objs[id(obj)] = (obj, eventmask)
+
+    def modify(self, obj, eventmask):
+        self._objs[id(obj)] = (obj, eventmask)
+
+    def unregister(self, obj):
+        self._objs.pop(id(obj), None)
+
+    def _ready(self):
+        out = []
+        for obj, mask in self._objs.values():
+            events = obj._poll_events(mask)
+            if events:
+                out.append((obj, events))
+        return out
+
+    def poll(self, timeout=-1):
+        ready = self._ready()
+        if ready or timeout == 0:
+            return ready
+        clock = active().clock
+        deadline = None if timeout < 0 else clock.now_us + timeout * 1000
+        while not ready:
+            changes = [c for c in (o._next_change_us() for o, _ in self._objs.values())
+                       if c is not None]
+            due = clock.next_due()
+            target = min([t for t in changes + [due, deadline] if t is not None],
+                         default=clock.now_us + 1_000_000)
+            clock.sleep_until(max(target, clock.now_us + 1), lambda: bool(self._ready()))
+            ready = self._ready()
+            if deadline is not None and clock.now_us >= deadline:
+                break
+        return ready
+
+    def ipoll(self, timeout=-1, flags=0):
+        return iter(self.poll(timeout))
+
+
+def poll():
+    return _Poll()
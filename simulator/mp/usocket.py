@@ -0,0 +1,201 @@
+"""
+Stand-in for MicroPython `usocket` wired to the in-process broker.
+
+Named with the `u` prefix so it never shadows CPython's own socket module.
+Every hostname resolves to the simulated broker. Errors carry the
+`errno` numbers the runner sets (the ESP32 port's, see simulation.ERRNO).
+"""
+
+import errno
+
+from simulator.device import active
+
+AF_INET = 2
+SOCK_STREAM = 1
+IPPROTO_TCP = 6
+SOL_SOCKET = 1
+SO_REUSEADDR = 4
+
+BROKER_ADDR = ('10.0.0.1', 8883)
+
+
+def getaddrinfo(host, port, af=0, type=0, proto=0, flags=0):
+    dev = active()
+    dev.clock.advance(dev.broker.link.dns_us)
+    if not dev.online():
+        raise OSError(-202)   # lwIP DNS failure as reported on the ESP32
+    return [(AF_INET, SOCK_STREAM, IPPROTO_TCP, '', (BROKER_ADDR[0], port))]
+
+
+class socket:
+    def __init__(self, af=AF_INET, type=SOCK_STREAM, proto=IPPROTO_TCP):
+        self._dev = active()
+        self._session = None
+        self._blocking = True
+        self._timeout_us = None
+        self._last_us = self._dev.clock.now_us
+        self._connect_at = None    # non-blocking connect: completion time
+        self._connect_ok = False
+        self._error = 0
+        self.tls = False
+
+    # ------------------------------------------
+    # Link checks
+    # ------------------------------------------
+    def _check(self):
+        dev = self._dev
+        now = dev.clock.now_us
+        if self._session is None:
+            raise OSError(errno.ECONNRESET)
+        if dev.wifi.down_between(self._last_us, now + 1) or not dev.online():
+            self._session.close()
+        self._last_us = now
+        if not self._session.open:
+            raise OSError(errno.ECONNRESET)
+
+    # ------------------------------------------
+    # Socket API
+    # ------------------------------------------
+    def connect(self, addr):
+        dev = self._dev
+        link = dev.broker.link
+        if not dev.online():
+            raise OSError(errno.EHOSTUNREACH)
+        if not self._blocking:
+            # Handshake runs in the background; poll for POLLOUT / POLLERR
+            if self._connect_at is not None:
+                raise OSError(errno.EALREADY)
+            self._connect_ok = dev.broker.online
+            self._connect_at = dev.clock.now_us + (
+                2 * link.latency_us if self._connect_ok else link.connect_timeout_us)
+            raise OSError(errno.EINPROGRESS)
+        if not dev.broker.online:
+            dev.clock.advance(link.connect_timeout_us)
+            raise OSError(errno.ETIMEDOUT)
+        dev.clock.advance(2 * link.latency_us)     # SYN / SYN-ACK
+        self._session = dev.broker.open_session(dev)
+        self._last_us = dev.clock.now_us
+
+    def _progress(self):
+        """Finish a non-blocking connect once its time has come"""
+        if self._connect_at is None or self._dev.clock.now_us < self._connect_at:
+            return
+        self._connect_at = None
+        if self._connect_ok and self._dev.online() and self._dev.broker.online:
+            self._session = self._dev.broker.open_session(self._dev)
+            self._last_us = self._dev.clock.now_us
+        else:
+            self._error = errno.ETIMEDOUT
+
+    def _poll_events(self, mask):
+        """uselect event bits for this socket right now"""
+        self._progress()
+        if self._error:
+            return 0x08 | 0x10                      # POLLERR | POLLHUP
+        session = self._session
+        if session is None:
+            return 0
+        if self._dev.wifi.down_between(self._last_us, self._dev.clock.now_us + 1) \
+                or not self._dev.online():
+            session.close()
+        events = 0
+        if session.pending() or not session.open:
+            events |= 0x01                          # POLLIN (data or EOF)
+        if session.open:
+            events |= 0x04                          # POLLOUT
+        else:
+            events |= 0x10                          # POLLHUP
+        return events & (mask | 0x18)
+
+    def _next_change_us(self):
+        return self._connect_at
+
+    def setblocking(self, flag):
+        self._blocking = bool(flag)
+
+    def settimeout(self, value):
+        if value is None:
+            self._timeout_us = None
+            self._blocking = True
+        elif value == 0:
+            self._blocking = False
+        else:
+            self._timeout_us = int(value * 1_000_000)
+            self._blocking = True
+
+    def setsockopt(self, level, opt, value):
+        pass
+
+    def write(self, buf, length=None):
+        data = bytes(buf if length is None else buf[:length])
+        self._check()
+        self._session.send_up(data)
+        self._dev.clock.advance(self._dev.broker.link.write_cost_us(len(data)))
+        return len(data)
+
+    send = write
+
+    def sendall(self, buf):
+        self.write(buf)
+
+    def _wait(self):
+        """Block until data or EOF is available; False on timeout"""
+        clock = self._dev.clock
+        session = self._session
+        deadline = None if self._timeout_us is None else clock.now_us + self._timeout_us
+        while session.open and not session.pending():
+            if self._dev.wifi.down_at(clock.now_us):
+                session.close()
+                break
+            due = clock.next_due()
+            target = due if due is not None else clock.now_us + 1_000_000
+            if deadline is not None and target > deadline:
+                target = deadline
+            clock.sleep_until(target, lambda: session.pending() or not session.open)
+            if deadline is not None and clock.now_us >= deadline:
+                return bool(session.pending())
+        return True
+
+    def read(self, n=-1):
+        session = self._session
+        if session is None:
+            raise OSError(errno.ECONNRESET)
+        if session.open:
+            self._check()
+        if not session.pending():
+            if not session.open:
+                return b''
+            if not self._blocking:
+                return None
+            if not self._wait():
+                raise OSError(errno.ETIMEDOUT)
+            if not session.pending():
+                return b''
+        if n < 0:
+            n = session.pending()
+        out = bytearray()
+        while len(out) < n:
+            if not session.pending():
+                if not self._wait() or not session.pending():
+                    break
+            out += session.take(n - len(out))
+        return bytes(out)
+
+    def recv(self, n):
+        data = self.read(n)
+        if data is None:
+            raise OSError(errno.EAGAIN)
+        return data
+
+    def readinto(self, buf, n=-1):
+        if n < 0:
+            n = len(buf)
+        data = self.read(n)
+        if data is None:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
@@ -0,0 +1,76 @@
+"""
+Gas signal generators for the simulated ADC.
+
+Each returns a function of virtual time in seconds giving the raw 12-bit
+reading the MQ-2 would produce at that instant.
+"""
+
+import bisect
+import csv
+import random
+
+
+def constant(level=400):
+    return lambda t: level
+
+
+def step(base=400, level=1800, at=60.0, until=None):
+    """Jump from base to level at `at` (and back at `until` if given)"""
+    def signal(t):
+        if t >= at and (until is None or t < until):
+            return level
+        return base
+    return signal
+
+
+def ramp(base=400, level=1800, start=60.0, duration=20.0, until=None):
+    """Linear rise from base to level over `duration` seconds"""
+    def signal(t):
+        if until is not None and t >= until:
+            return base
+        if t <= start:
+            return base
+        if t >= start + duration:
+            return level
+        return base + (level - base) * (t - start) / duration
+    return signal
+
+
+def noisy(signal, sigma=40, spike_rate=0.0, spike=600, seed=1):
+    """
+    Add ESP32-style ADC noise: Gaussian jitter plus occasional single-sample
+    spikes. Deterministic for a given seed and read sequence.
+    """
+    rng = random.Random(seed)
+
+    def noisy_signal(t):
+        value = signal(t) + rng.gauss(0, sigma)
+        if spike_rate and rng.random() < spike_rate:
+            value += spike if rng.random() < 0.5 else -spike
+        return value
+    return noisy_signal
+
+
+def recorded(path, column=1, time_scale=1.0):
+    """
+    Replay a recorded trace: a CSV of `seconds,adc` rows (a header line
+    is skipped), held at each value until the next timestamp, at the
+    last value after it. `column` picks the ADC column, `time_scale`
+    stretches (>1) or compresses time.
+    """
+    times, values = [], []
+    with open(path, newline='') as f:
+        for row in csv.reader(f):
+            try:
+                t, value = float(row[0]), float(row[column])
+            except (ValueError, IndexError):
+                continue
+            times.append(t * time_scale)
+            values.append(value)
+    if not times:
+        raise ValueError(f"no samples in {path}")
+
+    def signal(t):
+        i = bisect.bisect_right(times, t) - 1
+        return values[i if i > 0 else 0]
+    return signal
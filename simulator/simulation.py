@@ -0,0 +1,255 @@
+"""
+Runs an unmodified firmware script under CPython against simulated hardware.
+
+    sim = Simulation(signal=signals.step(400, 1800, at=60))
+    sim.command(30, 'TEST')
+    run = sim.run('ESP32_COMPLETE_FIRMWARE.py', seconds=300)
+    run.latency_ms(60, 'pin', 33, 0)    # leak -> relay closed
+
+One Simulation is one device on one broker for one run.
+"""
+
+import errno
+import gc
+import os
+import random
+import runpy
+import sys
+import tempfile
+import time
+
+from .broker import Broker
+from .clock import SimulationHalt, VirtualClock
+from .device import Device, activate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MP_DIR = os.path.join(ROOT, 'simulator', 'mp')
+LIB_DIR = os.path.join(ROOT, 'lib')
+
+CONTROL_TOPIC = 'LPG/all/system/control'   # broadcast: every simulated unit obeys it
+
+_TIME_PATCHES = ('sleep', 'sleep_ms', 'sleep_us', 'ticks_ms', 'ticks_us',
+                 'ticks_cpu', 'ticks_add', 'ticks_diff')
+_GC_PATCHES = ('collect', 'mem_alloc', 'mem_free', 'threshold')
+# The ESP32 port's errno numbers (newlib), not the host's: `errno.EINPROGRESS`
+# is 119 on the board, 115 on Linux
+ERRNO = {'EAGAIN': 11, 'ECONNRESET': 104, 'ETIMEDOUT': 116, 'EHOSTUNREACH': 118,
+         'EINPROGRESS': 119, 'EALREADY': 120}
+
+
+class Uart:
+    """Console stand-in: charges serial transmit time for every byte printed"""
+
+    def __init__(self, clock, baud=115200, echo=False):
+        self.clock = clock
+        self.baud = baud
+        self.echo = echo
+        self.bytes = 0
+        self._chunks = []
+        self.buffer = _UartBytes(self)
+
+    def write(self, text):
+        n = len(text.encode('utf-8', 'replace'))
+        self.bytes += n
+        self._chunks.append(text)
+        if self.baud:
+            self.clock.advance(n * 10_000_000 // self.baud)
+        if self.echo:
+            sys.__stdout__.write(text)
+        return n
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self._chunks)
+
+
+class _UartBytes:
+    """sys.stdout.buffer: raw bytes to the same console"""
+
+    def __init__(self, uart):
+        self.uart = uart
+
+    def write(self, data):
+        self.uart.write(bytes(data).decode('utf-8', 'replace'))
+        return len(data)
+
+
+class Run:
+    """Outcome of one Simulation.run()"""
+
+    def __init__(self, sim, firmware, halted, wall_s, cpu_s):
+        self.sim = sim
+        self.firmware = firmware
+        self.halted = halted
+        self.wall_s = wall_s
+        self.cpu_s = cpu_s
+        self.trace = sim.device.trace
+        self.broker = sim.broker
+        self.uart = sim.uart.getvalue()
+
+    @property
+    def seconds(self):
+        return self.sim.clock.seconds
+
+    def published(self, topic=None):
+        """Messages the device published, in broker arrival order"""
+        return [m for m in self.broker.messages(topic) if m.sender != 'host']
+
+    def latency_ms(self, since_s, kind, key, value=None):
+        """Time from since_s to the first matching trace event, or None"""
+        since_us = int(since_s * 1_000_000)
+        if value is None:
+            ev = self.trace.first(kind, key, since_us=since_us)
+        else:
+            ev = self.trace.first(kind, key, value, since_us=since_us)
+        return None if ev is None else (ev.t_us - since_us) / 1000
+
+    def summary(self):
+        trace = self.trace
+        return {
+            'firmware': os.path.basename(self.firmware),
+            'virtual_s': round(self.seconds, 3),
+            'wall_s': round(self.wall_s, 3),
+            'speedup': round(self.seconds / self.wall_s) if self.wall_s else None,
+            'cpu_s': round(self.cpu_s, 3),
+            'publishes': len(self.published()),
+            'bytes_up': self.broker.bytes_up,
+            'bytes_down': self.broker.bytes_down,
+            'pin_writes': trace.count('pin'),
+            'pwm_writes': trace.count('pwm'),
+            'adc_reads': self.sim.device.adc_reads,
+            'mqtt_connects': trace.count('mqtt', 'connect'),
+            'uart_bytes': self.sim.uart.bytes,
+            'asleep_s': round(self.sim.device.sleep_us / 1_000_000, 3),
+            'sleeps': self.sim.device.sleeps,
+        }
+
+
+class Simulation:
+    def __init__(self, signal=None, wifi=None, link=None, uid=None,
+                 uart_baud=115200, seed=1, fs_root=None, echo=False, config=None):
+        self.clock = VirtualClock()
+        self.broker = Broker(self.clock, link)
+        self.device = Device(self.clock, self.broker, signal, uid, wifi)
+        self.uart = Uart(self.clock, uart_baud, echo)
+        self.seed = seed
+        self.fs_root = fs_root
+        self.config = config    # {NAME: value} written to config.py on the board
+
+    # ------------------------------------------
+    # Scripted events (virtual seconds)
+    # ------------------------------------------
+    def at(self, t_s, fn, *args):
+        self.clock.call_at(int(t_s * 1_000_000), fn, *args)
+
+    def command(self, t_s, payload, topic=CONTROL_TOPIC):
+        """Publish a control message as the backend would at t_s"""
+        self.at(t_s, self.broker.publish, topic, payload, 'host')
+
+    def comparator(self, gpio, level, adc_gpio=34):
+        """Digital comparator on `gpio` (MQ-2 D0): low while the ADC signal >= level"""
+        self.device.comparators[gpio] = (adc_gpio, level)
+
+    def wifi_outage(self, start_s, end_s):
+        self.device.wifi.add_outage(start_s * 1_000_000, end_s * 1_000_000)
+
+    def broker_outage(self, start_s, end_s):
+        self.at(start_s, self.broker.set_online, False)
+        self.at(end_s, self.broker.set_online, True)
+
+    # ------------------------------------------
+    # Running firmware
+    # ------------------------------------------
+    def run(self, firmware, seconds):
+        """Execute a firmware script until `seconds` of virtual time pass"""
+        firmware = os.path.abspath(firmware)
+        self.clock.deadline_us = self.clock.now_us + int(seconds * 1_000_000)
+        if self.fs_root is None:
+            self.fs_root = tempfile.mkdtemp(prefix='esp32-fs-')
+        if self.config:
+            with open(os.path.join(self.fs_root, 'config.py'), 'w') as f:
+                for name, value in self.config.items():
+                    f.write("{} = {}\n".format(name, value))
+
+        saved = _install(self)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        halted = False
+        try:
+            runpy.run_path(firmware, run_name='__main__')
+        except SimulationHalt:
+            halted = True
+        finally:
+            cpu = time.process_time() - cpu
+            wall = time.perf_counter() - wall
+            _uninstall(saved)
+        return Run(self, firmware, halted, wall, cpu)
+
+
+def _purge_modules(fs_root=None):
+    roots = (MP_DIR, LIB_DIR) if fs_root is None else (MP_DIR, LIB_DIR, fs_root)
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None) or ''
+        if path.startswith(roots):
+            del sys.modules[name]
+
+
+def _install(sim):
+    clock = sim.clock
+    saved = {
+        'time': {name: getattr(time, name, None) for name in _TIME_PATCHES},
+        'gc': {name: getattr(gc, name, None) for name in _GC_PATCHES},
+        'errno': {name: getattr(errno, name, None) for name in ERRNO},
+        'path': list(sys.path),
+        'stdout': sys.stdout,
+        'cwd': os.getcwd(),
+        'random': random.getstate(),
+        'fs_root': sim.fs_root,
+    }
+    _purge_modules(sim.fs_root)
+    for path in (LIB_DIR, MP_DIR):
+        if os.path.isdir(path):
+            sys.path.insert(0, path)
+    sys.path.insert(0, sim.fs_root)     # '' (the fs root) comes first on the board
+
+    time.sleep = lambda s: clock.sleep_us(s * 1_000_000)
+    time.sleep_ms = lambda ms: clock.sleep_us(ms * 1000)
+    time.sleep_us = clock.sleep_us
+    time.ticks_ms = clock.ticks_ms
+    time.ticks_us = clock.ticks_us
+    time.ticks_cpu = clock.ticks_us
+    time.ticks_add = clock.ticks_add
+    time.ticks_diff = clock.ticks_diff
+
+    device = sim.device
+    gc.collect = device.gc_collect
+    gc.mem_alloc = lambda: device.heap_used
+    gc.mem_free = lambda: device.heap_size - device.heap_used
+    gc.threshold = device.gc_set_threshold
+    for name, value in ERRNO.items():
+        setattr(errno, name, value)
+
+    random.seed(sim.seed)
+    sys.stdout = sim.uart
+    os.chdir(sim.fs_root)
+    activate(sim.device)
+    return saved
+
+
+def _uninstall(saved):
+    activate(None)
+    os.chdir(saved['cwd'])
+    sys.stdout = saved['stdout']
+    random.setstate(saved['random'])
+    for module, patches in ((time, saved['time']), (gc, saved['gc']),
+                            (errno, saved['errno'])):
+        for name, value in patches.items():
+            if value is None:
+                if hasattr(module, name):
+                    delattr(module, name)
+            else:
+                setattr(module, name, value)
+    sys.path[:] = saved['path']
+    _purge_modules(saved['fs_root'])
@@ -0,0 +1,65 @@
+"""
+Timestamped record of everything a simulated device did.
+
+Event kinds:
+    pin   key=GPIO number, value=0/1         (every Pin write)
+    pwm   key=GPIO number, value=duty         (every PWM duty write)
+    pub   key=topic (str), value=payload      (device publish reaching the broker)
+    recv  key=topic (str), value=payload      (message delivered to the device)
+    wifi  key='up'/'down', value=SSID
+    mqtt  key='connect'/'disconnect', value=client id
+"""
+
+from collections import namedtuple
+
+Event = namedtuple('Event', 't_us kind key value')
+
+ANY = object()
+
+
+class Trace:
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = []
+
+    def record(self, kind, key, value=None):
+        self.events.append(Event(self.clock.now_us, kind, key, value))
+
+    def select(self, kind=ANY, key=ANY, value=ANY, since_us=0, until_us=None):
+        """All events matching the given fields within [since_us, until_us)"""
+        out = []
+        for ev in self.events:
+            if ev.t_us < since_us:
+                continue
+            if until_us is not None and ev.t_us >= until_us:
+                break
+            if kind is not ANY and ev.kind != kind:
+                continue
+            if key is not ANY and ev.key != key:
+                continue
+            if value is not ANY and ev.value != value:
+                continue
+            out.append(ev)
+        return out
+
+    def first(self, kind=ANY, key=ANY, value=ANY, since_us=0):
+        for ev in self.select(kind, key, value, since_us):
+            return ev
+        return None
+
+    def last(self, kind=ANY, key=ANY, value=ANY, since_us=0):
+        found = self.select(kind, key, value, since_us)
+        return found[-1] if found else None
+
+    def count(self, kind=ANY, key=ANY, value=ANY, since_us=0):
+        return len(self.select(kind, key, value, since_us))
+
+    def level_at(self, kind, key, t_us, default=None):
+        """Last value written to an output at or before t_us"""
+        level = default
+        for ev in self.events:
+            if ev.t_us > t_us:
+                break
+            if ev.kind == kind and ev.key == key:
+                level = ev.value
+        return level
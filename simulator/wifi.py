@@ -0,0 +1,74 @@
+"""
+Radio environment seen by the simulated station interface.
+
+Join time is modelled as scan + association + DHCP (or, joining with a
+static address and handing back to DHCP, a one-round-trip lease renewal). Outages are windows of
+virtual time during which no AP is reachable; after one ends a station that
+was associated rejoins on its own (the ESP-IDF auto-reconnect behaviour).
+"""
+
+
+class AccessPoint:
+    def __init__(self, ssid, password=None, bssid=None, channel=6, rssi=-60):
+        self.ssid = ssid
+        self.password = password          # None accepts any key
+        self.bssid = bssid or bytes([0x02, 0, 0, 0, 0, (hash(ssid) & 0xFF)])
+        self.channel = channel
+        self.rssi = rssi
+
+
+# Networks named by the firmware variants; any key is accepted
+DEFAULT_APS = (
+    ('IIC_WIFI', -58, 1),
+    ('oh-ho!', -67, 11),
+)
+
+
+class WifiEnv:
+    def __init__(self, aps=None, scan_ms=2200, directed_scan_ms=150,
+                 assoc_ms=350, dhcp_ms=900, renew_ms=60):
+        if aps is None:
+            aps = [AccessPoint(ssid, rssi=rssi, channel=ch,
+                               bssid=bytes([0x02, 0xA0, 0, 0, ch, i]))
+                   for i, (ssid, rssi, ch) in enumerate(DEFAULT_APS)]
+        self.aps = list(aps)
+        self.scan_us = int(scan_ms * 1000)               # all-channel sweep
+        self.directed_scan_us = int(directed_scan_ms * 1000)  # BSSID known
+        self.assoc_us = int(assoc_ms * 1000)
+        self.dhcp_us = int(dhcp_ms * 1000)
+        self.renew_us = int(renew_ms * 1000)             # REQUEST / ACK, known address
+        self.outages = []                                 # (start_us, end_us)
+
+    def add_outage(self, start_us, end_us):
+        self.outages.append((int(start_us), int(end_us)))
+        self.outages.sort()
+
+    def find(self, ssid, bssid=None):
+        """Strongest AP advertising ssid (and bssid if given)"""
+        best = None
+        for ap in self.aps:
+            if ap.ssid != ssid or (bssid is not None and ap.bssid != bssid):
+                continue
+            if best is None or ap.rssi > best.rssi:
+                best = ap
+        return best
+
+    def down_at(self, t_us):
+        for start, end in self.outages:
+            if start <= t_us < end:
+                return True
+        return False
+
+    def last_restore(self, t_us):
+        """End of the latest outage that finished at or before t_us"""
+        restored = None
+        for start, end in self.outages:
+            if end <= t_us:
+                restored = end
+        return restored
+
+    def down_between(self, t0_us, t1_us):
+        for start, end in self.outages:
+            if start < t1_us and end > t0_us:
+                return True
+        return False
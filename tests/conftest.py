@@ -0,0 +1,30 @@
+"""
+Host tests for the pure-logic firmware modules in lib/lpg.
+
+The modules run unmodified under CPython; `clock` stands in for the
+MicroPython time.ticks_* functions they call, and the simulator's
+stand-ins for usocket / uselect / ussl are importable (after everything
+else on sys.path).
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'lib'))
+sys.path.append(os.path.join(ROOT, 'simulator', 'mp'))     # usocket, uselect, ... last
+
+from simulator import VirtualClock      # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Virtual clock behind time.ticks_ms / ticks_us / ticks_diff / ticks_add"""
+    clk = VirtualClock()
+    for name in ('ticks_ms', 'ticks_us', 'ticks_add', 'ticks_diff'):
+        monkeypatch.setattr(time, name, getattr(clk, name), raising=False)
+    return clk
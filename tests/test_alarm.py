@@ -0,0 +1,115 @@
+import pytest
+
+from lpg.alarm import Alarm, NORMAL, PRE_ALARM, ALARM, RECOVERING
+
+
+def feed(alarm, values, t0=0, step=100):
+    """update() each value step ms apart; the transitions, None where none"""
+    return [alarm.update(v, t0 + i * step) for i, v in enumerate(values)]
+
+
+@pytest.fixture
+def alarm(clock):
+    return Alarm(trip=1200, clear=1000, confirm_n=2, confirm_m=3,
+                 hold_ms=10000, recover_ms=5000)
+
+
+def test_two_of_three_hits_trip(alarm):
+    assert feed(alarm, [1300, 900, 1300]) == [PRE_ALARM, None, ALARM]
+    assert alarm.trips == 1
+
+
+def test_consecutive_hits_trip(alarm):
+    assert feed(alarm, [1300, 1300]) == [PRE_ALARM, ALARM]
+
+
+def test_single_spike_falls_back_to_normal(alarm):
+    # The hit leaves the 3-reading window after three clean readings
+    assert feed(alarm, [1300, 900, 900, 900]) == [PRE_ALARM, None, None, NORMAL]
+    assert alarm.trips == 0
+
+
+def test_hits_spread_wider_than_window_do_not_trip(alarm):
+    assert feed(alarm, [1300, 900, 900, 1300, 900, 900, 1300]) == \
+        [PRE_ALARM, None, None, None, None, None, None]
+    assert alarm.state == PRE_ALARM
+
+
+def test_reading_at_trip_is_not_a_hit(alarm):
+    assert feed(alarm, [1200, 1200, 1200]) == [None, None, None]
+
+
+def test_hold_keeps_alarm_until_hold_ms(alarm):
+    feed(alarm, [1300, 1300])                           # ALARM at t=100
+    assert alarm.update(500, 5000) is None              # clean, but held
+    assert alarm.update(500, 10099) is None
+    assert alarm.update(500, 10100) == RECOVERING
+
+
+def test_recovering_to_normal_after_recover_ms(alarm):
+    feed(alarm, [1300, 1300])
+    assert alarm.update(500, 10100) == RECOVERING
+    assert alarm.update(999, 15099) is None
+    assert alarm.update(500, 15100) == NORMAL
+    assert alarm.previous == RECOVERING
+
+
+def test_recovering_retrips_at_clear_and_restarts_hold(alarm):
+    feed(alarm, [1300, 1300])
+    alarm.update(500, 10100)                            # RECOVERING
+    assert alarm.update(1000, 12000) == ALARM           # at clear: back up
+    assert alarm.previous == RECOVERING
+    assert alarm.trips == 1                             # same episode
+    assert alarm.update(500, 21999) is None             # hold restarted at 12000
+    assert alarm.update(500, 22000) == RECOVERING
+
+
+def test_hysteresis_between_clear_and_trip_holds_alarm(alarm):
+    feed(alarm, [1300, 1300])
+    assert alarm.update(1100, 20000) is None            # below trip, above clear
+    assert alarm.state == ALARM
+
+
+def test_new_episode_counts_a_new_trip(alarm):
+    feed(alarm, [1300, 1300])
+    alarm.update(500, 10100)
+    alarm.update(500, 15100)                            # NORMAL
+    assert feed(alarm, [1300, 1300], t0=20000) == [PRE_ALARM, ALARM]
+    assert alarm.trips == 2
+
+
+def test_rise_rate_counts_as_hit_above_floor(clock):
+    alarm = Alarm(trip=1200, clear=1000, rise=150, rise_floor=700)
+    assert alarm.update(800, 0, rate=200) == PRE_ALARM
+    assert alarm.update(850, 100, rate=200) == ALARM
+
+
+def test_rise_rate_below_floor_is_ignored(clock):
+    alarm = Alarm(trip=1200, clear=1000, rise=150, rise_floor=700)
+    assert feed(alarm, [600, 650, 690]) == [None, None, None]
+    assert alarm.update(690, 300, rate=500) is None
+
+
+def test_reset_clears_window(alarm):
+    feed(alarm, [1300])
+    alarm.reset(500)
+    assert alarm.state == NORMAL
+    assert alarm.update(1300, 600) == PRE_ALARM         # the old hit is gone
+
+
+def test_hold_across_ticks_wrap(clock):
+    alarm = Alarm(trip=1200, clear=1000, hold_ms=10000, recover_ms=5000)
+    near_wrap = (1 << 30) - 50
+    feed(alarm, [1300, 1300], t0=near_wrap)             # ALARM at near_wrap + 100
+    wrapped = (near_wrap + 100 + 10000) & ((1 << 30) - 1)
+    assert alarm.update(500, wrapped - 1) is None
+    assert alarm.update(500, wrapped) == RECOVERING
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'confirm_n': 0}, {'confirm_n': 4, 'confirm_m': 3}, {'confirm_m': 31},
+    {'trip': 1000, 'clear': 1200},
+])
+def test_rejects_bad_settings(clock, kwargs):
+    with pytest.raises(ValueError):
+        Alarm(**kwargs)
@@ -0,0 +1,30 @@
+import json
+
+from lpg.batcher import Batcher
+
+
+def test_add_reports_full_batch(clock):
+    b = Batcher(size=3, window_ms=10000)
+    assert [b.add(v, i * 100) for i, v in enumerate((400, 410, 420))] == [False, False, True]
+    assert b.due(200)
+    assert json.loads(b.flush()) == {'seq': 0, 't': 0, 'dt': [0, 100, 200],
+                                     'v': [400, 410, 420]}
+    assert b.dropped == 0
+
+
+def test_overflow_without_flush_is_counted(clock):
+    b = Batcher(size=3, window_ms=10000)
+    for i in range(3):
+        b.add(400 + i, i * 100)
+    b.add(500, 300)                     # full and not flushed: the batch is discarded
+    assert b.dropped == 3
+    msg = json.loads(b.flush())
+    assert msg['seq'] == 3 and msg['v'] == [500] and msg['t'] == 300
+
+
+def test_window_makes_batch_due(clock):
+    b = Batcher(size=10, window_ms=1000)
+    assert not b.due(0)
+    b.add(400, 0)
+    assert not b.due(999)
+    assert b.due(1000)
@@ -0,0 +1,32 @@
+import random
+
+from lpg.filters import Ema, GasFilter, RunningMedian
+
+
+def test_running_median_matches_sorted_window():
+    rng = random.Random(4)
+    med = RunningMedian(5)
+    seen = []
+    for _ in range(200):
+        x = rng.randrange(4096)
+        seen.append(x)
+        window = sorted(seen[-5:])
+        assert med.update(x) == window[len(window) >> 1]
+
+
+def test_median_rejects_single_spike():
+    f = GasFilter(median_window=5, ema_shift=3)
+    for _ in range(10):
+        f.update(400)
+    assert f.update(4095) == 400        # one wild ADC sample never reaches the EMA
+    assert f.raw == 4095
+    assert f.update(400) == 400
+
+
+def test_ema_starts_at_first_sample_and_converges():
+    ema = Ema(shift=3)
+    assert ema.value == 0
+    assert ema.update(800) == 800
+    for _ in range(100):
+        v = ema.update(1600)
+    assert 1590 <= v <= 1600
@@ -0,0 +1,63 @@
+from bench.fleet import Fleet, run_slice, summarize
+from lpg.outputs import RELAY, BUZZER
+
+OPTS = {
+    'devices': 200, 'seconds': 20.0, 'workers': 1, 'cmd_rate': 2.0, 'broadcast_s': 0,
+    'leak_pct': 5.0, 'broker_rate': 50.0, 'broker_queue': 20, 'latency_ms': 40.0,
+    'seed': 1,
+}
+
+
+def run_split(workers, opts=OPTS):
+    """The fleet in `workers` slices, run one after another in this process"""
+    devices = opts['devices']
+    per, extra = divmod(devices, workers)
+    results = []
+    first = 0
+    for w in range(workers):
+        count = per + (1 if w < extra else 0)
+        results.append(run_slice(first, count, opts, count / devices))
+        first += count
+    return summarize(results, opts, 1.0)
+
+
+def test_broker_capacity_does_not_depend_on_workers(clock):
+    # clock: run_slice repoints time.ticks_*; the fixture puts them back.
+    # A steady overload: split queues absorb short bursts a little less
+    # well than one, so an exact match is not expected
+    opts = dict(OPTS, broker_rate=15.0, seconds=40.0)
+    one = run_split(1, opts)
+    four = run_split(4, opts)
+    assert one['broker_dropped'] > 0                    # the broker is the bottleneck
+    assert one['delivered_msgs_per_s'] <= opts['broker_rate']
+    assert abs(four['delivered_msgs_per_s'] - one['delivered_msgs_per_s']) \
+        <= 0.05 * one['delivered_msgs_per_s']
+    assert abs(four['broker_dropped'] - one['broker_dropped']) <= 0.05 * one['broker_dropped']
+
+
+def test_traffic_does_not_depend_on_workers(clock):
+    opts = dict(OPTS, broker_rate=20000.0, broker_queue=10000, cmd_rate=5.0, broadcast_s=7.0)
+    one = run_split(1, opts)
+    three = run_split(3, opts)
+    # Only time inside the broker (its capacity is split) may differ
+    timing = {'workers', 'wall_s', 'cpu_s', 'sim_msgs_per_wall_s', 'broker_queue_peak',
+              'rtt_p50_ms', 'rtt_p90_ms', 'rtt_p99_ms', 'rtt_max_ms'}
+    assert one['alerts'] > 0 and one['commands'] > opts['devices']
+    assert {k: v for k, v in one.items() if k not in timing} == \
+        {k: v for k, v in three.items() if k not in timing}
+
+
+def test_off_matches_firmware(clock):
+    fleet = Fleet(clock, 0, 1, OPTS, 1.0)
+    unit = next(iter(fleet.units.values()))
+    unit.boot()
+    unit.alert_mode()
+    unit.handle_command('OFF')
+    # all_off(): outputs and vent off; detection and the alert flag untouched
+    assert unit.system_on and unit.alert_active
+    assert unit.outputs.get(RELAY) == 0 and unit.outputs.get(BUZZER) == 0
+    assert unit.vent.target == 0
+    unit.handle_command('SERVO_45')
+    assert unit.vent.target == 45
+    unit.handle_command('SERVO_200')
+    assert unit.vent.target == 45
@@ -0,0 +1,93 @@
+import pytest
+
+from lpg import frame
+
+UID = b'\x24\x6f\x28\x1a\x2b\x3c'
+
+
+def test_encode_into_decode_round_trip():
+    enc = frame.FrameEncoder(UID)
+    buf = bytearray(frame.FRAME_SIZE)
+    enc.encode_into(buf, 123456, 1810, 1795, frame.FLAG_ALERT | frame.FLAG_SYSTEM_ON)
+    f = frame.decode(bytes(buf))
+    assert f == frame.Frame(frame.FRAME_VERSION, frame.FLAG_ALERT | frame.FLAG_SYSTEM_ON,
+                            UID, 0, 123456, 1810, 1795)
+    assert enc.seq == 1
+
+
+def test_encode_and_encode_into_agree():
+    a = frame.FrameEncoder(UID)
+    b = frame.FrameEncoder(UID)
+    buf = bytearray(frame.FRAME_SIZE)
+    for i in range(3):
+        assert a.encode(i * 500, 400 + i, 410 + i, frame.FLAG_VALVE_OPEN) == \
+            bytes(b.encode_into(buf, i * 500, 400 + i, 410 + i, frame.FLAG_VALVE_OPEN))
+
+
+def test_decode_many_splits_back_to_back_frames():
+    enc = frame.FrameEncoder(UID)
+    data = b''.join(enc.encode(t, 400, 400, frame.FLAG_REPLAY) for t in range(5))
+    frames = frame.decode_many(data)
+    assert [f.seq for f in frames] == [0, 1, 2, 3, 4]
+    assert [f.ticks for f in frames] == [0, 1, 2, 3, 4]
+    assert all(f.flags & frame.FLAG_REPLAY for f in frames)
+
+
+def test_decode_rejects_bad_length_and_version():
+    data = frame.FrameEncoder(UID).encode(0, 0, 0)
+    with pytest.raises(ValueError):
+        frame.decode(data[:-1])
+    with pytest.raises(ValueError):
+        frame.decode(bytes([frame.FRAME_VERSION + 1]) + data[1:])
+    with pytest.raises(ValueError):
+        frame.decode_many(data + b'\x00')
+
+
+def _frames(seqs, device=UID):
+    return [frame.Frame(frame.FRAME_VERSION, 0, device, s, 0, 0, 0) for s in seqs]
+
+
+def test_tracker_gap_then_late_frame_is_reordered_not_lost():
+    t = frame.SequenceTracker()
+    results = [t.add(f) for f in _frames([0, 1, 4, 2, 5])]
+    assert results == ['ok', 'ok', 'gap', 'late', 'ok']
+    assert (t.lost, t.reordered, t.duplicates) == (1, 1, 0)
+
+
+def test_tracker_duplicates_and_restart():
+    t = frame.SequenceTracker()
+    results = [t.add(f) for f in _frames([0, 1, 2, 1, 0, 1])]
+    assert results == ['ok', 'ok', 'ok', 'dup', 'reset', 'ok']
+    assert (t.duplicates, t.restarts, t.lost) == (1, 1, 0)
+
+
+def test_tracker_sequence_wraps_without_restart_or_loss():
+    t = frame.SequenceTracker()
+    results = [t.add(f) for f in _frames([0xFFFFFFFE, 0xFFFFFFFF, 0, 1])]
+    assert results == ['ok', 'ok', 'ok', 'ok']
+    assert (t.lost, t.restarts, t.duplicates) == (0, 0, 0)
+
+
+def test_tracker_gap_across_wrap():
+    t = frame.SequenceTracker()
+    results = [t.add(f) for f in _frames([0xFFFFFFFE, 1, 0xFFFFFFFF, 0])]
+    assert results == ['ok', 'gap', 'late', 'late']
+    assert (t.lost, t.reordered) == (0, 2)
+
+
+def test_tracker_keeps_devices_apart():
+    t = frame.SequenceTracker()
+    other = b'\x24\x6f\x28\x00\x00\x01'
+    for f in _frames([0, 1], UID) + _frames([0, 2], other):
+        t.add(f)
+    assert t.lost == 1
+    assert t.restarts == 0
+
+
+def test_encoder_feeds_tracker_with_wrap():
+    enc = frame.FrameEncoder(UID)
+    enc.seq = 0xFFFFFFFD
+    t = frame.SequenceTracker()
+    for i in range(6):
+        t.add(frame.decode(enc.encode(i, 400, 400)))
+    assert (t.received, t.lost, t.restarts) == (6, 0, 0)
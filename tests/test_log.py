@@ -0,0 +1,71 @@
+from lpg import log
+from lpg.log import Logger
+
+
+def _collect(logger, level=log.DEBUG):
+    lines = []
+    logger.add_sink(lambda lvl, line: lines.append((lvl, line)), level)
+    return lines
+
+
+def test_formats_lazily_on_flush():
+    logger = Logger(size=4)
+    lines = _collect(logger)
+    logger.info("gas=%d", 400)
+    logger.info("a=%s b=%s c=%s", 1, 2, 3)
+    assert lines == []
+    assert logger.flush() == 2
+    assert lines == [(log.INFO, "gas=400"), (log.INFO, "a=1 b=2 c=3")]
+
+
+def test_disabled_level_is_not_recorded():
+    logger = Logger(size=4, level=log.WARN)
+    logger.info("skipped")
+    logger.debug("skipped")
+    assert logger.count == 0
+    assert logger.set_level('DEBUG')
+    assert not logger.set_level('LOUD')
+    logger.debug("kept")
+    assert logger.count == 1
+
+
+def test_full_ring_drops_oldest():
+    logger = Logger(size=3)
+    lines = _collect(logger)
+    for i in range(5):
+        logger.warn("n=%d", i)
+    assert logger.dropped == 2
+    logger.flush()
+    assert [line for _, line in lines] == ["n=2", "n=3", "n=4"]
+
+
+def test_flush_is_bounded_and_sinks_filter_by_level():
+    logger = Logger(size=8)
+    everything = _collect(logger)
+    errors = _collect(logger, log.ERROR)
+    for i in range(3):
+        logger.info("i=%d", i)
+    logger.error("bad")
+    assert logger.flush(max_lines=2) == 2
+    assert logger.flush() == 2
+    assert len(everything) == 4
+    assert errors == [(log.ERROR, "bad")]
+
+
+def test_notify_on_first_entry_only():
+    woken = []
+    logger = Logger(size=4, notify=lambda: woken.append(1))
+    logger.info("one")
+    logger.info("two")
+    assert woken == [1]
+    logger.flush()
+    logger.info("three")
+    assert woken == [1, 1]
+
+
+def test_bad_arguments_do_not_raise():
+    logger = Logger(size=2)
+    lines = _collect(logger)
+    logger.error("value=%d", 'x')
+    logger.flush()
+    assert lines == [(log.ERROR, "value=%d (bad log arguments)")]
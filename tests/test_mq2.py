@@ -0,0 +1,39 @@
+from lpg.mq2 import Mq2, ADC_CODES
+from simulator import Simulation, signals
+
+
+def make(tmp_path, name):
+    return Mq2(path=str(tmp_path / (name + '.json')), lut_path=str(tmp_path / (name + '.lut')))
+
+
+def test_build_steps_matches_build_and_swaps_at_the_end(tmp_path):
+    whole = make(tmp_path, 'a')
+    whole.calibrate(400)
+    sliced = make(tmp_path, 'b')
+    old = sliced.build()
+    sliced.set_clean_air(400)
+    steps = 0
+    for _ in sliced.build_steps(256):
+        assert sliced.lut is old            # readers keep the previous table
+        steps += 1
+    assert steps == ADC_CODES // 256 - 1
+    assert sliced.lut == whole.lut
+    assert sliced.calibrated and sliced.r0_kohm == whole.r0_kohm
+
+
+def test_rs_is_sensor_on_top_of_load_resistor(tmp_path):
+    mq2 = make(tmp_path, 'c')
+    # Vout = 2.5 V across RL with Vc = 5 V: Rs equals RL
+    code = round(2.5 / (mq2.vref * mq2.divider) * (ADC_CODES - 1))
+    assert abs(mq2.rs_kohm(code) - mq2.rl_kohm) < 0.01
+
+
+def test_calibration_survives_other_commands():
+    sim = Simulation(signal=signals.constant(400))
+    sim.command(20, 'CALIBRATE')
+    sim.command(22, 'RELAY_OFF')
+    sim.command(23, 'STATE')
+    run = sim.run('ESP32_COMPLETE_FIRMWARE.py', 40)
+    logs = [m.payload for m in run.published('LPG/+/system/log')]
+    assert any(p.startswith(b'STATE relay=0') for p in logs)
+    assert any(p.startswith(b'MQ-2 calibrated: R0') for p in logs)
@@ -0,0 +1,293 @@
+import errno
+import types
+
+import pytest
+
+from lpg import mqttlink
+from lpg.mqttlink import MqttLink, DOWN, TCP, CONNECT, SUBSCRIBE, UP
+from simulator import Simulation, signals
+from simulator.simulation import ERRNO
+
+POLLIN, POLLOUT, POLLERR = 0x01, 0x04, 0x08
+TOPICS = ('LPG/a/system/control', 'LPG/group/system/control', 'LPG/all/system/control')
+
+
+class FakeSocket:
+    """Non-blocking socket whose inbound bytes the test feeds"""
+
+    def __init__(self, connect_errno):
+        self.connect_errno = connect_errno
+        self.connected = False
+        self.error = False
+        self.closed = False
+        self.inbound = bytearray()
+        self.sent = bytearray()
+
+    def connect(self, addr):
+        if self.connect_errno:
+            raise OSError(self.connect_errno)
+        self.connected = True
+
+    def setblocking(self, flag):
+        pass
+
+    def write(self, buf, length=None):
+        self.sent += buf if length is None else buf[:length]
+
+    def read(self, n):
+        if not self.inbound:
+            return b'' if self.closed else None
+        data = bytes(self.inbound[:n])
+        del self.inbound[:n]
+        return data
+
+    def close(self):
+        self.closed = True
+
+    def events(self):
+        if self.error:
+            return POLLERR
+        return (POLLOUT if self.connected else 0) | \
+            (POLLIN if self.inbound or self.closed else 0)
+
+
+class FakePoll:
+    def __init__(self):
+        self.socks = []
+
+    def register(self, sock, mask):
+        self.socks.append(sock)
+
+    def modify(self, sock, mask):
+        pass
+
+    def unregister(self, sock):
+        self.socks.remove(sock)
+
+    def poll(self, timeout=-1):
+        return [(s, s.events()) for s in self.socks if s.events()]
+
+    def ipoll(self, timeout=-1):
+        return iter(self.poll(timeout))
+
+
+@pytest.fixture
+def net(clock, monkeypatch):
+    """Fake usocket / uselect with the ESP32 port's errno numbers"""
+    for name, value in ERRNO.items():
+        monkeypatch.setattr(errno, name, value)
+    state = types.SimpleNamespace(socks=[], connect_errno=errno.EINPROGRESS)
+
+    def socket():
+        sock = FakeSocket(state.connect_errno)
+        state.socks.append(sock)
+        return sock
+
+    fake = types.SimpleNamespace(getaddrinfo=lambda host, port: [(2, 1, 6, '', (host, port))],
+                                 socket=socket)
+    monkeypatch.setattr(mqttlink, 'usocket', fake)
+    monkeypatch.setattr(mqttlink.uselect, 'poll', FakePoll)
+    return state
+
+
+def make_link(**kwargs):
+    received = []
+    client = types.SimpleNamespace(server='broker', port=1883, ssl=False, ssl_params={},
+                                   client_id='esp32-a', lw_topic=None, user=None,
+                                   keepalive=60, pid=0, sock=None,
+                                   cb=lambda topic, msg: received.append((topic, msg)))
+    link = MqttLink(client, TOPICS, **kwargs)
+    link.received = received
+    return link
+
+
+def test_connect_in_progress_uses_port_errno(net):
+    link = make_link()
+    link.step()                             # DOWN -> DNS
+    link.step()                             # connect() raises OSError(119)
+    assert link.state == TCP
+    assert link.failures == 0
+
+
+def test_host_errno_number_is_a_failure(net):
+    net.connect_errno = 115                 # Linux's EINPROGRESS means nothing on the board
+    link = make_link()
+    link.step()
+    link.step()
+    assert link.state == DOWN
+    assert link.failures == 1
+
+
+def test_simulated_firmware_connects_with_port_errno():
+    host = errno.EINPROGRESS
+    run = Simulation(signal=signals.constant(400)).run('ESP32_COMPLETE_FIRMWARE.py', 20)
+    assert [m.payload for m in run.published('LPG/+/gas/status')] == [b'SYSTEM_READY']
+    assert errno.EINPROGRESS == host        # the runner puts the host's numbers back
+
+
+CONNACK = b'\x20\x02\x00\x00'
+
+
+def suback(pid, code=0):
+    return bytes([0x90, 3, pid >> 8, pid & 0xFF, code])
+
+
+def publish(topic, payload, flags=0x01):
+    body = len(topic).to_bytes(2, 'big') + topic + payload
+    return bytes([0x30 | flags, len(body)]) + body
+
+
+def to_connect(net, link):
+    """DOWN -> DNS -> TCP -> CONNECT (CONNECT sent)"""
+    link.step()
+    link.step()
+    net.socks[-1].connected = True
+    link.step()
+    assert link.state == CONNECT
+    return net.socks[-1]
+
+
+def to_subscribe(net, link):
+    sock = to_connect(net, link)
+    sock.inbound += CONNACK
+    link.step()
+    assert link.state == SUBSCRIBE
+    return sock
+
+
+def test_retained_publish_between_subacks_is_held_and_delivered(net):
+    link = make_link()
+    sock = to_subscribe(net, link)
+    sock.inbound += suback(1) + publish(b'LPG/a/system/control', b'RELAY_OFF') \
+        + suback(2) + suback(3)
+    came_up = [link.step() for _ in range(4)]
+    assert came_up == [False, False, False, True]
+    assert link.state == UP and link.failures == 0
+    assert link.received == []
+    link.deliver()
+    assert link.received == [(b'LPG/a/system/control', b'RELAY_OFF')]
+    link.deliver()
+    assert len(link.received) == 1
+
+
+def test_packets_are_read_to_their_end_only(net):
+    link = make_link()
+    sock = to_subscribe(net, link)
+    sock.inbound += suback(1) + suback(2) + suback(3) + publish(b't', b'after UP')
+    for _ in range(3):
+        link.step()
+    assert link.state == UP
+    assert bytes(sock.inbound) == publish(b't', b'after UP')     # left for check_msg()
+
+
+def test_packet_arriving_in_pieces(net):
+    link = make_link()
+    sock = to_connect(net, link)
+    sock.inbound += CONNACK[:1]
+    link.step()
+    assert link.state == CONNECT
+    sock.inbound += CONNACK[1:]
+    link.step()
+    assert link.state == SUBSCRIBE
+
+
+def test_long_remaining_length(net):
+    link = make_link()
+    sock = to_subscribe(net, link)
+    big = publish(b'LPG/all/system/control', b'x' * 200)
+    body = big[2:]
+    sock.inbound += bytes([0x30, 0x80 | len(body) & 0x7F, len(body) >> 7]) + body
+    sock.inbound += suback(1) + suback(2) + suback(3)
+    for _ in range(4):
+        link.step()
+    assert link.state == UP
+    link.deliver()
+    assert link.received == [(b'LPG/all/system/control', b'x' * 200)]
+
+
+def test_retained_command_reaches_simulated_firmware():
+    sim = Simulation(signal=signals.constant(400))
+    sim.at(0, sim.broker.publish, 'LPG/all/system/control', b'STATE', 'host', True)
+    run = sim.run('ESP32_COMPLETE_FIRMWARE.py', 20)
+    assert [m.payload for m in run.published('LPG/+/gas/status')] == [b'SYSTEM_READY']
+    assert any(m.payload.startswith(b'STATE ') for m in run.published('LPG/+/system/log'))
+
+
+def to_up(net, link):
+    sock = to_subscribe(net, link)
+    sock.inbound += suback(1) + suback(2) + suback(3)
+    for _ in range(3):
+        link.step()
+    assert link.state == UP
+    return sock
+
+
+def test_backoff_doubles_with_jitter_up_to_the_cap(net, clock):
+    net.connect_errno = errno.ETIMEDOUT
+    link = make_link(backoff_ms=500, backoff_max_ms=4000)
+    for n in range(6):
+        link.step()                                 # DOWN -> DNS
+        link.step()                                 # connect() fails
+        assert link.state == DOWN and link.fail_streak == n + 1
+        cap = min(4000, 500 << n)
+        wait = clock.ticks_diff(link.retry_at, clock.ticks_ms())
+        assert cap // 2 <= wait <= cap
+        link.step()                                 # still backing off
+        assert link.attempts == n + 1
+        clock.advance(wait * 1000)
+    assert link.failures == 6 and link.successes == 0
+
+
+def test_connack_refused(net):
+    link = make_link()
+    sock = to_connect(net, link)
+    sock.inbound += b'\x20\x02\x00\x05'             # not authorised
+    link.step()
+    assert link.state == DOWN
+    assert 'CONNACK refused: 5' in str(link.last_error)
+    assert sock.closed
+
+
+def test_suback_refused(net):
+    link = make_link()
+    sock = to_subscribe(net, link)
+    sock.inbound += suback(1) + suback(2, 0x80)
+    link.step()
+    link.step()
+    assert link.state == DOWN
+    assert 'SUBACK refused' in str(link.last_error)
+
+
+def test_each_state_times_out(net, clock):
+    link = make_link(timeout_ms=2000)
+    link.step()
+    link.step()
+    assert link.state == TCP                        # connect never completes
+    clock.advance(1999 * 1000)
+    link.step()
+    assert link.state == TCP
+    clock.advance(1000)
+    link.step()
+    assert link.state == DOWN and 'TCP timeout' in str(link.last_error)
+
+    for reach, name in ((to_connect, 'CONNECT'), (to_subscribe, 'SUBSCRIBE')):
+        clock.advance(60_000 * 1000)                # past any backoff
+        reach(net, link)
+        clock.advance(2000 * 1000)
+        link.step()
+        assert link.state == DOWN and name + ' timeout' in str(link.last_error)
+
+
+def test_lost_then_up_again(net, clock):
+    link = make_link()
+    to_up(net, link)
+    assert link.successes == 1 and link.client.sock is net.socks[-1]
+    clock.advance(30_000 * 1000)
+    old = net.socks[-1]
+    link.lost()
+    assert link.state == DOWN and old.closed and link.fail_streak == 0
+    clock.advance(1500 * 1000)
+    to_up(net, link)                                # no backoff after a drop
+    assert link.successes == 2 and link.attempts == 2 and link.failures == 0
+    assert link.client.sock is net.socks[-1] is not old
+    assert link.down_ms == 1500
@@ -0,0 +1,61 @@
+from lpg.outputs import BUZZER, GREEN, KEEP, RED, RELAY, SERVO, Outputs
+
+
+class Recorder:
+    """Pin / PWM stand-in that logs every hardware write"""
+
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def value(self, v):
+        self.log.append((self.name, v))
+
+    def duty(self, d):
+        self.log.append((self.name, d))
+
+
+def _outputs():
+    log = []
+    pins = [Recorder(name, log) for name in ('relay', 'servo', 'buzzer', 'red', 'green')]
+    return Outputs(*pins), log
+
+
+def test_first_scene_writes_everything_then_only_changes():
+    out, log = _outputs()
+    assert out.apply((1, 38, 0, 0, 1)) == 5
+    del log[:]
+    assert out.apply((1, 38, 0, 0, 1)) == 0
+    assert log == []
+    assert out.set(GREEN, 0)
+    assert not out.set(GREEN, 0)
+    assert log == [('green', 0)]
+    assert out.skipped == 6
+
+
+def test_closing_scene_closes_valve_first():
+    out, log = _outputs()
+    out.apply((1, 38, 0, 0, 1))
+    del log[:]
+    out.apply((0, 115, 1, 1, 0))
+    assert log[0] == ('relay', 0)
+
+
+def test_opening_scene_opens_valve_last():
+    out, log = _outputs()
+    out.apply((0, 115, 1, 1, 0))
+    del log[:]
+    out.apply((1, 38, 0, 0, 1))
+    assert log[-1] == ('relay', 1)
+    assert [name for name, _ in log[:-1]] == ['servo', 'buzzer', 'red', 'green']
+
+
+def test_keep_leaves_output_alone():
+    out, log = _outputs()
+    out.apply((1, 38, 0, 0, 1))
+    del log[:]
+    assert out.apply((KEEP, KEEP, 1, KEEP, KEEP)) == 1
+    assert log == [('buzzer', 1)]
+    assert out.get(SERVO) == 38 and out.get(RED) == 0 and out.get(BUZZER) == 1
+    assert out.get(RELAY) == 1
+    assert out.report() == 'relay=1 servo=38 buzzer=1 red=0 green=1'
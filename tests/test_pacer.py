@@ -0,0 +1,33 @@
+from lpg.pacer import LEVEL_MAX, Pacer
+
+
+def test_level_follows_distance_to_trip():
+    assert Pacer(trip=1200, far=600).update(400) == LEVEL_MAX
+    assert Pacer(trip=1200, far=600).update(900) == LEVEL_MAX // 2
+    assert Pacer(trip=1200, far=600).update(1300) == 0
+
+
+def test_fast_rise_lowers_level_before_distance_does():
+    p = Pacer(trip=1200, far=600, lead_ms=5000)
+    assert p.update(500, rate=0) == LEVEL_MAX
+    # 700 counts below at 350 counts/s: trips in 2 s, 2/5 of the lead time
+    assert p.update(500, rate=350) == 2 * LEVEL_MAX // 5
+
+
+def test_level_drops_at_once_and_relaxes_slowly():
+    p = Pacer(trip=1200, far=600, relax=16)
+    p.update(1250)
+    assert p.level == 0
+    assert p.update(400) == 16
+    assert p.update(400) == 32
+    p.wake()
+    assert p.level == 0
+
+
+def test_scale_is_linear_in_level():
+    p = Pacer()
+    assert p.scale(100, 2000) == 2000
+    p.wake()
+    assert p.scale(100, 2000) == 100
+    p.level = LEVEL_MAX // 2
+    assert p.scale(100, 2000) == 1050
@@ -0,0 +1,21 @@
+from lpg.runtime import Outbox
+
+
+def test_log_burst_cannot_evict_status():
+    box = Outbox(size=4, low_size=2)
+    box.put('status', 'GAS_DETECTED')
+    for i in range(10):
+        box.put_low('log', i)
+    box.put('frame', b'f')
+    assert len(box) == 4
+    assert box.dropped == 0 and box.low_dropped == 8
+    assert [box.get() for _ in range(4)] == [
+        ('status', 'GAS_DETECTED'), ('frame', b'f'), ('log', 8), ('log', 9)]
+
+
+def test_main_queue_drops_oldest():
+    box = Outbox(size=2)
+    for i in range(3):
+        box.put('t', i)
+    assert box.dropped == 1
+    assert [box.get(), box.get()] == [('t', 1), ('t', 2)]
@@ -0,0 +1,44 @@
+from lpg.servo import ANGLE_MAX, Motion, duty_table, parse_angle
+
+
+def test_duty_table_passes_through_calibration_points():
+    table = duty_table(26, 77, 128)
+    assert len(table) == ANGLE_MAX + 1
+    assert (table[0], table[90], table[180]) == (26, 77, 128)
+    assert table[45] == 52                  # 26 + 51 * 45 / 90 = 51.5, rounded
+    assert all(table[a] <= table[a + 1] for a in range(ANGLE_MAX))
+
+
+def test_duty_table_with_uneven_halves():
+    table = duty_table(30, 70, 130)
+    assert table[45] == 50
+    assert table[135] == 100
+
+
+def test_parse_angle():
+    assert parse_angle('0') == 0
+    assert parse_angle('135') == 135
+    assert parse_angle('180') == 180
+    for bad in ('', None, '181', '-5', '12.5', '0090', 'abc'):
+        assert parse_angle(bad) is None
+
+
+def test_first_move_jumps_then_ramps():
+    writes = []
+    motion = Motion(writes.append, list(range(ANGLE_MAX + 1)), speed_dps=500, step_ms=20)
+    assert not motion.move(90)          # position unknown: go straight there
+    assert writes == [90]
+    assert motion.move(120)
+    while motion.advance():
+        pass
+    assert writes[1:] == [100, 110, 120]
+    assert not motion.moving()
+    assert not motion.advance()
+
+
+def test_zero_speed_jumps_and_move_clamps():
+    writes = []
+    motion = Motion(writes.append, list(range(ANGLE_MAX + 1)), speed_dps=0)
+    motion.move(10)
+    assert not motion.move(400)
+    assert writes == [10, ANGLE_MAX]
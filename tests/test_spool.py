@@ -0,0 +1,120 @@
+import struct
+
+import pytest
+
+from lpg.spool import Spool
+
+SIZE = 20
+
+
+def record(i):
+    return bytes([i & 0xFF]) * SIZE
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'spool.bin')
+
+
+def test_take_ack_in_order(path):
+    sp = Spool(path, slots=8, record_size=SIZE)
+    for i in range(5):
+        sp.append(record(i))
+    assert sp.pending() == 5
+    assert bytes(sp.take(3)) == record(0) + record(1) + record(2)
+    assert sp.pending() == 5            # take() does not remove
+    sp.ack(3)
+    assert bytes(sp.take(10)) == record(3) + record(4)
+    sp.ack(2)
+    assert sp.pending() == 0
+    assert sp.take(1) == bytearray()
+
+
+def test_full_ring_overwrites_oldest(path):
+    sp = Spool(path, slots=4, record_size=SIZE)
+    for i in range(6):
+        sp.append(record(i))
+    assert sp.pending() == 4
+    assert sp.dropped == 2
+    assert bytes(sp.take(4)) == b''.join(record(i) for i in range(2, 6))
+
+
+def test_ring_wraps_many_laps(path):
+    sp = Spool(path, slots=4, record_size=SIZE)
+    for i in range(11):
+        sp.append(record(i))
+        assert bytes(sp.take(1)) == record(i)
+        sp.ack(1)
+    assert sp.pending() == 0
+    assert sp.writes == 11
+
+
+def test_unacked_records_survive_reboot(path):
+    sp = Spool(path, slots=8, record_size=SIZE)
+    for i in range(6):
+        sp.append(record(i))
+    sp.take(2)
+    sp.ack(2)
+    sp.close()
+    sp = Spool(path, slots=8, record_size=SIZE)
+    assert sp.pending() == 4
+    assert bytes(sp.take(4)) == b''.join(record(i) for i in range(2, 6))
+
+
+def test_read_cursor_survives_reboot_after_wrap(path):
+    sp = Spool(path, slots=4, record_size=SIZE)
+    for i in range(10):
+        sp.append(record(i))
+    sp.ack(1)                           # cursor at record 7 (6 dropped)
+    sp.close()
+    sp = Spool(path, slots=4, record_size=SIZE)
+    assert sp.head == 11
+    assert bytes(sp.take(3)) == b''.join(record(i) for i in range(7, 10))
+    sp.append(record(10))
+    assert sp.pending() == 4
+
+
+def test_torn_slot_is_ignored(path):
+    sp = Spool(path, slots=8, record_size=SIZE)
+    for i in range(5):
+        sp.append(record(i))
+    sp.close()
+    # Reset mid-write of slot 6: its sequence number is garbage
+    with open(path, 'r+b') as f:
+        f.seek(6 * (4 + SIZE))
+        f.write(struct.pack('<I', 0xDEADBEEF))
+    sp = Spool(path, slots=8, record_size=SIZE)
+    assert sp.head == 6
+    assert sp.pending() == 5
+    assert bytes(sp.take(5)) == b''.join(record(i) for i in range(5))
+
+
+def test_garbled_index_replays_everything_kept(path):
+    sp = Spool(path, slots=8, record_size=SIZE)
+    for i in range(5):
+        sp.append(record(i))
+    sp.ack(2)
+    sp.close()
+    with open(path + '.idx', 'wb') as f:
+        f.write(struct.pack('<I', 999))
+    sp = Spool(path, slots=8, record_size=SIZE)
+    assert sp.pending() == 5
+
+
+def test_short_index_file(path):
+    sp = Spool(path, slots=8, record_size=SIZE)
+    for i in range(3):
+        sp.append(record(i))
+    sp.close()
+    with open(path + '.idx', 'wb') as f:
+        f.write(b'\x02')
+    sp = Spool(path, slots=8, record_size=SIZE)
+    assert sp.pending() == 3
+
+
+def test_new_geometry_starts_empty(path):
+    sp = Spool(path, slots=8, record_size=SIZE)
+    sp.append(record(1))
+    sp.close()
+    sp = Spool(path, slots=4, record_size=SIZE)
+    assert sp.pending() == 0
@@ -0,0 +1,26 @@
+import json
+
+from simulator import Simulation, signals
+
+FIRMWARE = 'ESP32_COMPLETE_FIRMWARE.py'
+STALE = ['192.168.1.7', '255.255.255.0', '192.168.1.1', '192.168.1.1']
+
+
+def boot(fs_root):
+    run = Simulation(signal=signals.constant(400), fs_root=str(fs_root)).run(FIRMWARE, 15)
+    log = [m.payload for m in run.published('LPG/+/system/log')]
+    return next(p for p in log if p.startswith(b'WiFi ')), \
+        json.loads((fs_root / 'wifi.json').read_text())
+
+
+def test_fast_join_renews_lease_and_updates_cache(tmp_path):
+    line, first = boot(tmp_path)
+    assert b'(scan join' in line
+    line, second = boot(tmp_path)               # same lease: cache join, file unchanged
+    assert b'(cache join' in line
+    assert second == first
+
+    (tmp_path / 'wifi.json').write_text(json.dumps(dict(first, ip=STALE)))
+    line, renewed = boot(tmp_path)              # address reassigned since
+    assert b'(cache join' in line
+    assert renewed['ip'] == first['ip']
@@ -0,0 +1,137 @@
+"""
+Precompile the firmware to .mpy bytecode for the ESP32.
+
+Compiles lib/lpg/*.py with mpy-cross into <out>/lib/lpg/*.mpy and writes
+<out>/main.py, so the board imports bytecode from flash instead of
+compiling source into RAM on every boot. Copy the contents of <out> to the
+board root (e.g. `mpremote cp -r build/* :`).
+
+ESP32_COMPLETE_FIRMWARE.py is already a two-line entry point and is copied
+as main.py. The single-file variants (ESP32_CLEAN.py, ESP32_main.py,
+ESP32_THONNY_CODE.py) are compiled whole into a module of the same name,
+with a main.py that imports it.
+
+--manifest also writes <out>/manifest.py for freezing the same modules into
+a custom MicroPython build (code then runs straight from flash):
+
+    make -C ports/esp32 BOARD=ESP32_GENERIC FROZEN_MANIFEST=$PWD/build/manifest.py
+
+mpy-cross must match the firmware's MicroPython version
+(`pip install mpy-cross==1.20.0`, or set MPY_CROSS to a binary).
+
+    python tools/build_mpy.py [--variant FILE] [--out build] [--manifest] [--json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIB = os.path.join(ROOT, 'lib')
+ENTRY = 'ESP32_COMPLETE_FIRMWARE.py'
+VARIANTS = ('ESP32_COMPLETE_FIRMWARE.py', 'ESP32_CLEAN.py', 'ESP32_main.py',
+            'ESP32_THONNY_CODE.py')
+
+
+def find_mpy_cross(explicit=None):
+    """Command prefix that runs mpy-cross, or None"""
+    if explicit:
+        return [explicit]
+    if os.environ.get('MPY_CROSS'):
+        return [os.environ['MPY_CROSS']]
+    if shutil.which('mpy-cross'):
+        return ['mpy-cross']
+    try:
+        import mpy_cross  # noqa: F401  (pip package wraps the binary)
+    except ImportError:
+        return None
+    return [sys.executable, '-m', 'mpy_cross']
+
+
+def compile_module(mpy_cross, source, target, args):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    cmd = mpy_cross + args + ['-o', target, source]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode:
+        raise SystemExit(f"mpy-cross failed on {source}:\n{result.stderr}")
+
+
+def write_manifest(path, variant):
+    lines = [
+        "# Frozen modules for the gas detector firmware (generated by tools/build_mpy.py)",
+        'include("$(PORT_DIR)/boards/manifest.py")',
+        f'package("lpg", base_path={LIB!r})',
+    ]
+    if variant != ENTRY:
+        lines.append(f'module({variant!r}, base_path={ROOT!r})')
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def build(variant, out, mpy_cross, args, manifest):
+    rows = []
+    if os.path.isdir(out):
+        shutil.rmtree(out)
+    for source in sorted(glob.glob(os.path.join(LIB, 'lpg', '*.py'))):
+        rel = os.path.relpath(source, ROOT)
+        target = os.path.join(out, os.path.splitext(rel)[0] + '.mpy')
+        compile_module(mpy_cross, source, target, args)
+        rows.append((rel, os.path.getsize(source), os.path.getsize(target)))
+
+    main_py = os.path.join(out, 'main.py')
+    if variant == ENTRY:
+        shutil.copy(os.path.join(ROOT, ENTRY), main_py)
+    else:
+        name = os.path.splitext(variant)[0]
+        target = os.path.join(out, 'lib', name + '.mpy')
+        compile_module(mpy_cross, os.path.join(ROOT, variant), target, args)
+        rows.append((variant, os.path.getsize(os.path.join(ROOT, variant)),
+                     os.path.getsize(target)))
+        with open(main_py, 'w') as f:
+            f.write(f"# Runs the precompiled {variant} (lib/{name}.mpy)\nimport {name}\n")
+
+    if manifest:
+        write_manifest(os.path.join(out, 'manifest.py'), variant)
+    return rows
+
+
+def print_table(rows):
+    print(f"{'module':<32}{'source B':>10}{'.mpy B':>10}{'ratio':>8}")
+    for name, src, mpy in rows:
+        print(f"{name:<32}{src:>10}{mpy:>10}{mpy / src if src else 0:>8.2f}")
+    src = sum(r[1] for r in rows)
+    mpy = sum(r[2] for r in rows)
+    print(f"{'total':<32}{src:>10}{mpy:>10}{mpy / src if src else 0:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--variant', default=ENTRY, choices=VARIANTS)
+    parser.add_argument('--out', default=os.path.join(ROOT, 'build'))
+    parser.add_argument('--mpy-cross', help="mpy-cross binary (default: MPY_CROSS / PATH / pip)")
+    parser.add_argument('--march', default='xtensawin', help="native code arch (ESP32: xtensawin)")
+    parser.add_argument('-O', dest='opt', type=int, default=0, help="mpy-cross optimisation level")
+    parser.add_argument('--manifest', action='store_true', help="also write a frozen manifest")
+    parser.add_argument('--json', action='store_true', help="print sizes as JSON")
+    opts = parser.parse_args(argv)
+
+    mpy_cross = find_mpy_cross(opts.mpy_cross)
+    if mpy_cross is None:
+        raise SystemExit("mpy-cross not found: pip install mpy-cross==1.20.0 (or set MPY_CROSS)")
+
+    args = ['-march=' + opts.march, '-O%d' % opts.opt]
+    rows = build(opts.variant, opts.out, mpy_cross, args, opts.manifest)
+    if opts.json:
+        print(json.dumps([{'module': n, 'source_bytes': s, 'mpy_bytes': m} for n, s, m in rows],
+                         indent=2))
+    else:
+        print_table(rows)
+        print(f"\nWrote {os.path.relpath(opts.out)}/ - copy its contents to the board root")
+
+
+if __name__ == '__main__':
+    main()
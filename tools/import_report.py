@@ -0,0 +1,65 @@
+# Import time and heap cost of the firmware modules, measured on the ESP32
+# MicroPython 1.20.0+
+#
+# Run on the board before and after deploying the .mpy build:
+#
+#   mpremote run tools/import_report.py
+#
+# `import ms` includes compiling source (.py) or loading bytecode (.mpy);
+# `kept B` is heap still held once garbage is collected, `peak B` is heap
+# in use straight after the import (compiler garbage included).
+# Importing lpg.app sets up the hardware but does not start the firmware.
+
+import gc
+import sys
+import time
+
+MODULES = (
+    'lpg.runtime',
+    'lpg.sampler',
+    'lpg.filters',
+    'lpg.batcher',
+    'lpg.report',
+    'lpg.frame',
+    'lpg.spool',
+    'lpg.mqttlink',
+    'lpg.wifi',
+    'lpg.gcgov',
+    'lpg.log',
+    'lpg.metrics',
+    'lpg.alarm',
+    'lpg.pacer',
+    'lpg.power',
+    'lpg.mq2',
+    'lpg.outputs',
+    'lpg.servo',
+    'lpg.sensors',
+    'lpg.topics',
+    'lpg.app',
+)
+
+gc.collect()
+heap_start = gc.mem_free()
+boot_ms = time.ticks_ms()
+rows = []
+
+for name in MODULES:
+    gc.collect()
+    free = gc.mem_free()
+    t = time.ticks_us()
+    __import__(name)
+    us = time.ticks_diff(time.ticks_us(), t)
+    peak = free - gc.mem_free()
+    gc.collect()
+    kept = free - gc.mem_free()
+    path = getattr(sys.modules[name], '__file__', 'frozen')
+    rows.append((name, path, us, kept, peak))
+
+print("\n{:<14}{:<26}{:>10}{:>9}{:>9}".format('module', 'file', 'import ms', 'kept B', 'peak B'))
+for name, path, us, kept, peak in rows:
+    print("{:<14}{:<26}{:>10.1f}{:>9}{:>9}".format(name, path, us / 1000, kept, peak))
+
+gc.collect()
+print("\ntotal import: {:.1f} ms, heap used: {} B, free heap: {} B".format(
+    sum(r[2] for r in rows) / 1000, heap_start - gc.mem_free(), gc.mem_free()))
+print("ticks at start of report: {} ms".format(boot_ms))
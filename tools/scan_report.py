@@ -0,0 +1,44 @@
+# ADC scan cost per channel and how many channels a board sustains
+# MicroPython 1.20.0+
+#
+# Run on the board with the sensors wired (the firmware need not run):
+#
+#   mpremote run tools/scan_report.py
+#
+# Each GPIO is read READS times with the firmware's oversampling; `us/read`
+# is the mean cost of one stored sample. The table gives the channels
+# that can each be sampled at that rate within SCAN_BUDGET_PCT of the CPU
+# (lpg.sensors.capacity); the running firmware reports the same estimate
+# for its real mix with the SENSORS command.
+
+import time
+from machine import ADC, Pin
+from lpg.sensors import capacity
+
+GPIOS = (34, 32, 35, 36, 39)    # ADC1 pins (ADC2 is unusable with WiFi on)
+READS = 1000
+OVERSAMPLE = 4                  # As in lpg/app.py
+RATES_HZ = (10, 20, 50, 100, 200, 500)
+SCAN_BUDGET_PCT = 25
+
+costs = []
+for gpio in GPIOS:
+    adc = ADC(Pin(gpio))
+    adc.atten(ADC.ATTN_11DB)
+    adc.width(ADC.WIDTH_12BIT)
+    t = time.ticks_us()
+    for _ in range(READS):
+        total = 0
+        for _ in range(OVERSAMPLE):
+            total += adc.read()
+    us = time.ticks_diff(time.ticks_us(), t)
+    costs.append((gpio, (us + READS // 2) // READS, total // OVERSAMPLE))
+
+print("\n{:<6}{:>9}{:>8}".format('gpio', 'us/read', 'value'))
+for gpio, us, value in costs:
+    print("{:<6}{:>9}{:>8}".format(gpio, us, value))
+
+worst = max(c[1] for c in costs)
+print("\nchannels at {}% CPU, {} us/read:".format(SCAN_BUDGET_PCT, worst))
+for hz in RATES_HZ:
+    print("  {:>4} Hz each: {}".format(hz, capacity(hz, worst, SCAN_BUDGET_PCT)))